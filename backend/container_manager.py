@@ -2,20 +2,29 @@ import io
 import logging
 import secrets
 import tarfile
+import threading
 import time
 import uuid
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional
 
 import docker
 from docker.errors import ImageNotFound
 from docker.models.containers import Container
 from fastapi import HTTPException
 
+from metrics import CONTAINER_RESTARTS, EXECUTION_PHASE_SECONDS
+
 logger = logging.getLogger("main")
 
 MAX_OUTPUT_SIZE = 10 * 1024
 
+# Exit code of a run killed by its timeout (as reported by coreutils timeout)
+TIMEOUT_EXIT_CODE = 124
+
+# Busybox timeout execs the program, so a killed run exits with 128 + SIGKILL
+_TIMEOUT_EXIT_CODES = (TIMEOUT_EXIT_CODE, 128 + 9)
+
 LANGUAGE_CONFIG = {
     "python": {
         "image": "python-numpy:3.10-alpine",
@@ -61,9 +70,20 @@ class ContainerManager:
         self.client: docker.DockerClient = docker.from_env()
         self.containers: Dict[str, Container] = {}
         self.last_used: Dict[str, datetime] = {}
+        # Executions run on worker threads; each language's container is
+        # looked up, recreated and cleaned up under its own lock
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
         self.start_time = time.time()
         logger.info("ContainerManager initialized")
 
+    def _language_lock(self, language: str) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._locks.get(language)
+            if lock is None:
+                lock = self._locks[language] = threading.Lock()
+            return lock
+
     def _generate_container_name(self, language: str) -> str:
         suffix = secrets.token_hex(2)
         return f"code-runner-{language}-{suffix}"
@@ -117,6 +137,10 @@ class ContainerManager:
                 raise
 
     def create_container(self, language: str) -> Container:
+        with self._language_lock(language):
+            return self._create_container(language)
+
+    def _create_container(self, language: str) -> Container:
         config = LANGUAGE_CONFIG[language]
         container_name = self._generate_container_name(language)
 
@@ -151,8 +175,12 @@ class ContainerManager:
             raise
 
     def get_container(self, language: str) -> Container:
+        with self._language_lock(language):
+            return self._get_container(language)
+
+    def _get_container(self, language: str) -> Container:
         if language not in self.containers:
-            return self.create_container(language)
+            return self._create_container(language)
 
         container = self.containers[language]
 
@@ -160,23 +188,33 @@ class ContainerManager:
             container.reload()
             if container.status != "running":
                 logger.warning(f"Container for {language} is not running, recreating")
-                self.cleanup_container(language)
-                return self.create_container(language)
+                CONTAINER_RESTARTS.inc(language=language)
+                self._cleanup_container(language)
+                return self._create_container(language)
         except Exception as e:
             logger.warning(
                 f"Error checking container status for {language}: {e}, recreating"
             )
-            self.cleanup_container(language)
-            return self.create_container(language)
+            CONTAINER_RESTARTS.inc(language=language)
+            self._cleanup_container(language)
+            return self._create_container(language)
 
         return container
 
-    def execute_code(self, language: str, code: str) -> ExecuteResponse:
+    def execute_code(
+        self, language: str, code: str, timeout: Optional[int] = None
+    ) -> ExecuteResponse:
+        """Run code in the language's container.
+
+        With a timeout (in seconds), the program is killed once it runs
+        longer; the result then has exit code TIMEOUT_EXIT_CODE.
+        """
         start_time = time.time()
 
         logger.debug(f"Executing {language} code (length: {len(code)} bytes)")
 
-        container = self.get_container(language)
+        with EXECUTION_PHASE_SECONDS.time(language=language, phase="container_lookup"):
+            container = self.get_container(language)
         config = LANGUAGE_CONFIG[language]
 
         self.last_used[language] = datetime.now()
@@ -189,31 +227,44 @@ class ContainerManager:
 
         try:
             tar_data = self._create_tarfile(filename, code)
-            container.put_archive("/tmp", tar_data)
+            with EXECUTION_PHASE_SECONDS.time(language=language, phase="put_archive"):
+                container.put_archive("/tmp", tar_data)
 
             command = [
                 cmd.format(filepath=filepath) if "{filepath}" in cmd else cmd
                 for cmd in config["command"]
             ]
+            if timeout is not None:
+                command = ["timeout", "-s", "KILL", str(timeout)] + command
 
             logger.debug(f"Executing command: {' '.join(command)}")
 
-            exec_result = container.exec_run(
-                command,
-                demux=False,
-                workdir="/tmp",
-                environment={},
-                privileged=False,
-                user="",
-                stream=False,
-                stdin=False,
-            )
+            exec_started = time.time()
+            with EXECUTION_PHASE_SECONDS.time(language=language, phase="exec_run"):
+                exec_result = container.exec_run(
+                    command,
+                    demux=False,
+                    workdir="/tmp",
+                    environment={},
+                    privileged=False,
+                    user="",
+                    stream=False,
+                    stdin=False,
+                )
 
             exit_code = exec_result.exit_code
 
             output_bytes = exec_result.output
             combined_output = output_bytes.decode("utf-8") if output_bytes else ""
 
+            timed_out = (
+                timeout is not None
+                and exit_code in _TIMEOUT_EXIT_CODES
+                and time.time() - exec_started >= timeout
+            )
+            if timed_out:
+                exit_code = TIMEOUT_EXIT_CODE
+
             logger.debug(f"Captured combined output length: {len(combined_output)}")
 
             stdout = combined_output
@@ -221,10 +272,13 @@ class ContainerManager:
 
             stdout = self._truncate_output(stdout)
             stderr = self._truncate_output(stderr)
+            if timed_out:
+                stdout += f"\n[Execution timed out after {timeout}s]"
 
             execution_time_ms = (time.time() - start_time) * 1000
 
-            stats = container.stats(stream=False)
+            with EXECUTION_PHASE_SECONDS.time(language=language, phase="stats"):
+                stats = container.stats(stream=False)
             memory_stats = stats.get("memory_stats", {})
             cpu_stats = stats.get("cpu_stats", {})
             precpu_stats = stats.get("precpu_stats", {})
@@ -268,10 +322,14 @@ class ContainerManager:
             raise HTTPException(status_code=500, detail=f"Docker API error: {str(e)}")
 
     def cleanup_container(self, language: str):
-        if language not in self.containers:
+        with self._language_lock(language):
+            self._cleanup_container(language)
+
+    def _cleanup_container(self, language: str):
+        container = self.containers.get(language)
+        if container is None:
             return
 
-        container = self.containers[language]
         container_id = container.short_id
 
         logger.info(f"Cleaning up container for {language} (ID: {container_id})")
@@ -288,9 +346,8 @@ class ContainerManager:
         except Exception as e:
             logger.warning(f"Error removing container {container_id}: {e}")
 
-        del self.containers[language]
-        if language in self.last_used:
-            del self.last_used[language]
+        self.containers.pop(language, None)
+        self.last_used.pop(language, None)
 
         logger.info(f"Container for {language} cleaned up successfully")
 
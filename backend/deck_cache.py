@@ -0,0 +1,102 @@
+"""
+Persistent cache for Mochi deck metadata.
+
+Decks (and their `archived?` flags) change rarely, so the deck list is kept
+on disk with a TTL and revalidated with a conditional request when the API
+provides an ETag. Survives restarts.
+"""
+
+import json
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DECK_CACHE_TTL_MINUTES = 24 * 60
+
+
+class DeckCache:
+    """Deck list from Mochi with TTL, ETag and explicit invalidation."""
+
+    def __init__(
+        self,
+        cache_dir: str | Path = "review_cache",
+        ttl_minutes: float = DECK_CACHE_TTL_MINUTES,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(exist_ok=True)
+        self.ttl_minutes = ttl_minutes
+        self._decks: Optional[list[dict]] = None
+        self._etag: Optional[str] = None
+        self._fetched_at: Optional[datetime] = None
+        self._load()
+
+    def _get_cache_file(self) -> Path:
+        """Get the cache file path."""
+        return self.cache_dir / "decks_cache.json"
+
+    def _load(self) -> None:
+        """Load a previously persisted deck list, if any."""
+        cache_file = self._get_cache_file()
+        if not cache_file.exists():
+            return
+        try:
+            with open(cache_file, "r") as f:
+                data = json.load(f)
+            self._decks = data["decks"]
+            self._etag = data.get("etag")
+            self._fetched_at = datetime.fromisoformat(data["fetched_at"])
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable deck cache: {e}")
+            self._decks = self._etag = self._fetched_at = None
+
+    def _save(self) -> None:
+        with open(self._get_cache_file(), "w") as f:
+            json.dump(
+                {
+                    "decks": self._decks,
+                    "etag": self._etag,
+                    "fetched_at": self._fetched_at.isoformat()
+                    if self._fetched_at
+                    else None,
+                },
+                f,
+            )
+
+    @property
+    def etag(self) -> Optional[str]:
+        """ETag of the cached deck list, for If-None-Match revalidation."""
+        return self._etag
+
+    def get_decks(self) -> Optional[list[dict]]:
+        """Get the cached deck list, fresh or not."""
+        return self._decks
+
+    def is_fresh(self) -> bool:
+        """Check if the cached deck list is within its TTL."""
+        if self._decks is None or self._fetched_at is None:
+            return False
+        elapsed = datetime.now(timezone.utc) - self._fetched_at
+        return elapsed.total_seconds() < self.ttl_minutes * 60
+
+    def store(self, decks: list[dict], etag: Optional[str] = None) -> None:
+        """Replace the cached deck list after a full fetch."""
+        self._decks = decks
+        self._etag = etag
+        self._fetched_at = datetime.now(timezone.utc)
+        self._save()
+        logger.info(f"Cached {len(decks)} decks")
+
+    def touch(self) -> None:
+        """Mark the cached deck list as revalidated (e.g. after a 304)."""
+        self._fetched_at = datetime.now(timezone.utc)
+        self._save()
+
+    def invalidate(self) -> None:
+        """Force the next lookup to refetch decks from Mochi."""
+        self._decks = self._etag = self._fetched_at = None
+        cache_file = self._get_cache_file()
+        if cache_file.exists():
+            cache_file.unlink()
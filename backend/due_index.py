@@ -0,0 +1,190 @@
+"""
+Local due-date index for Mochi cards.
+
+Keeps active cards ordered by due date (globally and per deck) so that
+"what's due by <date>" is a range scan over the index instead of a pass
+over the whole collection.
+"""
+
+import bisect
+import logging
+import threading
+from datetime import datetime
+from typing import Iterable, Optional
+
+from fsrs_scheduler import FSRSScheduler
+
+logger = logging.getLogger(__name__)
+
+# New cards have no due date; the empty key sorts before every date so they
+# are always included in due queries.
+NEW_CARD_DUE_KEY = ""
+
+# Sorts after any card ID, used as the upper bound of a range scan.
+_MAX_CARD_ID = "\U0010ffff"
+
+
+def due_key(card_data: dict) -> Optional[str]:
+    """Return the index key (YYYY-MM-DD) for a card, or None if never due."""
+    reviews = card_data.get("reviews") or []
+    if not reviews:
+        # New card - due immediately if Mochi flags it as new
+        return NEW_CARD_DUE_KEY if card_data.get("new?", False) else None
+
+    due_date = reviews[-1].get("due", {})
+    if isinstance(due_date, dict):
+        due_str = due_date.get("date", "")
+        if due_str:
+            return due_str[:10]
+    return None
+
+
+class DueIndex:
+    """Cards from active decks, sorted by due date.
+
+    With a scheduler, reviewed cards are keyed by the due date FSRS computes
+    from their review history instead of the one Mochi assigned, so a review
+    reschedules its card locally.
+    """
+
+    def __init__(self, scheduler: Optional[FSRSScheduler] = None):
+        self._scheduler = scheduler
+        self._lock = threading.Lock()
+        self._cards: dict[str, dict] = {}
+        self._keys: dict[str, str] = {}
+        self._all: list[tuple[str, str]] = []
+        self._by_deck: dict[str, list[tuple[str, str]]] = {}
+        self._active_deck_ids: set[str] = set()
+        self._built = False
+
+    def is_built(self) -> bool:
+        """Check if the index has been populated by a sync."""
+        return self._built
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def rebuild(self, cards: Iterable[dict], active_deck_ids: set[str]) -> None:
+        """Replace the index contents with a fresh crawl of the collection."""
+        card_map: dict[str, dict] = {}
+        keys: dict[str, str] = {}
+        by_deck: dict[str, list[tuple[str, str]]] = {}
+
+        eligible = [c for c in cards if self._is_eligible(c, active_deck_ids)]
+        if self._scheduler:
+            local_dues = self._scheduler.next_due_batch(
+                card_data.get("reviews") for card_data in eligible
+            )
+        else:
+            local_dues = [None] * len(eligible)
+
+        for card_data, local_due in zip(eligible, local_dues):
+            key = local_due.strftime("%Y-%m-%d") if local_due else due_key(card_data)
+            if key is None:
+                continue
+            card_id = card_data["id"]
+            card_map[card_id] = card_data
+            keys[card_id] = key
+            by_deck.setdefault(card_data["deck-id"], []).append((key, card_id))
+
+        for entries in by_deck.values():
+            entries.sort()
+
+        with self._lock:
+            self._cards = card_map
+            self._keys = keys
+            self._all = sorted((key, card_id) for card_id, key in keys.items())
+            self._by_deck = by_deck
+            self._active_deck_ids = set(active_deck_ids)
+            self._built = True
+
+        logger.debug(f"Due index rebuilt with {len(keys)} schedulable cards")
+
+    def upsert(self, card_data: dict) -> None:
+        """Add or reposition a single card, e.g. after fetching it again."""
+        card_id = card_data.get("id")
+        if not card_id:
+            return
+
+        with self._lock:
+            self._remove_locked(card_id)
+            self._insert_locked(card_data)
+
+    def remove(self, card_id: str) -> None:
+        """Drop a card from the index (e.g. once it has been reviewed)."""
+        with self._lock:
+            self._remove_locked(card_id)
+
+    def record_review(
+        self, card_id: str, remembered: bool, reviewed_at: datetime
+    ) -> None:
+        """Reschedule a card after a review.
+
+        With a scheduler the review is appended to the card's history and the
+        card re-keyed by its new due date; otherwise the card is dropped until
+        the next sync brings Mochi's due date.
+        """
+        with self._lock:
+            card_data = self._cards.get(card_id)
+            self._remove_locked(card_id)
+            if card_data is None or self._scheduler is None:
+                return
+
+            review = {
+                "date": {"date": reviewed_at.isoformat()},
+                "remembered?": remembered,
+            }
+            card_data = {
+                **card_data,
+                "reviews": [*(card_data.get("reviews") or []), review],
+            }
+            self._insert_locked(card_data)
+
+    def query(self, until: str, deck_id: Optional[str] = None) -> list[dict]:
+        """Return raw card data for every card due on or before `until`."""
+        with self._lock:
+            entries = self._by_deck.get(deck_id, []) if deck_id else self._all
+            end = bisect.bisect_right(entries, (until, _MAX_CARD_ID))
+            return [self._cards[card_id] for _, card_id in entries[:end]]
+
+    @staticmethod
+    def _is_eligible(card_data: dict, active_deck_ids: set[str]) -> bool:
+        """Check if a card belongs in the index at all."""
+        return (
+            bool(card_data.get("id"))
+            and card_data.get("deck-id") in active_deck_ids
+            and not card_data.get("archived?")
+        )
+
+    def _key_for(self, card_data: dict) -> Optional[str]:
+        """Index key for a card, or None if it should not be indexed."""
+        if not self._is_eligible(card_data, self._active_deck_ids):
+            return None
+        if self._scheduler:
+            local_due = self._scheduler.next_due(card_data.get("reviews"))
+            if local_due:
+                return local_due.strftime("%Y-%m-%d")
+        return due_key(card_data)
+
+    def _insert_locked(self, card_data: dict) -> None:
+        key = self._key_for(card_data)
+        if key is None:
+            return
+        card_id = card_data["id"]
+        entry = (key, card_id)
+        self._cards[card_id] = card_data
+        self._keys[card_id] = key
+        bisect.insort(self._all, entry)
+        bisect.insort(self._by_deck.setdefault(card_data["deck-id"], []), entry)
+
+    def _remove_locked(self, card_id: str) -> None:
+        key = self._keys.pop(card_id, None)
+        card_data = self._cards.pop(card_id, None)
+        if key is None or card_data is None:
+            return
+
+        entry = (key, card_id)
+        for entries in (self._all, self._by_deck.get(card_data["deck-id"], [])):
+            pos = bisect.bisect_left(entries, entry)
+            if pos < len(entries) and entries[pos] == entry:
+                del entries[pos]
@@ -6,6 +6,8 @@ from fastapi import APIRouter, Depends
 from pydantic import BaseModel, Field
 
 from container_manager import LANGUAGE_CONFIG, ContainerManager
+from execution_scheduler import INTERACTIVE, ExecutionScheduler
+from fast_json import FastJSONResponse
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +31,17 @@ class ExecuteResponse(BaseModel):
     file_path: str
 
 
+class ExecutionClassStats(BaseModel):
+    completed: int
+    failed: int
+    waiting: int
+    running: int
+    wait_p50_ms: float | None
+    wait_p95_ms: float | None
+    run_p50_ms: float | None
+    run_p95_ms: float | None
+
+
 class HealthResponse(BaseModel):
     status: str
     containers: Dict[str, str]
@@ -40,20 +53,30 @@ def get_container_manager() -> ContainerManager:
     return ContainerManager()
 
 
+@lru_cache
+def get_execution_scheduler() -> ExecutionScheduler:
+    return ExecutionScheduler(get_container_manager())
+
+
 @router.post("/execute/python", response_model=ExecuteResponse)
 async def execute_python(
-    request: ExecuteRequest, manager: ContainerManager = Depends(get_container_manager)
+    request: ExecuteRequest,
+    scheduler: ExecutionScheduler = Depends(get_execution_scheduler),
 ):
     logger.info("Received Python execution request")
-    return manager.execute_code("python", request.code)
+    result = await scheduler.run("python", request.code, priority=INTERACTIVE)
+    # Built by the container manager, so encode it without re-validating
+    return FastJSONResponse(vars(result))
 
 
 @router.post("/execute/ruby", response_model=ExecuteResponse)
 async def execute_ruby(
-    request: ExecuteRequest, manager: ContainerManager = Depends(get_container_manager)
+    request: ExecuteRequest,
+    scheduler: ExecutionScheduler = Depends(get_execution_scheduler),
 ):
     logger.info("Received Ruby execution request")
-    return manager.execute_code("ruby", request.code)
+    result = await scheduler.run("ruby", request.code, priority=INTERACTIVE)
+    return FastJSONResponse(vars(result))
 
 
 @router.get("/health", response_model=HealthResponse)
@@ -74,3 +97,11 @@ async def health_check(manager: ContainerManager = Depends(get_container_manager
     return HealthResponse(
         status=status, containers=container_statuses, uptime_seconds=round(uptime, 2)
     )
+
+
+@router.get("/execute/stats", response_model=Dict[str, ExecutionClassStats])
+async def execution_stats(
+    scheduler: ExecutionScheduler = Depends(get_execution_scheduler),
+):
+    """Per-class (interactive, batch) execution counters and latencies."""
+    return scheduler.summary()
@@ -0,0 +1,169 @@
+"""
+Priority scheduling of code executions.
+
+Executions come in two classes. Interactive runs are the ones a learner is
+waiting on; batch runs are background work such as pre-running reference
+solutions. Both share a fixed number of execution slots, but:
+
+- a waiting interactive run always starts before any waiting batch run;
+- batch runs never hold more than BATCH_SLOTS slots, so the rest stay
+  reserved for interactive runs;
+- batch runs are deferred while any interactive run is waiting.
+
+A running execution is never preempted; batch work yields at the queue,
+not mid-run. Batch runs are instead killed after BATCH_TIMEOUT_SECONDS, so
+a runaway program cannot hold a batch slot forever. Queue wait and run time
+are recorded per class.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Literal
+
+from container_manager import ContainerManager, ExecuteResponse
+from metrics import EXECUTION_QUEUE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+Priority = Literal["interactive", "batch"]
+INTERACTIVE: Priority = "interactive"
+BATCH: Priority = "batch"
+
+# Executions running at once, across both classes
+EXECUTION_SLOTS = 4
+
+# Slots batch executions may hold; the remainder is reserved for interactive
+BATCH_SLOTS = 1
+
+# Longest a batch execution may run before it is killed
+BATCH_TIMEOUT_SECONDS = 10
+
+# Recent executions per class kept for latency percentiles
+LATENCY_SAMPLES = 1000
+
+
+def _percentile_ms(samples: deque, fraction: float) -> float | None:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] * 1000, 2)
+
+
+@dataclass
+class ClassStats:
+    """Counters and recent latencies for one priority class."""
+
+    completed: int = 0
+    failed: int = 0
+    waiting: int = 0
+    running: int = 0
+    wait_seconds: deque = field(default_factory=lambda: deque(maxlen=LATENCY_SAMPLES))
+    run_seconds: deque = field(default_factory=lambda: deque(maxlen=LATENCY_SAMPLES))
+
+    def summary(self) -> dict:
+        """Counters plus p50/p95 of queue wait and run time, in ms."""
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "waiting": self.waiting,
+            "running": self.running,
+            "wait_p50_ms": _percentile_ms(self.wait_seconds, 0.5),
+            "wait_p95_ms": _percentile_ms(self.wait_seconds, 0.95),
+            "run_p50_ms": _percentile_ms(self.run_seconds, 0.5),
+            "run_p95_ms": _percentile_ms(self.run_seconds, 0.95),
+        }
+
+
+class ExecutionScheduler:
+    """Runs ContainerManager executions with interactive work first."""
+
+    def __init__(
+        self,
+        container_manager: ContainerManager,
+        slots: int = EXECUTION_SLOTS,
+        batch_slots: int = BATCH_SLOTS,
+        batch_timeout: int = BATCH_TIMEOUT_SECONDS,
+    ):
+        self.manager = container_manager
+        self.slots = slots
+        self.batch_slots = min(batch_slots, slots)
+        self.batch_timeout = batch_timeout
+        self._queues: dict[Priority, deque[asyncio.Future]] = {
+            INTERACTIVE: deque(),
+            BATCH: deque(),
+        }
+        self.stats: dict[Priority, ClassStats] = {
+            INTERACTIVE: ClassStats(),
+            BATCH: ClassStats(),
+        }
+
+    def _running(self) -> int:
+        return sum(stats.running for stats in self.stats.values())
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiting executions, interactive first."""
+        while self._running() < self.slots:
+            if self._queues[INTERACTIVE]:
+                priority: Priority = INTERACTIVE
+            elif self._queues[BATCH] and self.stats[BATCH].running < self.batch_slots:
+                priority = BATCH
+            else:
+                return
+            waiter = self._queues[priority].popleft()
+            self.stats[priority].waiting -= 1
+            if waiter.done():
+                continue
+            self.stats[priority].running += 1
+            waiter.set_result(None)
+
+    async def _acquire(self, priority: Priority) -> None:
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues[priority].append(waiter)
+        self.stats[priority].waiting += 1
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted as we were cancelled; pass it on
+                self._release(priority)
+            elif waiter in self._queues[priority]:
+                self._queues[priority].remove(waiter)
+                self.stats[priority].waiting -= 1
+            raise
+
+    def _release(self, priority: Priority) -> None:
+        self.stats[priority].running -= 1
+        self._dispatch()
+
+    async def run(
+        self, language: str, code: str, priority: Priority = INTERACTIVE
+    ) -> ExecuteResponse:
+        """Execute code once a slot is free for its priority class."""
+        stats = self.stats[priority]
+        timeout = self.batch_timeout if priority == BATCH else None
+        queued_at = time.monotonic()
+        await self._acquire(priority)
+        started_at = time.monotonic()
+        stats.wait_seconds.append(started_at - queued_at)
+        EXECUTION_QUEUE_SECONDS.observe(started_at - queued_at, priority=priority)
+        try:
+            # execute_code blocks on the Docker API; keep it off the loop
+            result = await asyncio.to_thread(
+                self.manager.execute_code, language, code, timeout=timeout
+            )
+        except BaseException:
+            stats.failed += 1
+            raise
+        finally:
+            stats.run_seconds.append(time.monotonic() - started_at)
+            self._release(priority)
+        stats.completed += 1
+        return result
+
+    def summary(self) -> dict[str, dict]:
+        """Per-class counters and latencies."""
+        return {priority: stats.summary() for priority, stats in self.stats.items()}
@@ -0,0 +1,25 @@
+"""
+Fast JSON responses for data the server produced itself.
+
+FastAPI validates whatever an endpoint returns against its response model
+before encoding it. For payloads built from our own cache (due cards) or
+from the container manager (execution results) that validation only repeats
+work, and for large card lists it dominates serialization time.
+
+FastJSONResponse skips it: returning one from an endpoint bypasses the
+response model (which is still declared for the OpenAPI schema), and the
+content is encoded by pydantic-core's Rust serializer. Pydantic models,
+dataclasses and datetimes are encoded directly, without validation.
+"""
+
+from typing import Any
+
+import pydantic_core
+from fastapi.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded by pydantic-core, without validating content."""
+
+    def render(self, content: Any) -> bytes:
+        return pydantic_core.to_json(content)
@@ -0,0 +1,69 @@
+"""
+Advisory inter-process file locks.
+
+Used to coordinate multiple uvicorn workers that share the same review_cache
+directory. Locks are released by the OS if the holding process dies.
+"""
+
+import os
+import threading
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process deployments only
+    fcntl = None
+
+
+class FileLock:
+    """Exclusive flock() on a lock file, also safe between threads."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._thread_lock = threading.Lock()
+        self._fd: int | None = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """Acquire the lock; returns False if non-blocking and already held."""
+        if not self._thread_lock.acquire(blocking=blocking):
+            return False
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+                fcntl.flock(fd, flags)
+        except BlockingIOError:
+            os.close(fd)
+            self._thread_lock.release()
+            return False
+        except BaseException:
+            os.close(fd)
+            self._thread_lock.release()
+            raise
+
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        """Release the lock if held."""
+        if self._fd is None:
+            return
+        fd, self._fd = self._fd, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+            self._thread_lock.release()
+
+    def is_held(self) -> bool:
+        """Check if this object currently holds the lock."""
+        return self._fd is not None
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
@@ -0,0 +1,189 @@
+"""
+Local FSRS scheduling for Mochi cards.
+
+Replays a card's Mochi review history (remembered / forgot, one entry per
+review) through the FSRS model to estimate its memory state and next due
+date. This lets the due index reschedule a card as soon as it is reviewed,
+instead of waiting for Mochi's due date to arrive with the next sync.
+
+Mochi reviews are pass/fail and at most daily, so cards are scheduled in
+whole days: there are no (re)learning steps, and fuzzing is disabled so that
+every worker computes the same due dates.
+"""
+
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from fsrs import Card as FsrsCard
+from fsrs import Rating, Scheduler
+from fsrs.scheduler import MAX_DIFFICULTY, MIN_DIFFICULTY, STABILITY_MIN
+
+# Target probability of recalling a card when it comes due
+DESIRED_RETENTION = 0.9
+
+# Longest interval a card can be scheduled out, in days
+MAXIMUM_INTERVAL_DAYS = 365
+
+
+def _parse_review_date(value) -> Optional[datetime]:
+    """Parse a Mochi review date ({"date": iso} or iso string) as UTC."""
+    if isinstance(value, dict):
+        value = value.get("date")
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def review_history(reviews: Optional[list[dict]]) -> list[tuple[datetime, Rating]]:
+    """Mochi reviews as (time, rating) pairs in review order.
+
+    Remembered maps to Good and forgot to Again; reviews without a usable
+    date are skipped.
+    """
+    history = []
+    for review in reviews or []:
+        reviewed_at = _parse_review_date(review.get("date"))
+        if reviewed_at is None:
+            continue
+        rating = Rating.Good if review.get("remembered?", True) else Rating.Again
+        history.append((reviewed_at, rating))
+    history.sort(key=lambda entry: entry[0])
+    return history
+
+
+class FSRSScheduler:
+    """FSRS scheduler for Mochi review histories."""
+
+    def __init__(
+        self,
+        desired_retention: float = DESIRED_RETENTION,
+        maximum_interval: int = MAXIMUM_INTERVAL_DAYS,
+    ):
+        self.scheduler = Scheduler(
+            desired_retention=desired_retention,
+            learning_steps=(),
+            relearning_steps=(),
+            maximum_interval=maximum_interval,
+            enable_fuzzing=False,
+        )
+
+    def memory_state(self, reviews: Optional[list[dict]]) -> Optional[FsrsCard]:
+        """FSRS card (stability, difficulty, due) after a review history.
+
+        Returns None for cards that have never been reviewed.
+        """
+        history = review_history(reviews)
+        if not history:
+            return None
+
+        card = FsrsCard(due=history[0][0])
+        for reviewed_at, rating in history:
+            card, _ = self.scheduler.review_card(card, rating, reviewed_at)
+        return card
+
+    def next_due(self, reviews: Optional[list[dict]]) -> Optional[datetime]:
+        """Next due date for a review history, or None if never reviewed."""
+        card = self.memory_state(reviews)
+        return card.due if card else None
+
+    def retrievability(
+        self, reviews: Optional[list[dict]], now: Optional[datetime] = None
+    ) -> float:
+        """Predicted probability of recalling the card at `now`."""
+        card = self.memory_state(reviews)
+        if card is None:
+            return 0.0
+        return self.scheduler.get_card_retrievability(card, now)
+
+    def next_due_batch(
+        self, histories: Iterable[Optional[list[dict]]]
+    ) -> list[Optional[datetime]]:
+        """
+        Next due dates for many review histories at once.
+
+        Gives the same result as next_due for each history, but replays the
+        FSRS update rules in closed form with every per-parameter constant
+        computed once for the batch. Used when rescheduling the whole
+        collection after a sync.
+        """
+        w = self.scheduler.parameters
+        decay = -w[20]
+        factor = 0.9 ** (1 / decay) - 1
+        retention_term = self.scheduler.desired_retention ** (1 / decay) - 1
+        maximum_interval = self.scheduler.maximum_interval
+
+        def clamp_difficulty(difficulty: float) -> float:
+            return min(max(difficulty, MIN_DIFFICULTY), MAX_DIFFICULTY)
+
+        ratings = (Rating.Again, Rating.Hard, Rating.Good, Rating.Easy)
+        initial_stability = {r: max(w[r - 1], STABILITY_MIN) for r in ratings}
+        initial_difficulty = {
+            r: clamp_difficulty(w[4] - math.e ** (w[5] * (r - 1)) + 1) for r in ratings
+        }
+        short_term_growth = {r: math.e ** (w[17] * (r - 3 + w[18])) for r in ratings}
+        difficulty_delta = {r: -w[6] * (r - 3) for r in ratings}
+        easy_difficulty = w[4] - math.e ** (w[5] * 3) + 1
+        recall_growth = math.e ** (w[8])
+        forget_short_term = math.e ** (w[17] * w[18])
+
+        due_dates: list[Optional[datetime]] = []
+        for reviews in histories:
+            history = review_history(reviews)
+            if not history:
+                due_dates.append(None)
+                continue
+
+            last_review, rating = history[0]
+            stability = initial_stability[rating]
+            difficulty = initial_difficulty[rating]
+
+            for reviewed_at, rating in history[1:]:
+                elapsed_days = (reviewed_at - last_review).days
+                if elapsed_days < 1:
+                    growth = short_term_growth[rating] * stability ** -w[19]
+                    if rating != Rating.Again:
+                        growth = max(growth, 1.0)
+                    stability *= growth
+                else:
+                    r = (1 + factor * elapsed_days / stability) ** decay
+                    if rating == Rating.Again:
+                        stability = min(
+                            w[11]
+                            * difficulty ** -w[12]
+                            * ((stability + 1) ** w[13] - 1)
+                            * math.e ** ((1 - r) * w[14]),
+                            stability / forget_short_term,
+                        )
+                    else:
+                        hard_penalty = w[15] if rating == Rating.Hard else 1
+                        easy_bonus = w[16] if rating == Rating.Easy else 1
+                        stability *= (
+                            1
+                            + recall_growth
+                            * (11 - difficulty)
+                            * stability ** -w[9]
+                            * (math.e ** ((1 - r) * w[10]) - 1)
+                            * hard_penalty
+                            * easy_bonus
+                        )
+                stability = max(stability, STABILITY_MIN)
+
+                delta = difficulty_delta[rating]
+                difficulty = clamp_difficulty(
+                    w[7] * easy_difficulty
+                    + (1 - w[7]) * (difficulty + (10 - difficulty) * delta / 9)
+                )
+                last_review = reviewed_at
+
+            interval = round(stability / factor * retention_term)
+            interval = min(max(interval, 1), maximum_interval)
+            due_dates.append(last_review + timedelta(days=interval))
+
+        return due_dates
@@ -5,16 +5,22 @@ from contextlib import asynccontextmanager
 from pathlib import Path
 
 import uvicorn
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse
 
 import execution_router
 import review_router
 from container_manager import LANGUAGE_CONFIG
+from metrics import CONTENT_TYPE, MetricsMiddleware, render_metrics
 
 # Path to frontend build output
 FRONTEND_DIST = Path(__file__).parent.parent / "frontend" / "dist"
 
+# Paths handled by the API; everything else is served from the frontend build
+API_PATH_PREFIXES = ("api/", "execute/", "health", "metrics", "docs", "openapi.json")
+
 logging.basicConfig(
     level=logging.DEBUG, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
@@ -30,6 +36,23 @@ def check_mochi_api_key():
     logger.info("MOCHI_API_KEY is configured")
 
 
+class APIGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that leaves the frontend build alone.
+
+    Static files carry their own precompressed variants, each with its own
+    ETag. Compressing the others on the fly would send gzip bytes under the
+    identity ETag, and pay for the compression on every request.
+    """
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not scope["path"].lstrip("/").startswith(
+            API_PATH_PREFIXES
+        ):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting up FastAPI application")
@@ -51,22 +74,33 @@ async def lifespan(app: FastAPI):
         container_manager.create_container(language)
 
     # Start background sync manager
-    from review_router import card_to_dict, get_mochi_client, get_review_cache
-    from sync import SyncManager
-
-    sync_manager = SyncManager(
-        mochi_client=get_mochi_client(),
-        review_cache=get_review_cache(),
-        card_to_dict=card_to_dict,
+    from review_router import (
+        get_outbox_worker,
+        get_reference_runner,
+        get_sync_manager,
     )
+
+    sync_manager = get_sync_manager()
     sync_manager.start()
 
+    # Upload queued reviews (including any left over from a previous run)
+    outbox_worker = get_outbox_worker()
+    outbox_worker.start()
+
+    # Pre-run reference solutions queued by syncs
+    reference_runner = get_reference_runner()
+    if reference_runner:
+        reference_runner.start()
+
     logger.info("FastAPI application startup complete")
 
     yield
 
     logger.info("Shutting down FastAPI application")
     await sync_manager.stop()
+    await outbox_worker.stop()
+    if reference_runner:
+        await reference_runner.stop()
     container_manager.cleanup_all()
     logger.info("FastAPI application shutdown complete")
 
@@ -90,58 +124,64 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-logger.info("FastAPI app created with CORS middleware")
+# Compress larger API responses (due card lists, card content) for clients
+# that accept gzip. Server-Sent Events are never compressed.
+app.add_middleware(APIGZipMiddleware, minimum_size=1024, compresslevel=6)
+
+# Outermost, so in-flight counts and latencies cover the whole request
+app.add_middleware(MetricsMiddleware)
+
+logger.info("FastAPI app created with CORS, GZip and metrics middleware")
 
 app.include_router(execution_router.router)
 app.include_router(review_router.router)
 
 logger.info("Routers included")
 
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for this worker process."""
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+
 # Serve static files from frontend build if dist exists
 if FRONTEND_DIST.exists():
-    from fastapi.responses import FileResponse
-    from fastapi.staticfiles import StaticFiles
+    from static_assets import StaticAssets
 
     logger.info(f"Frontend dist found at {FRONTEND_DIST}, enabling static file serving")
 
-    # Mount static assets (JS, CSS, fonts)
-    assets_dir = FRONTEND_DIST / "assets"
-    if assets_dir.exists():
-        app.mount("/assets", StaticFiles(directory=assets_dir), name="assets")
-        logger.info("Mounted /assets for static files")
+    # Index the build once; requests are then served from memory
+    static_assets = StaticAssets(FRONTEND_DIST)
+    if not static_assets.has_index():
+        logger.warning(
+            f"No {static_assets.index_file} in {FRONTEND_DIST}; "
+            "client-side routes will return 404"
+        )
 
     @app.get("/")
-    async def serve_index():
+    async def serve_index(request: Request):
         """Serve the main index.html."""
-        return FileResponse(FRONTEND_DIST / "index.html")
+        return static_assets.index_response(request)
 
     @app.get("/{full_path:path}")
-    async def serve_spa(full_path: str):
-        """Serve index.html for SPA routing, except API routes."""
+    async def serve_spa(full_path: str, request: Request):
+        """Serve built files, and index.html for SPA routing, except API routes."""
         # Don't intercept API routes
-        if full_path.startswith(("api/", "execute/", "health", "docs", "openapi.json")):
+        if full_path.startswith(API_PATH_PREFIXES):
             raise HTTPException(status_code=404, detail="Not found")
 
-        # Try to serve the file directly if it exists
-        file_path = FRONTEND_DIST / full_path
-
-        # Security: Prevent path traversal attacks by ensuring resolved path
-        # stays within FRONTEND_DIST directory
-        try:
-            resolved_path = file_path.resolve()
-            resolved_frontend = FRONTEND_DIST.resolve()
-
-            # Check that the resolved path is within the frontend directory
-            if not resolved_path.is_relative_to(resolved_frontend):
-                raise HTTPException(status_code=404, detail="Not found")
+        # Only indexed files are served, so paths cannot escape FRONTEND_DIST
+        asset = static_assets.get(full_path)
+        if asset is not None:
+            return static_assets.response(request, asset)
 
-            if resolved_path.is_file():
-                return FileResponse(resolved_path)
-        except (ValueError, OSError):
+        # Missing hashed assets are real 404s, not client-side routes
+        if full_path.startswith("assets/"):
             raise HTTPException(status_code=404, detail="Not found")
 
         # Otherwise serve index.html for client-side routing
-        return FileResponse(FRONTEND_DIST / "index.html")
+        return static_assets.index_response(request)
 
     logger.info("SPA routes configured")
 else:
@@ -0,0 +1,272 @@
+"""
+Prometheus-style metrics for the backend.
+
+A small in-process registry of counters, gauges and histograms, rendered in
+the Prometheus text exposition format at /metrics. Recording a value is a
+dict lookup and an addition under a lock, cheap enough to leave on
+permanently. Metrics are per process: with several uvicorn workers, each
+scrape reports the worker that answered it.
+
+Every metric the backend exports is declared at the bottom of this module.
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets, in seconds
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+_registry: list["Metric"] = []
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metric:
+    """Base class: a named metric family with fixed label names."""
+
+    type_name = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        registry: Optional[list["Metric"]] = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], object] = {}
+        (_registry if registry is None else registry).append(self)
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> Iterator[tuple[str, tuple, tuple, float]]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, self.labelnames, key, value
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for name, labelnames, key, value in self._samples():
+            lines.append(
+                f"{name}{_format_labels(labelnames, key)} {_format_value(value)}"
+            )
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(Metric):
+    """Value that can go up and down."""
+
+    type_name = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+        registry: Optional[list[Metric]] = None,
+    ):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the duration of a block, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return sum(state[0]) if state else 0
+
+    def _samples(self) -> Iterator[tuple[str, tuple, tuple, float]]:
+        with self._lock:
+            items = [
+                (key, (list(counts), total))
+                for key, (counts, total) in self._values.items()
+            ]
+        bucket_labels = self.labelnames + ("le",)
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    bucket_labels,
+                    key + (_format_value(bound),),
+                    cumulative,
+                )
+            yield f"{self.name}_sum", self.labelnames, key, total
+            yield f"{self.name}_count", self.labelnames, key, cumulative
+
+
+def render_metrics(registry: Optional[list[Metric]] = None) -> str:
+    """All registered metrics in the Prometheus text format."""
+    metrics = _registry if registry is None else registry
+    return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting in-flight requests and timing each route."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status: Optional[int] = None
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # The route template, not the raw path, keeps label values bounded
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status or 500,
+            )
+
+
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "cachehit_http_requests_in_flight", "HTTP requests currently being served."
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "cachehit_http_request_seconds",
+    "HTTP request latency by route.",
+    ("method", "route", "status"),
+)
+EXECUTION_PHASE_SECONDS = Histogram(
+    "cachehit_execution_phase_seconds",
+    "Code execution latency by phase (container_lookup, put_archive, exec_run, stats).",
+    ("language", "phase"),
+)
+EXECUTION_QUEUE_SECONDS = Histogram(
+    "cachehit_execution_queue_seconds",
+    "Time executions wait for a slot, by priority class.",
+    ("priority",),
+)
+CONTAINER_RESTARTS = Counter(
+    "cachehit_container_restarts_total",
+    "Execution containers recreated because they stopped or failed a check.",
+    ("language",),
+)
+MOCHI_REQUEST_SECONDS = Histogram(
+    "cachehit_mochi_request_seconds",
+    "Mochi API request latency.",
+    ("method", "endpoint", "status"),
+)
+MOCHI_SYNC_PAGES = Histogram(
+    "cachehit_mochi_sync_pages",
+    "Pages fetched per full Mochi card crawl.",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+REVIEW_CACHE_LOOKUPS = Counter(
+    "cachehit_review_cache_lookups_total",
+    "Review cache lookups by kind and result (hit or miss).",
+    ("lookup", "result"),
+)
@@ -7,15 +7,40 @@ Implements fetching due cards and updating card reviews.
 API Reference: https://mochi.cards/docs/api/
 """
 
+import logging
 import os
+import time
 from dataclasses import dataclass
-from datetime import datetime, timezone
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional, Sequence
 
 import requests
 
+from deck_cache import DeckCache
+from due_index import DueIndex
+from fsrs_scheduler import FSRSScheduler
+from metrics import MOCHI_REQUEST_SECONDS, MOCHI_SYNC_PAGES
+from rate_limiter import Priority, RateLimiter, parse_retry_after
+from singleflight import SingleFlight
 
-@dataclass
+logger = logging.getLogger(__name__)
+
+# Parsed sections are shared by every Card with the same content, so
+# re-syncing an unchanged collection does almost no parsing work.
+SECTION_CACHE_SIZE = 4096
+
+# Retries for a throttled (429) request before giving up
+MAX_THROTTLE_RETRIES = 5
+
+
+def _endpoint(url: str) -> str:
+    """API resource of a request URL (e.g. "cards"), for metric labels."""
+    path = url.removeprefix(MochiClient.BASE_URL).strip("/")
+    return path.split("/", 1)[0] or "/"
+
+
+@dataclass(frozen=True, slots=True)
 class Section:
     """Represents a Q&A section within a card."""
 
@@ -23,28 +48,68 @@ class Section:
     answer: str
 
 
-@dataclass
 class Card:
-    """Represents a Mochi card."""
+    """Represents a Mochi card.
+
+    Sections are parsed from content on first access and memoized by content.
+    """
+
+    __slots__ = ("id", "content", "deck_id", "name", "reviews", "_sections")
+
+    def __init__(
+        self,
+        id: str,
+        content: str,
+        deck_id: str,
+        sections: Optional[Sequence[Section]] = None,
+        name: Optional[str] = None,
+        reviews: Optional[list] = None,
+    ):
+        self.id = id
+        self.content = content
+        self.deck_id = deck_id
+        self.name = name
+        self.reviews = reviews
+        self._sections = sections
+
+    @property
+    def sections(self) -> Sequence[Section]:
+        """Q&A sections, parsed lazily from content."""
+        if self._sections is None:
+            self._sections = _parse_sections_cached(self.content)
+        return self._sections
+
+    @sections.setter
+    def sections(self, value: Sequence[Section]) -> None:
+        self._sections = value
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Card):
+            return NotImplemented
+        return (
+            self.id == other.id
+            and self.content == other.content
+            and self.deck_id == other.deck_id
+            and self.name == other.name
+            and self.reviews == other.reviews
+            and list(self.sections) == list(other.sections)
+        )
 
-    id: str
-    content: str
-    deck_id: str
-    sections: list[Section]
-    name: Optional[str] = None
-    reviews: Optional[list] = None
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return (
+            f"Card(id={self.id!r}, deck_id={self.deck_id!r}, name={self.name!r}, "
+            f"content={self.content!r})"
+        )
 
     @classmethod
     def from_api_response(cls, data: dict) -> "Card":
         """Create a Card from API response data."""
-        content = data.get("content", "")
-        sections = cls._parse_sections(content)
-
         return cls(
             id=data.get("id", ""),
-            content=content,
+            content=data.get("content", ""),
             deck_id=data.get("deck-id", ""),
-            sections=sections,
             name=data.get("name"),
             reviews=data.get("reviews"),
         )
@@ -75,17 +140,33 @@ class Card:
         return sections if sections else [Section(question=content, answer="")]
 
 
+@lru_cache(maxsize=SECTION_CACHE_SIZE)
+def _parse_sections_cached(content: str) -> tuple[Section, ...]:
+    """Parse sections once per distinct content; the tuple is shared."""
+    return tuple(Card._parse_sections(content))
+
+
 class MochiClient:
     """Client for the Mochi Cards API."""
 
     BASE_URL = "https://app.mochi.cards/api"
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        deck_cache: Optional[DeckCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        scheduler: Optional[FSRSScheduler] = None,
+    ):
         self.api_key = api_key or os.environ.get("MOCHI_API_KEY", "")
         if not self.api_key:
             raise ValueError(
                 "API key required. Pass api_key or set MOCHI_API_KEY environment variable."
             )
+        self.deck_cache = deck_cache or DeckCache()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.due_index = DueIndex(scheduler=scheduler)
+        self._single_flight = SingleFlight()
 
     def _auth(self) -> tuple[str, str]:
         """Return auth tuple for requests."""
@@ -105,24 +186,83 @@ class MochiClient:
             "Accept": "application/transit+json",
         }
 
-    def _get_all_decks(self) -> list[dict]:
-        """Fetch all decks with pagination."""
+    def _request(
+        self, method: str, url: str, priority: Priority = Priority.BACKGROUND, **kwargs
+    ) -> requests.Response:
+        """
+        Send a request through the shared rate limiter.
+
+        Throttled (429) responses are retried after the server's Retry-After
+        delay, or an exponential backoff if none is given.
+        """
+        for attempt in range(MAX_THROTTLE_RETRIES + 1):
+            self.rate_limiter.acquire(priority)
+            throttled = False
+            retry_after = None
+            status = "error"
+            start = time.perf_counter()
+            try:
+                response = requests.request(method, url, auth=self._auth(), **kwargs)
+                status = response.status_code
+                throttled = response.status_code == 429
+                if throttled:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    if retry_after is None:
+                        retry_after = float(2**attempt)
+            finally:
+                self.rate_limiter.release(throttled=throttled, retry_after=retry_after)
+                MOCHI_REQUEST_SECONDS.observe(
+                    time.perf_counter() - start,
+                    method=method,
+                    endpoint=_endpoint(url),
+                    status=status,
+                )
+
+            if not throttled:
+                return response
+            logger.info(
+                f"Mochi returned 429 for {method} {url} "
+                f"(attempt {attempt + 1}/{MAX_THROTTLE_RETRIES + 1})"
+            )
+
+        return response
+
+    def _get_all_decks(
+        self, etag: Optional[str] = None
+    ) -> tuple[Optional[list[dict]], Optional[str]]:
+        """Fetch all decks with pagination.
+
+        If `etag` is given it is sent as If-None-Match on the first page. A 304
+        means the deck list is unchanged, and (None, etag) is returned.
+
+        Returns:
+            Tuple of (decks, etag of the first page).
+        """
         all_decks = []
         bookmark = None
+        new_etag = None
 
         while True:
             params = {"limit": 100}
+            headers = self._json_headers()
             if bookmark:
                 params["bookmark"] = bookmark
+            elif etag:
+                headers["If-None-Match"] = etag
 
-            response = requests.get(
+            response = self._request(
+                "GET",
                 f"{self.BASE_URL}/decks",
-                auth=self._auth(),
-                headers=self._json_headers(),
+                headers=headers,
                 params=params,
             )
+            if response.status_code == 304:
+                return None, etag
             response.raise_for_status()
 
+            if not bookmark:
+                new_etag = response.headers.get("ETag")
+
             data = response.json()
             decks = data.get("docs", [])
             all_decks.extend(decks)
@@ -131,25 +271,57 @@ class MochiClient:
             if not decks or not bookmark:
                 break
 
-        return all_decks
+        return all_decks, new_etag
+
+    def get_decks(self, force_refresh: bool = False) -> list[dict]:
+        """
+        Get all decks, served from the deck cache while it is fresh.
+
+        Once the TTL expires the cached list is revalidated with a conditional
+        request, falling back to a full crawl if the API does not honor it.
+
+        Args:
+            force_refresh: Skip the TTL check and revalidate with Mochi.
+        """
+        cached = self.deck_cache.get_decks()
+        if cached is not None and not force_refresh and self.deck_cache.is_fresh():
+            return cached
+
+        decks, etag = self._get_all_decks(
+            etag=self.deck_cache.etag if cached is not None else None
+        )
+        if decks is None and cached is not None:
+            logger.debug("Deck list not modified")
+            self.deck_cache.touch()
+            return cached
+
+        decks = decks or []
+        self.deck_cache.store(decks, etag)
+        return decks
+
+    def invalidate_deck_cache(self) -> None:
+        """Drop cached deck metadata so the next lookup refetches it."""
+        self.deck_cache.invalidate()
 
     def _get_all_cards(self) -> list[dict]:
         """Fetch all cards with pagination."""
         all_cards = []
         bookmark = None
+        pages = 0
 
         while True:
             params = {"limit": 100}
             if bookmark:
                 params["bookmark"] = bookmark
 
-            response = requests.get(
+            response = self._request(
+                "GET",
                 f"{self.BASE_URL}/cards",
-                auth=self._auth(),
                 headers=self._json_headers(),
                 params=params,
             )
             response.raise_for_status()
+            pages += 1
 
             data = response.json()
             cards = data.get("docs", [])
@@ -159,10 +331,40 @@ class MochiClient:
             if not cards or not bookmark:
                 break
 
+        MOCHI_SYNC_PAGES.observe(pages)
         return all_cards
 
+    def refresh_due_index(self) -> None:
+        """
+        Crawl decks and cards from Mochi and rebuild the local due index.
+
+        Concurrent callers share a single in-flight crawl.
+        """
+        self._single_flight.do("due-index", self._refresh_due_index)
+
+    def _refresh_due_index(self) -> None:
+        decks_were_cached = self.deck_cache.is_fresh()
+        all_decks = self.get_decks()
+        all_cards = self._get_all_cards()
+
+        # A card in a deck we have never seen means the cached deck list is
+        # out of date (e.g. a deck was created since it was fetched)
+        known_deck_ids = {d["id"] for d in all_decks}
+        if decks_were_cached and any(
+            c.get("deck-id") not in known_deck_ids for c in all_cards
+        ):
+            all_decks = self.get_decks(force_refresh=True)
+
+        # Get active (non-archived) deck IDs
+        active_deck_ids = {d["id"] for d in all_decks if not d.get("archived?")}
+
+        self.due_index.rebuild(all_cards, active_deck_ids)
+
     def get_due_cards(
-        self, deck_id: Optional[str] = None, date: Optional[datetime] = None
+        self,
+        deck_id: Optional[str] = None,
+        date: Optional[datetime] = None,
+        lookahead_days: int = 0,
     ) -> list[Card]:
         """
         Fetch cards that are due for review.
@@ -173,55 +375,39 @@ class MochiClient:
         Args:
             deck_id: Optional deck ID to filter by. If None, returns due cards from all decks.
             date: Optional date to check due cards for. Defaults to today.
+            lookahead_days: Also include cards due this many days after `date`.
 
         Returns:
             List of Card objects that are due for review.
         """
-        target_date = date or datetime.now(timezone.utc)
-        today_str = target_date.strftime("%Y-%m-%d")
-
-        # Get active (non-archived) deck IDs
-        all_decks = self._get_all_decks()
-        active_deck_ids = {d["id"] for d in all_decks if not d.get("archived?")}
+        self.refresh_due_index()
+        return self.query_due_cards(deck_id, date, lookahead_days)
+
+    def query_due_cards(
+        self,
+        deck_id: Optional[str] = None,
+        date: Optional[datetime] = None,
+        lookahead_days: int = 0,
+    ) -> list[Card]:
+        """
+        Answer a due query from the local index without contacting Mochi.
 
-        # If specific deck requested, only include that one
-        if deck_id:
-            active_deck_ids = {deck_id} & active_deck_ids
+        Takes the same arguments as get_due_cards. The index must have been
+        populated by refresh_due_index (or get_due_cards) first.
+        """
+        target_date = (date or datetime.now(timezone.utc)) + timedelta(
+            days=lookahead_days
+        )
+        until = target_date.strftime("%Y-%m-%d")
 
-        # Get all cards
-        all_cards = self._get_all_cards()
+        return [
+            Card.from_api_response(card_data)
+            for card_data in self.due_index.query(until, deck_id)
+        ]
 
-        due_cards = []
-        for card_data in all_cards:
-            card_deck_id = card_data.get("deck-id")
-
-            # Skip cards in archived or non-matching decks
-            if card_deck_id not in active_deck_ids:
-                continue
-
-            # Skip archived cards
-            if card_data.get("archived?"):
-                continue
-
-            # Check if card is due
-            reviews = card_data.get("reviews", [])
-            if not reviews:
-                # New card - include it
-                if card_data.get("new?", False):
-                    due_cards.append(Card.from_api_response(card_data))
-                continue
-
-            # Check due date from last review
-            last_review = reviews[-1]
-            due_date = last_review.get("due", {})
-            if isinstance(due_date, dict):
-                due_str = due_date.get("date", "")
-                if due_str and due_str[:10] <= today_str:
-                    due_cards.append(Card.from_api_response(card_data))
-
-        return due_cards
-
-    def update_card_review(self, card_id: str, remembered: bool) -> dict:
+    def update_card_review(
+        self, card_id: str, remembered: bool, reviewed_at: Optional[datetime] = None
+    ) -> dict:
         """
         Update a card's review status.
 
@@ -231,13 +417,16 @@ class MochiClient:
         Args:
             card_id: The ID of the card to update.
             remembered: True if the card was remembered, False otherwise.
+            reviewed_at: When the review happened. Defaults to now; pass the
+                original time when uploading a queued review.
 
         Returns:
             The API response as a dictionary.
         """
         url = f"{self.BASE_URL}/cards/{card_id}"
 
-        now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+        reviewed_at = reviewed_at or datetime.now(timezone.utc)
+        now_ms = int(reviewed_at.timestamp() * 1000)
 
         # Transit+JSON format for review data
         body = f"""{{
@@ -250,14 +439,14 @@ class MochiClient:
     ]
 }}"""
 
-        response = requests.post(
+        response = self._request(
+            "POST",
             url,
-            auth=self._auth(),
+            priority=Priority.INTERACTIVE,
             headers=self._transit_headers(),
             data=body,
         )
         response.raise_for_status()
-
         return response.json()
 
     def get_card(self, card_id: str) -> Card:
@@ -271,7 +460,13 @@ class MochiClient:
             Card object.
         """
         url = f"{self.BASE_URL}/cards/{card_id}"
-        response = requests.get(url, auth=self._auth(), headers=self._json_headers())
+        response = self._request(
+            "GET", url, priority=Priority.INTERACTIVE, headers=self._json_headers()
+        )
         response.raise_for_status()
 
-        return Card.from_api_response(response.json())
+        card_data = response.json()
+        if self.due_index.is_built():
+            self.due_index.upsert(card_data)
+
+        return Card.from_api_response(card_data)
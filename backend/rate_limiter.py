@@ -0,0 +1,141 @@
+"""
+Client-side rate limiting for the Mochi API.
+
+A token bucket caps the request rate, and an adaptive concurrency limit
+(additive increase, multiplicative decrease) backs off when Mochi throttles
+us. Interactive requests (review submission) are served before background
+crawls and always have a slot reserved for them.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+MOCHI_REQUESTS_PER_SECOND = 5.0
+MOCHI_BURST = 10
+MOCHI_MAX_CONCURRENCY = 4
+
+
+class Priority(IntEnum):
+    """Request priority; lower values are served first."""
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RateLimiter:
+    """Thread-safe token bucket with adaptive concurrency and priorities."""
+
+    def __init__(
+        self,
+        rate: float = MOCHI_REQUESTS_PER_SECOND,
+        burst: int = MOCHI_BURST,
+        max_concurrency: int = MOCHI_MAX_CONCURRENCY,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self._cond = threading.Condition()
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._concurrency = float(max_concurrency)
+        self._in_flight = 0
+        self._blocked_until = 0.0
+        self._interactive_waiting = 0
+
+    @property
+    def concurrency_limit(self) -> int:
+        """Current number of requests allowed in flight."""
+        return int(self._concurrency)
+
+    def acquire(self, priority: Priority = Priority.BACKGROUND) -> None:
+        """Block until a request of the given priority may be sent."""
+        with self._cond:
+            if priority == Priority.INTERACTIVE:
+                self._interactive_waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait = self._wait_time(priority, now)
+                    if wait == 0:
+                        self._tokens -= 1
+                        self._in_flight += 1
+                        return
+                    self._cond.wait(timeout=wait)
+            finally:
+                if priority == Priority.INTERACTIVE:
+                    self._interactive_waiting -= 1
+                    # Background requests may have been held back for us
+                    self._cond.notify_all()
+
+    def release(self, throttled: bool = False, retry_after: Optional[float] = None):
+        """Finish a request, adapting limits to whether it was throttled."""
+        with self._cond:
+            self._in_flight -= 1
+            if throttled:
+                self._concurrency = max(1.0, self._concurrency / 2)
+                self._tokens = 0.0
+                if retry_after:
+                    self._blocked_until = max(
+                        self._blocked_until, time.monotonic() + retry_after
+                    )
+                logger.warning(
+                    f"Mochi throttled request; concurrency limit now "
+                    f"{self.concurrency_limit}, retry after {retry_after}s"
+                )
+            else:
+                self._concurrency = min(
+                    float(self.max_concurrency),
+                    self._concurrency + 1 / self._concurrency,
+                )
+            self._cond.notify_all()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last_refill
+        self._tokens = min(float(self.burst), self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def _wait_time(self, priority: Priority, now: float) -> Optional[float]:
+        """Seconds to wait before retrying, 0 if a request may go now.
+
+        None means wait until another request is released.
+        """
+        if now < self._blocked_until:
+            return self._blocked_until - now
+
+        slots = self.concurrency_limit
+        if priority == Priority.BACKGROUND:
+            if self._interactive_waiting:
+                return None
+            # Keep one slot free for interactive requests
+            slots = max(1, slots - 1)
+        if self._in_flight >= slots:
+            return None
+
+        if self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+        return 0
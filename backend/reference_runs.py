@@ -0,0 +1,288 @@
+"""
+Pre-execution of reference solutions found in card answers.
+
+Card answers often contain a reference solution in a language-tagged code
+fence. After each sync, the runnable blocks of the synced cards are queued
+and executed in the background, one at a time and at batch priority, and
+their output is stored by content hash. When the learner runs their own
+attempt, the expected output is already known, so comparing against it
+needs no second execution.
+
+Outputs are keyed by a hash of (language, code): a solution shared by
+several cards runs once, and an edited solution is simply a new key.
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from container_manager import LANGUAGE_CONFIG, TIMEOUT_EXIT_CODE
+from execution_scheduler import BATCH, ExecutionScheduler
+
+logger = logging.getLogger(__name__)
+
+# ```lang ... ``` fences; the info string may carry extra words after the tag
+CODE_FENCE = re.compile(r"```[ \t]*([\w+#.-]+)[^\n]*\n(.*?)```", re.DOTALL)
+
+LANGUAGE_ALIASES = {
+    "py": "python",
+    "python3": "python",
+    "rb": "ruby",
+}
+
+# Delay before retrying after an unexpected runner error
+REFERENCE_RETRY_SECONDS = 5
+
+
+@dataclass(frozen=True)
+class CodeBlock:
+    """A runnable code block from a card answer."""
+
+    language: str
+    code: str
+
+    @property
+    def key(self) -> str:
+        """Content hash identifying this block's output."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self.language.encode())
+        digest.update(b"\0")
+        digest.update(self.code.encode())
+        return digest.hexdigest()
+
+
+@dataclass
+class ReferenceOutput:
+    """Stored result of running a reference solution."""
+
+    language: str
+    stdout: str
+    exit_code: int
+    executed_at: float
+
+
+def extract_code_blocks(text: str) -> list[CodeBlock]:
+    """Code blocks in a language the backend can execute, in order.
+
+    Untagged fences and other languages are skipped.
+    """
+    blocks = []
+    for tag, code in CODE_FENCE.findall(text or ""):
+        language = tag.lower()
+        language = LANGUAGE_ALIASES.get(language, language)
+        if language in LANGUAGE_CONFIG and code.strip():
+            blocks.append(CodeBlock(language=language, code=code))
+    return blocks
+
+
+def reference_block(answer: str) -> Optional[CodeBlock]:
+    """The reference solution of an answer: its first runnable block."""
+    blocks = extract_code_blocks(answer)
+    return blocks[0] if blocks else None
+
+
+def card_reference_blocks(card_data: dict) -> dict[int, CodeBlock]:
+    """Reference solutions of a cached card, by section index."""
+    blocks = {}
+    for index, section in enumerate(card_data.get("sections") or []):
+        block = reference_block(section.get("answer", ""))
+        if block is not None:
+            blocks[index] = block
+    return blocks
+
+
+class ReferenceOutputStore:
+    """SQLite-backed store of reference solution outputs."""
+
+    def __init__(self, cache_dir: str | Path = "review_cache"):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.cache_dir / "reference_outputs.db", check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS reference_output (
+                code_hash TEXT PRIMARY KEY,
+                language TEXT NOT NULL,
+                stdout TEXT NOT NULL,
+                exit_code INTEGER NOT NULL,
+                executed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def get(self, block: CodeBlock) -> Optional[ReferenceOutput]:
+        """Stored output of a block, or None if it has not run yet."""
+        return self.get_many([block]).get(block.key)
+
+    def get_many(self, blocks: list[CodeBlock]) -> dict[str, ReferenceOutput]:
+        """Stored outputs of several blocks, by block key."""
+        keys = list({block.key for block in blocks})
+        if not keys:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT code_hash, language, stdout, exit_code, executed_at "
+                "FROM reference_output "
+                f"WHERE code_hash IN ({', '.join('?' * len(keys))})",
+                keys,
+            ).fetchall()
+        return {
+            code_hash: ReferenceOutput(
+                language=language,
+                stdout=stdout,
+                exit_code=exit_code,
+                executed_at=executed_at,
+            )
+            for code_hash, language, stdout, exit_code, executed_at in rows
+        }
+
+    def put(self, block: CodeBlock, stdout: str, exit_code: int) -> None:
+        """Store the output of a block."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reference_output "
+                "(code_hash, language, stdout, exit_code, executed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (block.key, block.language, stdout, exit_code, time.time()),
+            )
+
+
+class ReferenceRunner:
+    """Background task that runs the reference solutions of synced cards."""
+
+    def __init__(self, scheduler: ExecutionScheduler, store: ReferenceOutputStore):
+        self.scheduler = scheduler
+        self.store = store
+        self._pending: OrderedDict[str, CodeBlock] = OrderedDict()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+    def _unrun_blocks(self, cards: list[dict]) -> list[CodeBlock]:
+        blocks = {
+            block.key: block
+            for card in cards
+            for block in card_reference_blocks(card).values()
+        }
+        stored = self.store.get_many(list(blocks.values()))
+        return [block for key, block in blocks.items() if key not in stored]
+
+    async def schedule(self, cards: list[dict]) -> int:
+        """
+        Queue the reference solutions of `cards` that have not run yet.
+
+        Returns the number of newly queued blocks.
+        """
+        # Extraction and the store lookup are blocking; keep them off the loop
+        blocks = await asyncio.to_thread(self._unrun_blocks, cards)
+        queued = 0
+        for block in blocks:
+            if block.key not in self._pending:
+                self._pending[block.key] = block
+                queued += 1
+        if queued:
+            logger.info(f"Queued {queued} reference solutions to pre-run")
+            if self._wakeup:
+                self._wakeup.set()
+        return queued
+
+    def pending(self) -> int:
+        """Number of blocks waiting to run."""
+        return len(self._pending)
+
+    async def run_pending(self) -> int:
+        """
+        Run queued blocks one at a time until the queue is empty.
+
+        A block that fails to execute is dropped; it is queued again by the
+        next sync. A block killed by the batch timeout is stored like any
+        other result (exit code TIMEOUT_EXIT_CODE), so it is not run again.
+        Returns the number of outputs stored.
+        """
+        stored = 0
+        while self._pending:
+            _, block = self._pending.popitem(last=False)
+            try:
+                # Batch priority: interactive runs always go first
+                result = await self.scheduler.run(
+                    block.language, block.code, priority=BATCH
+                )
+                if result.exit_code == TIMEOUT_EXIT_CODE:
+                    logger.warning(
+                        f"{block.language} reference {block.key} timed out; "
+                        "storing it as is"
+                    )
+                await asyncio.to_thread(
+                    self.store.put, block, result.stdout, result.exit_code
+                )
+                stored += 1
+            except Exception as e:
+                logger.warning(f"Failed to pre-run {block.language} reference: {e}")
+
+        if stored:
+            logger.info(f"Stored {stored} reference solution outputs")
+        return stored
+
+    async def _run(self) -> None:
+        """Run queued blocks whenever a sync queues new ones."""
+        logger.info("Reference runner started")
+        self._wakeup = wakeup = asyncio.Event()
+        while self._running:
+            try:
+                await self.run_pending()
+                await wakeup.wait()
+                wakeup.clear()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in reference runner: {e}")
+                await asyncio.sleep(REFERENCE_RETRY_SECONDS)
+
+        logger.info("Reference runner stopped")
+
+    def start(self) -> None:
+        """Start the background runner task."""
+        if self._running:
+            logger.warning("Reference runner already running")
+            return
+
+        self._running = True
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background runner task."""
+        if not self._running:
+            return
+
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._wakeup = None
+
+    def is_running(self) -> bool:
+        """Check if the runner is running."""
+        return self._running
@@ -0,0 +1,209 @@
+"""
+Append-only local log of review results.
+
+Every section review and every completed card is appended to a SQLite table
+(one narrow row per result: card, deck, section, outcome, timestamp,
+latency). Rows are never updated, and the statistics below are single
+aggregate scans over indexed columns, so analytics never need to crawl
+Mochi.
+"""
+
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReviewLogEntry:
+    """One review result; section_index is None for a whole card."""
+
+    card_id: str
+    remembered: bool
+    section_index: Optional[int] = None
+    deck_id: Optional[str] = None
+    reviewed_at: Optional[datetime] = None
+    latency_ms: Optional[int] = None
+
+
+@dataclass
+class DeckAccuracy:
+    """Section-level review outcomes for one deck."""
+
+    deck_id: str
+    reviews: int
+    remembered: int
+
+    @property
+    def accuracy(self) -> float:
+        """Fraction of section reviews remembered."""
+        return self.remembered / self.reviews if self.reviews else 0.0
+
+
+class ReviewHistory:
+    """SQLite-backed, append-only review log."""
+
+    def __init__(self, cache_dir: str | Path = "review_cache"):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.cache_dir / "review_history.db", check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # section_index is NULL for the aggregate result of a completed card
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS review_log (
+                id INTEGER PRIMARY KEY,
+                card_id TEXT NOT NULL,
+                deck_id TEXT,
+                section_index INTEGER,
+                remembered INTEGER NOT NULL,
+                reviewed_at REAL NOT NULL,
+                latency_ms INTEGER
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS review_log_time ON review_log (reviewed_at)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS review_log_deck "
+            "ON review_log (deck_id, reviewed_at)"
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def record(
+        self,
+        card_id: str,
+        remembered: bool,
+        section_index: Optional[int] = None,
+        deck_id: Optional[str] = None,
+        reviewed_at: Optional[datetime] = None,
+        latency_ms: Optional[int] = None,
+    ) -> None:
+        """Append one review result (section_index None for a whole card)."""
+        self.record_many(
+            [
+                ReviewLogEntry(
+                    card_id=card_id,
+                    remembered=remembered,
+                    section_index=section_index,
+                    deck_id=deck_id,
+                    reviewed_at=reviewed_at,
+                    latency_ms=latency_ms,
+                )
+            ]
+        )
+
+    def record_many(self, entries: list[ReviewLogEntry]) -> None:
+        """Append several review results in one transaction."""
+        now = datetime.now(timezone.utc)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO review_log (card_id, deck_id, section_index, "
+                "remembered, reviewed_at, latency_ms) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        entry.card_id,
+                        entry.deck_id,
+                        entry.section_index,
+                        int(entry.remembered),
+                        (entry.reviewed_at or now).timestamp(),
+                        entry.latency_ms,
+                    )
+                    for entry in entries
+                ],
+            )
+
+    def count(self) -> int:
+        """Number of completed card reviews logged."""
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM review_log WHERE section_index IS NULL"
+            ).fetchone()
+        return count
+
+    def retention(self, since: Optional[datetime] = None) -> Optional[float]:
+        """Fraction of completed cards remembered, or None if none were."""
+        with self._lock:
+            reviews, remembered = self._conn.execute(
+                "SELECT COUNT(*), SUM(remembered) FROM review_log "
+                "WHERE section_index IS NULL AND reviewed_at >= ?",
+                (since.timestamp() if since else 0,),
+            ).fetchone()
+        return remembered / reviews if reviews else None
+
+    def deck_accuracy(self, since: Optional[datetime] = None) -> list[DeckAccuracy]:
+        """Section-level accuracy per deck, most reviewed deck first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT deck_id, COUNT(*), SUM(remembered) FROM review_log "
+                "WHERE section_index IS NOT NULL AND deck_id IS NOT NULL "
+                "AND reviewed_at >= ? GROUP BY deck_id ORDER BY COUNT(*) DESC",
+                (since.timestamp() if since else 0,),
+            ).fetchall()
+        return [
+            DeckAccuracy(deck_id=deck_id, reviews=reviews, remembered=remembered)
+            for deck_id, reviews, remembered in rows
+        ]
+
+    def review_days(self) -> list[date]:
+        """Distinct (UTC) days with at least one review, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT date(reviewed_at, 'unixepoch') AS day "
+                "FROM review_log ORDER BY day"
+            ).fetchall()
+        return [date.fromisoformat(day) for (day,) in rows]
+
+    def current_streak(self, today: Optional[date] = None) -> int:
+        """
+        Consecutive days with reviews, ending today.
+
+        A streak is not broken until a whole day passes without reviews, so
+        one that ended yesterday still counts.
+        """
+        return _current_streak(self.review_days(), today)
+
+    def longest_streak(self) -> int:
+        """Longest run of consecutive days with reviews."""
+        return _longest_streak(self.review_days())
+
+    def streaks(self, today: Optional[date] = None) -> tuple[int, int]:
+        """(current_streak, longest_streak), from a single read of the log."""
+        days = self.review_days()
+        return _current_streak(days, today), _longest_streak(days)
+
+
+def _current_streak(days: list[date], today: Optional[date] = None) -> int:
+    today = today or datetime.now(timezone.utc).date()
+    day_set = set(days)
+    day = today if today in day_set else today - timedelta(days=1)
+    streak = 0
+    while day in day_set:
+        streak += 1
+        day -= timedelta(days=1)
+    return streak
+
+
+def _longest_streak(days: list[date]) -> int:
+    longest = run = 0
+    previous: Optional[date] = None
+    for day in days:
+        run = run + 1 if previous and day - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = day
+    return longest
@@ -0,0 +1,370 @@
+"""
+Durable outbox for completed card reviews.
+
+Completed reviews are committed to a local SQLite database and acknowledged
+immediately. OutboxWorker uploads them to Mochi in the background, in batches,
+retrying failures with exponential backoff. Each review carries an idempotency
+key (card ID + review timestamp), so enqueueing the same review twice is a
+no-op and a retried upload always sends the same review date.
+
+Uploads Mochi rejects outright (a 4xx other than 408 or 429, e.g. for a card
+deleted since) can never succeed; those reviews are moved to a dead-letter
+table instead of being retried.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import requests
+
+from mochi_client import MochiClient
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = 20
+OUTBOX_POLL_SECONDS = 30
+OUTBOX_MAX_BACKOFF_SECONDS = 15 * 60
+
+# A claimed review is hidden from other workers for this long while uploading
+OUTBOX_CLAIM_SECONDS = 60
+
+# Client errors that may succeed when retried
+RETRYABLE_CLIENT_ERRORS = (408, 429)
+
+
+def is_permanent_failure(error: Exception) -> bool:
+    """Whether an upload that raised `error` can never succeed."""
+    if not isinstance(error, requests.HTTPError) or error.response is None:
+        return False
+    status = error.response.status_code
+    return 400 <= status < 500 and status not in RETRYABLE_CLIENT_ERRORS
+
+
+@dataclass
+class PendingReview:
+    """A completed review waiting to be uploaded to Mochi."""
+
+    review_id: str
+    card_id: str
+    remembered: bool
+    reviewed_at: datetime
+    attempts: int = 0
+
+
+class ReviewOutbox:
+    """SQLite-backed queue of reviews not yet acknowledged by Mochi."""
+
+    def __init__(self, cache_dir: str | Path = "review_cache"):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.cache_dir / "review_outbox.db", check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Reviews are acknowledged to the user once committed; make that durable
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outbox (
+                review_id TEXT PRIMARY KEY,
+                card_id TEXT NOT NULL,
+                remembered INTEGER NOT NULL,
+                reviewed_at TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0,
+                last_error TEXT
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS outbox_next_attempt "
+            "ON outbox (next_attempt_at, reviewed_at)"
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outbox_dead_letter (
+                review_id TEXT PRIMARY KEY,
+                card_id TEXT NOT NULL,
+                remembered INTEGER NOT NULL,
+                reviewed_at TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                failed_at REAL NOT NULL,
+                last_error TEXT
+            )
+            """
+        )
+        self._conn.commit()
+
+    def enqueue(
+        self,
+        card_id: str,
+        remembered: bool,
+        reviewed_at: Optional[datetime] = None,
+    ) -> PendingReview:
+        """Durably record a completed review for upload."""
+        [pending] = self.enqueue_many([(card_id, remembered, reviewed_at)])
+        return pending
+
+    def enqueue_many(
+        self, reviews: list[tuple[str, bool, Optional[datetime]]]
+    ) -> list[PendingReview]:
+        """Durably record several (card_id, remembered, reviewed_at) reviews.
+
+        All are committed in one transaction; reviewed_at defaults to now.
+        """
+        now = datetime.now(timezone.utc)
+        pending = []
+        for card_id, remembered, reviewed_at in reviews:
+            reviewed_at = reviewed_at or now
+            pending.append(
+                PendingReview(
+                    review_id=f"{card_id}:{int(reviewed_at.timestamp() * 1000)}",
+                    card_id=card_id,
+                    remembered=remembered,
+                    reviewed_at=reviewed_at,
+                )
+            )
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO outbox "
+                "(review_id, card_id, remembered, reviewed_at) VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        review.review_id,
+                        review.card_id,
+                        int(review.remembered),
+                        review.reviewed_at.isoformat(),
+                    )
+                    for review in pending
+                ],
+            )
+
+        for review in pending:
+            logger.info(f"Queued review {review.review_id} for upload to Mochi")
+        return pending
+
+    def get_batch(self, limit: int = OUTBOX_BATCH_SIZE) -> list[PendingReview]:
+        """
+        Claim the oldest reviews whose retry backoff has elapsed.
+
+        Claimed reviews are not handed out again (to this or another worker
+        sharing the database) for OUTBOX_CLAIM_SECONDS, unless marked failed.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            # Take the write lock up front so two workers never claim one review
+            self._conn.execute("BEGIN IMMEDIATE")
+            rows = self._conn.execute(
+                "SELECT review_id, card_id, remembered, reviewed_at, attempts "
+                "FROM outbox WHERE next_attempt_at <= ? "
+                "ORDER BY reviewed_at LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE outbox SET next_attempt_at = ? WHERE review_id = ?",
+                [(now + OUTBOX_CLAIM_SECONDS, row[0]) for row in rows],
+            )
+
+        return [
+            PendingReview(
+                review_id=review_id,
+                card_id=card_id,
+                remembered=bool(remembered),
+                reviewed_at=datetime.fromisoformat(reviewed_at),
+                attempts=attempts,
+            )
+            for review_id, card_id, remembered, reviewed_at, attempts in rows
+        ]
+
+    def mark_sent(self, review_id: str) -> None:
+        """Remove a review that Mochi has accepted."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM outbox WHERE review_id = ?", (review_id,))
+
+    def mark_failed(self, review_id: str, error: str) -> None:
+        """Schedule a failed upload for retry with exponential backoff."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT attempts FROM outbox WHERE review_id = ?", (review_id,)
+            ).fetchone()
+            if row is None:
+                return
+            attempts = row[0] + 1
+            backoff = min(OUTBOX_MAX_BACKOFF_SECONDS, 2**attempts)
+            self._conn.execute(
+                "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ? "
+                "WHERE review_id = ?",
+                (attempts, time.time() + backoff, error, review_id),
+            )
+
+    def mark_dead(self, review_id: str, error: str) -> None:
+        """Move a review Mochi will never accept to the dead-letter table."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO outbox_dead_letter "
+                "(review_id, card_id, remembered, reviewed_at, attempts, "
+                "failed_at, last_error) "
+                "SELECT review_id, card_id, remembered, reviewed_at, attempts + 1, "
+                "?, ? FROM outbox WHERE review_id = ?",
+                (time.time(), error, review_id),
+            )
+            self._conn.execute("DELETE FROM outbox WHERE review_id = ?", (review_id,))
+
+    def pending_count(self) -> int:
+        """Number of reviews waiting to be uploaded."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def pending_reviews(self) -> list[PendingReview]:
+        """Every review waiting to be uploaded, oldest first, without claiming."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT review_id, card_id, remembered, reviewed_at, attempts "
+                "FROM outbox ORDER BY reviewed_at"
+            ).fetchall()
+        return [
+            PendingReview(
+                review_id=review_id,
+                card_id=card_id,
+                remembered=bool(remembered),
+                reviewed_at=datetime.fromisoformat(reviewed_at),
+                attempts=attempts,
+            )
+            for review_id, card_id, remembered, reviewed_at, attempts in rows
+        ]
+
+    def dead_letter_count(self) -> int:
+        """Number of reviews Mochi rejected permanently."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM outbox_dead_letter"
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class OutboxWorker:
+    """Background task that drains the review outbox to Mochi."""
+
+    def __init__(self, mochi_client: MochiClient, outbox: ReviewOutbox):
+        self.mochi = mochi_client
+        self.outbox = outbox
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+    def notify(self) -> None:
+        """Wake the worker to upload newly queued reviews."""
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """
+        Upload every review that is ready to send.
+
+        Returns the number of reviews accepted by Mochi.
+        """
+        sent = 0
+        while True:
+            # The outbox commits with synchronous=FULL; keep it off the loop
+            batch = await asyncio.to_thread(self.outbox.get_batch)
+            if not batch:
+                break
+
+            failed = 0
+            for review in batch:
+                try:
+                    await asyncio.to_thread(
+                        self.mochi.update_card_review,
+                        review.card_id,
+                        remembered=review.remembered,
+                        reviewed_at=review.reviewed_at,
+                    )
+                except Exception as e:
+                    if is_permanent_failure(e):
+                        logger.error(
+                            f"Mochi rejected review {review.review_id}, "
+                            f"moving it to the dead-letter table: {e}"
+                        )
+                        await asyncio.to_thread(
+                            self.outbox.mark_dead, review.review_id, str(e)
+                        )
+                        continue
+                    logger.warning(
+                        f"Failed to upload review {review.review_id} "
+                        f"(attempt {review.attempts + 1}): {e}"
+                    )
+                    await asyncio.to_thread(
+                        self.outbox.mark_failed, review.review_id, str(e)
+                    )
+                    failed += 1
+                else:
+                    await asyncio.to_thread(self.outbox.mark_sent, review.review_id)
+                    sent += 1
+
+            # Everything left is backing off; wait for the next wakeup
+            if failed:
+                break
+
+        if sent:
+            logger.info(f"Uploaded {sent} reviews to Mochi")
+        return sent
+
+    async def _run(self) -> None:
+        """Upload on every notify, and periodically to retry failures."""
+        logger.info("Review outbox worker started")
+        self._wakeup = wakeup = asyncio.Event()
+        while self._running:
+            try:
+                await self.flush()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=OUTBOX_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                wakeup.clear()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in review outbox worker: {e}")
+                await asyncio.sleep(OUTBOX_POLL_SECONDS)
+
+        logger.info("Review outbox worker stopped")
+
+    def start(self) -> None:
+        """Start the background upload task."""
+        if self._running:
+            logger.warning("Review outbox worker already running")
+            return
+
+        self._running = True
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background upload task."""
+        if not self._running:
+            return
+
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def is_running(self) -> bool:
+        """Check if the worker is running."""
+        return self._running
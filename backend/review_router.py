@@ -2,55 +2,251 @@
 Review API endpoints integrated with Mochi.
 
 Endpoints:
-- GET /api/due - Get all due cards from Mochi
-- POST /api/review - Submit a section review
+- GET /api/due - Get due cards (served from the local cache while fresh),
+  optionally paginated, filtered by deck and reduced to summaries
+- GET /api/due/count - Count cards due now or within a lookahead window,
+  answered from the local due index
+- GET /api/cards/{card_id} - Get one card with its sections
+- GET /api/cards/{card_id}/reference - Expected outputs of the card's
+  reference solutions (pre-run in the background after each sync)
+- GET /api/events - Stream sync results (Server-Sent Events)
+- POST /api/review - Submit a section review (completed cards are queued
+  for upload to Mochi)
+- POST /api/review/batch - Submit many section reviews at once
+- GET /api/stats - Review statistics from the local review history
 """
 
+import asyncio
+import base64
+import bisect
+import hashlib
+import json
 import logging
+import os
+from datetime import datetime, timedelta, timezone
 from functools import lru_cache
-
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-
+from typing import Literal
+
+import requests
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, model_validator
+
+from deck_cache import DeckCache
+from execution_router import get_execution_scheduler
+from fast_json import FastJSONResponse
+from fsrs_scheduler import FSRSScheduler
 from mochi_client import Card, MochiClient
-from review_storage import ReviewCache
+from reference_runs import (
+    ReferenceOutputStore,
+    ReferenceRunner,
+    card_reference_blocks,
+)
+from review_history import ReviewHistory, ReviewLogEntry
+from review_outbox import OutboxWorker, ReviewOutbox
+from review_storage import DUE_CACHE_FRESH_MINUTES, MAX_CARD_SECTIONS, ReviewCache
+from review_storage_sqlite import SqliteReviewCache
+from sync import SyncLeader, SyncManager
+from sync_events import KEEPALIVE_SECONDS, SyncEventBroker
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api")
 
+# Most section reviews accepted by one POST /api/review/batch
+MAX_BATCH_REVIEWS = 500
+
+# Largest page of cards /api/due returns when paginating
+MAX_DUE_PAGE_SIZE = 200
+
+# Furthest ahead /api/due/count looks
+MAX_LOOKAHEAD_DAYS = 365
+
+# Card fields returned by /api/due?fields=summary
+SUMMARY_FIELDS = ("id", "deck_id", "name", "total_sections")
+
 
 class ReviewRequest(BaseModel):
     card_id: str
-    section_index: int
+    section_index: int = Field(ge=0, lt=MAX_CARD_SECTIONS)
     remembered: bool
-    total_sections: int
+    total_sections: int = Field(ge=1, le=MAX_CARD_SECTIONS)
+    # Time the user took to answer, if the client measured it
+    latency_ms: int | None = Field(default=None, ge=0)
+    # When the review happened, for reviews submitted later (defaults to now)
+    reviewed_at: datetime | None = None
+
+    @model_validator(mode="after")
+    def check_section_in_card(self) -> "ReviewRequest":
+        if self.section_index >= self.total_sections:
+            raise ValueError("section_index must be less than total_sections")
+        return self
 
 
 class ReviewResponse(BaseModel):
     success: bool
     card_complete: bool
     synced_to_mochi: bool
+    queued_for_sync: bool = False
     sections_reviewed: int
     total_sections: int
     aggregate_remembered: bool | None = None
 
 
+class BatchReviewRequest(BaseModel):
+    reviews: list[ReviewRequest] = Field(min_length=1, max_length=MAX_BATCH_REVIEWS)
+
+
+class BatchReviewResponse(BaseModel):
+    success: bool
+    results: list[ReviewResponse]
+    cards_completed: int
+
+
 class DueCardsResponse(BaseModel):
     cards: list[dict]
     total_due: int
+    # "live" (just fetched), "fresh" (cached), "refreshing" (stale cache,
+    # background refresh started)
+    sync_status: str = "live"
+    cache_age_seconds: float | None = None
+    # Pass as `cursor` to get the next page; None on the last page
+    next_cursor: str | None = None
+    # Changes whenever the cached due cards do (also sent as the ETag)
+    version: str | None = None
+
+
+class DueCountResponse(BaseModel):
+    due: int
+    lookahead_days: int
+
+
+class DeckStats(BaseModel):
+    deck_id: str
+    reviews: int
+    accuracy: float
+
+
+class StatsResponse(BaseModel):
+    total_reviews: int
+    retention: float | None
+    retention_30d: float | None
+    current_streak_days: int
+    longest_streak_days: int
+    decks: list[DeckStats]
+
+
+class SectionReference(BaseModel):
+    section_index: int
+    language: str
+    # "ready" once the reference solution has run, else "pending"
+    status: Literal["ready", "pending"]
+    stdout: str | None = None
+    exit_code: int | None = None
+
+
+class ReferenceOutputsResponse(BaseModel):
+    card_id: str
+    sections: list[SectionReference]
+
+
+def get_cache_dir() -> str:
+    """Directory of the local cache, outbox and history databases.
+
+    Set REVIEW_CACHE_DIR to keep them somewhere other than ./review_cache.
+    """
+    return os.environ.get("REVIEW_CACHE_DIR", "review_cache")
 
 
 @lru_cache
 def get_mochi_client() -> MochiClient:
-    """Get singleton MochiClient instance."""
-    return MochiClient()
+    """Get singleton MochiClient instance.
+
+    Set DUE_SCHEDULER=fsrs to schedule reviewed cards locally with FSRS
+    instead of waiting for Mochi's due dates.
+    """
+    deck_cache = DeckCache(get_cache_dir())
+    if os.environ.get("DUE_SCHEDULER", "mochi") == "fsrs":
+        return MochiClient(deck_cache=deck_cache, scheduler=FSRSScheduler())
+    return MochiClient(deck_cache=deck_cache)
 
 
 @lru_cache
 def get_review_cache() -> ReviewCache:
-    """Get singleton ReviewCache instance."""
-    return ReviewCache()
+    """Get singleton ReviewCache instance.
+
+    Set REVIEW_CACHE_BACKEND=sqlite to use the SQLite storage engine, or
+    REVIEW_CACHE_COMPRESS=1 to gzip the JSON due cards cache.
+    """
+    if os.environ.get("REVIEW_CACHE_BACKEND", "json") == "sqlite":
+        return SqliteReviewCache(get_cache_dir())
+    return ReviewCache(
+        get_cache_dir(), compress=os.environ.get("REVIEW_CACHE_COMPRESS") == "1"
+    )
+
+
+@lru_cache
+def get_review_outbox() -> ReviewOutbox:
+    """Get singleton ReviewOutbox instance."""
+    return ReviewOutbox(get_cache_dir())
+
+
+@lru_cache
+def get_review_history() -> ReviewHistory:
+    """Get singleton ReviewHistory instance."""
+    return ReviewHistory(get_cache_dir())
+
+
+@lru_cache
+def get_outbox_worker() -> OutboxWorker:
+    """Get singleton OutboxWorker instance."""
+    return OutboxWorker(get_mochi_client(), get_review_outbox())
+
+
+@lru_cache
+def get_reference_store() -> ReferenceOutputStore:
+    """Get singleton ReferenceOutputStore instance."""
+    return ReferenceOutputStore(get_cache_dir())
+
+
+@lru_cache
+def get_reference_runner() -> ReferenceRunner | None:
+    """Get singleton ReferenceRunner instance.
+
+    Set PRERUN_REFERENCE_SOLUTIONS=0 to not pre-run reference solutions
+    after syncs; returns None then.
+    """
+    if os.environ.get("PRERUN_REFERENCE_SOLUTIONS", "1") == "0":
+        return None
+    return ReferenceRunner(get_execution_scheduler(), get_reference_store())
+
+
+@lru_cache
+def get_sync_events() -> SyncEventBroker:
+    """Get singleton SyncEventBroker instance."""
+    return SyncEventBroker()
+
+
+@lru_cache
+def get_sync_manager() -> SyncManager:
+    """Get singleton SyncManager instance."""
+    return SyncManager(
+        mochi_client=get_mochi_client(),
+        review_cache=get_review_cache(),
+        card_to_dict=card_to_dict,
+        events=get_sync_events(),
+        leader=SyncLeader(get_review_cache().cache_dir),
+        reference_runner=get_reference_runner(),
+        outbox=get_review_outbox(),
+    )
 
 
 def card_to_dict(card: Card) -> dict:
@@ -67,63 +263,340 @@ def card_to_dict(card: Card) -> dict:
     }
 
 
-@router.get("/due")
+def _utc(value: datetime | None) -> datetime | None:
+    """Treat naive client timestamps as UTC."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def summarize_card(card_data: dict) -> dict:
+    """Project a cached card onto the fields needed to list it."""
+    return {field: card_data.get(field) for field in SUMMARY_FIELDS}
+
+
+def _encode_cursor(position: int) -> str:
+    raw = json.dumps({"after": position}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)["after"]
+    except (TypeError, KeyError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # bool is an int too, but never a position we handed out
+    if not isinstance(position, int) or isinstance(position, bool) or position < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return position
+
+
+def _due_etag(version: str, *query) -> str:
+    """ETag for one view (deck, page, projection) of a due card version.
+
+    Deliberately weak. Two responses with this tag hold the same cards for
+    the same query, but not the same bytes: sync_status and
+    cache_age_seconds change while the cache version stays put, and
+    GZipMiddleware may compress the body without touching the ETag. A
+    strong ETag promises byte-identical bodies, so it would be wrong here.
+    A weak one still allows the 304 revalidation this endpoint needs.
+    """
+    view = hashlib.blake2b(json.dumps(query).encode(), digest_size=6).hexdigest()
+    return f'W/"{version}-{view}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag.removeprefix("W/")
+        for candidate in if_none_match.split(",")
+    )
+
+
+def _page_start(positions: list[int], cursor: str | None) -> int:
+    """Index of the first card after `cursor`.
+
+    The cursor holds the sync position of the last card of the previous
+    page. Positions do not shift when cards are removed (e.g. reviewed), so
+    the next page starts right after it even if earlier cards are gone.
+    """
+    if cursor is None:
+        return 0
+    return bisect.bisect_right(positions, _decode_cursor(cursor))
+
+
+@router.get("/due", response_model=DueCardsResponse)
 async def get_due_cards(
-    mochi: MochiClient = Depends(get_mochi_client),
+    request: Request,
+    background_tasks: BackgroundTasks,
+    deck_id: str | None = None,
+    limit: int | None = Query(default=None, ge=1, le=MAX_DUE_PAGE_SIZE),
+    cursor: str | None = None,
+    fields: Literal["full", "summary"] = "full",
     cache: ReviewCache = Depends(get_review_cache),
-) -> DueCardsResponse:
-    """Get all cards due for review from Mochi."""
-    logger.info("Fetching due cards from Mochi")
+    sync_manager: SyncManager = Depends(get_sync_manager),
+) -> Response:
+    """
+    Get cards due for review.
+
+    Answers from the local cache when one exists. If the cache is older than
+    DUE_CACHE_FRESH_MINUTES it is still returned, and a refresh from Mochi
+    runs in the background. Only a missing cache waits on Mochi.
+
+    Without `limit` every due card is returned. With it, cards come in pages
+    of at most `limit`; pass the returned `next_cursor` as `cursor` to get the
+    next page. `deck_id` restricts the cards to one deck, and
+    `fields=summary` returns only SUMMARY_FIELDS per card (fetch the full card
+    from /api/cards/{card_id} when it is shown).
+
+    Responses carry an ETag derived from the cache version (a hash of the
+    due cards computed when they were synced) and the query. A request whose
+    If-None-Match still matches gets 304 Not Modified without the cards
+    being read.
+
+    The cards come straight from our own cache, so the response is encoded
+    without being re-validated against DueCardsResponse.
+    """
+    version = cache.get_cache_version()
+    cache_age = cache.get_cache_age_seconds()
+
+    if version is not None and cache_age is not None:
+        if cache_age < DUE_CACHE_FRESH_MINUTES * 60:
+            sync_status = "fresh"
+        else:
+            logger.info("Due cards cache is stale, refreshing in background")
+            background_tasks.add_task(sync_manager.request_sync)
+            sync_status = "refreshing"
+        cache_age = round(cache_age, 1)
+
+        etag = _due_etag(version, deck_id, limit, cursor, fields)
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(
+                status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"}
+            )
+        cached = cache.get_cached_due_positions() or []
+    else:
+        logger.info("No cached due cards, fetching from Mochi")
+        try:
+            await sync_manager.sync_due_cards()
+        except Exception as e:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Failed to fetch due cards from Mochi: {str(e)}",
+            )
+        cached = cache.get_cached_due_positions() or []
+        logger.info(f"Found {len(cached)} due cards")
+        sync_status = "live"
+        cache_age = 0.0
+        version = cache.get_cache_version()
+
+    headers = {}
+    if version is not None:
+        headers["ETag"] = _due_etag(version, deck_id, limit, cursor, fields)
+        headers["Cache-Control"] = "no-cache"
+
+    if deck_id:
+        cached = [entry for entry in cached if entry[1].get("deck_id") == deck_id]
+
+    start = _page_start([position for position, _ in cached], cursor)
+    end = len(cached) if limit is None else start + limit
+    page = [card for _, card in cached[start:end]]
+    next_cursor = (
+        _encode_cursor(cached[end - 1][0]) if page and end < len(cached) else None
+    )
+
+    return FastJSONResponse(
+        DueCardsResponse.model_construct(
+            cards=[summarize_card(card) for card in page]
+            if fields == "summary"
+            else page,
+            total_due=len(cached),
+            sync_status=sync_status,
+            cache_age_seconds=cache_age,
+            next_cursor=next_cursor,
+            version=version,
+        ),
+        headers=headers,
+    )
+
 
+@router.get("/due/count", response_model=DueCountResponse)
+async def get_due_count(
+    deck_id: str | None = None,
+    lookahead_days: int = Query(default=0, ge=0, le=MAX_LOOKAHEAD_DAYS),
+    mochi: MochiClient = Depends(get_mochi_client),
+):
+    """
+    Count cards due now, or within the next `lookahead_days` days.
+
+    Answered from the due index, which every sync rebuilds and every
+    submitted review reschedules, so no request goes to Mochi. Only an index
+    that has never been built (no sync has run yet) waits on a crawl.
+    """
     try:
-        cards = mochi.get_due_cards()
-        cards_data = [card_to_dict(card) for card in cards]
+        if not mochi.due_index.is_built():
+            await asyncio.to_thread(mochi.refresh_due_index)
+        cards = await asyncio.to_thread(
+            mochi.query_due_cards, deck_id, lookahead_days=lookahead_days
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=503, detail=f"Failed to fetch due cards from Mochi: {e}"
+        )
+    return DueCountResponse(due=len(cards), lookahead_days=lookahead_days)
 
-        # Cache for faster subsequent loads
-        cache.cache_due_cards(cards_data)
 
-        logger.info(f"Found {len(cards)} due cards")
-        return DueCardsResponse(cards=cards_data, total_due=len(cards))
+@router.get("/cards/{card_id}", response_model=dict)
+async def get_card(
+    card_id: str,
+    cache: ReviewCache = Depends(get_review_cache),
+    mochi: MochiClient = Depends(get_mochi_client),
+) -> Response:
+    """Get one card with its sections, from the cache or else from Mochi."""
+    cached_card = cache.get_cached_card(card_id)
+    if cached_card is not None:
+        return FastJSONResponse(cached_card)
 
+    try:
+        card = await asyncio.to_thread(mochi.get_card, card_id)
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            raise HTTPException(status_code=404, detail="Card not found")
+        raise HTTPException(status_code=503, detail=f"Failed to fetch card: {e}")
     except Exception as e:
-        logger.error(f"Failed to fetch due cards from Mochi: {e}")
+        raise HTTPException(status_code=503, detail=f"Failed to fetch card: {e}")
+    return FastJSONResponse(card_to_dict(card))
 
-        # Try to return cached data if available
-        cached = cache.get_cached_due_cards()
-        if cached:
-            logger.info("Returning cached due cards")
-            return DueCardsResponse(cards=cached, total_due=len(cached))
 
-        raise HTTPException(
-            status_code=503, detail=f"Failed to fetch due cards from Mochi: {str(e)}"
+@router.get("/cards/{card_id}/reference", response_model=ReferenceOutputsResponse)
+async def get_reference_outputs(
+    card_id: str,
+    cache: ReviewCache = Depends(get_review_cache),
+    store: ReferenceOutputStore = Depends(get_reference_store),
+):
+    """
+    Expected outputs of a due card's reference solutions.
+
+    Lists every section whose answer contains a runnable code block. Once
+    the block has been pre-run, its output is included, so a run of the
+    learner's attempt can be compared against it without executing the
+    reference again.
+    """
+    card = cache.get_cached_card(card_id)
+    if card is None:
+        raise HTTPException(status_code=404, detail="Card not found")
+
+    blocks = card_reference_blocks(card)
+    outputs = await asyncio.to_thread(store.get_many, list(blocks.values()))
+
+    sections = []
+    for index, block in blocks.items():
+        output = outputs.get(block.key)
+        sections.append(
+            SectionReference(
+                section_index=index,
+                language=block.language,
+                status="ready" if output else "pending",
+                stdout=output.stdout if output else None,
+                exit_code=output.exit_code if output else None,
+            )
         )
+    return ReferenceOutputsResponse(card_id=card_id, sections=sections)
+
+
+@router.get("/events")
+async def stream_sync_events(
+    request: Request,
+    events: SyncEventBroker = Depends(get_sync_events),
+) -> StreamingResponse:
+    """
+    Stream sync results as Server-Sent Events.
+
+    Sends a `hello` event with the current version, then a `sync` event with
+    the card-level diff after every sync that changes the due cards. If the
+    client falls behind the stream is closed; it should reconnect and reload
+    /api/due.
+    """
+    queue = events.subscribe()
+
+    async def stream():
+        try:
+            yield f"event: hello\ndata: {json.dumps({'version': events.version})}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), timeout=KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield event.to_sse()
+        finally:
+            events.unsubscribe(queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/review", response_model=ReviewResponse)
 async def submit_review(
     req: ReviewRequest,
-    mochi: MochiClient = Depends(get_mochi_client),
     cache: ReviewCache = Depends(get_review_cache),
+    outbox: ReviewOutbox = Depends(get_review_outbox),
+    worker: OutboxWorker = Depends(get_outbox_worker),
+    sync_manager: SyncManager = Depends(get_sync_manager),
+    history: ReviewHistory = Depends(get_review_history),
+    mochi: MochiClient = Depends(get_mochi_client),
 ):
     """
     Submit a section review.
 
     Tracks section reviews locally. When all sections of a card are reviewed,
-    syncs the aggregate result to Mochi (forgot if ANY section was forgot).
+    the aggregate result (forgot if ANY section was forgot) is written to the
+    review outbox and uploaded to Mochi in the background. Section and card
+    results are also appended to the local review history.
     """
     logger.info(
         f"Review submitted: card={req.card_id}, section={req.section_index}, "
         f"remembered={req.remembered}"
     )
 
+    # Reviewing makes background sync run more often
+    sync_manager.note_activity()
+
     # Record this section's review
-    progress = cache.record_section_review(
+    progress = await asyncio.to_thread(
+        cache.record_section_review,
         card_id=req.card_id,
         section_index=req.section_index,
         remembered=req.remembered,
         total_sections=req.total_sections,
     )
 
+    cached_card = cache.get_cached_card(req.card_id)
+    deck_id = cached_card.get("deck_id") if cached_card else None
+    await asyncio.to_thread(
+        history.record,
+        req.card_id,
+        req.remembered,
+        section_index=req.section_index,
+        deck_id=deck_id,
+        reviewed_at=_utc(req.reviewed_at),
+        latency_ms=req.latency_ms,
+    )
+
     # Check if all sections are reviewed
     if progress.is_complete():
         aggregate_result = progress.get_aggregate_result()
@@ -132,39 +605,186 @@ async def submit_review(
             f"{'remembered' if aggregate_result else 'forgot'}"
         )
 
-        # Sync to Mochi
-        try:
-            mochi.update_card_review(req.card_id, remembered=aggregate_result)
-            logger.info(f"Synced card {req.card_id} to Mochi")
-
-            # Clear in-progress tracking
-            cache.complete_card_review(req.card_id)
+        # Durably queue for Mochi; the outbox worker uploads it
+        pending = await asyncio.to_thread(
+            outbox.enqueue,
+            req.card_id,
+            remembered=aggregate_result,
+            reviewed_at=_utc(req.reviewed_at),
+        )
+        worker.notify()
+        # Reschedule locally now rather than once the upload lands
+        mochi.due_index.record_review(
+            req.card_id, aggregate_result, pending.reviewed_at
+        )
+        await asyncio.to_thread(
+            history.record,
+            req.card_id,
+            aggregate_result,
+            deck_id=deck_id,
+            reviewed_at=pending.reviewed_at,
+        )
 
-            # Clear due cards cache since it's now stale
-            cache.clear_cache()
+        # Clear in-progress tracking
+        await asyncio.to_thread(cache.complete_card_review, req.card_id)
 
-            return ReviewResponse(
-                success=True,
-                card_complete=True,
-                synced_to_mochi=True,
-                sections_reviewed=len(progress.section_reviews),
-                total_sections=req.total_sections,
-                aggregate_remembered=aggregate_result,
-            )
+        # The card is no longer due; keep the rest of the cache warm
+        await asyncio.to_thread(cache.remove_cached_card, req.card_id)
 
-        except Exception as e:
-            logger.error(f"Failed to sync to Mochi: {e}")
-            raise HTTPException(
-                status_code=503,
-                detail=f"Failed to sync review to Mochi: {str(e)}",
-            )
+        return ReviewResponse(
+            success=True,
+            card_complete=True,
+            synced_to_mochi=False,
+            queued_for_sync=True,
+            sections_reviewed=progress.sections_reviewed(),
+            total_sections=req.total_sections,
+            aggregate_remembered=aggregate_result,
+        )
 
     # Not complete yet, just record locally
     return ReviewResponse(
         success=True,
         card_complete=False,
         synced_to_mochi=False,
-        sections_reviewed=len(progress.section_reviews),
+        sections_reviewed=progress.sections_reviewed(),
         total_sections=req.total_sections,
         aggregate_remembered=None,
     )
+
+
+@router.post("/review/batch", response_model=BatchReviewResponse)
+async def submit_review_batch(
+    batch: BatchReviewRequest,
+    cache: ReviewCache = Depends(get_review_cache),
+    outbox: ReviewOutbox = Depends(get_review_outbox),
+    worker: OutboxWorker = Depends(get_outbox_worker),
+    sync_manager: SyncManager = Depends(get_sync_manager),
+    history: ReviewHistory = Depends(get_review_history),
+    mochi: MochiClient = Depends(get_mochi_client),
+):
+    """
+    Submit many section reviews, possibly across several cards, at once.
+
+    Reviews are applied in order, exactly as if each had been POSTed to
+    /api/review, but all section progress is written in a single update
+    and every card completed by the batch is queued for Mochi in one outbox
+    transaction. Useful for fast reviewers and for catching up after being
+    offline (set reviewed_at on each review).
+    """
+    logger.info(f"Batch of {len(batch.reviews)} section reviews submitted")
+    sync_manager.note_activity()
+
+    progresses = await asyncio.to_thread(
+        cache.record_section_reviews,
+        [
+            (req.card_id, req.section_index, req.remembered, req.total_sections)
+            for req in batch.reviews
+        ],
+    )
+
+    deck_ids = {}
+    for req in batch.reviews:
+        if req.card_id not in deck_ids:
+            cached_card = cache.get_cached_card(req.card_id)
+            deck_ids[req.card_id] = cached_card.get("deck_id") if cached_card else None
+
+    # A card can complete more than once in a batch (e.g. a one-section card
+    # reviewed twice); only its first completion is queued, logged and counted
+    first_completions: dict[str, int] = {}
+    for index, (req, progress) in enumerate(zip(batch.reviews, progresses)):
+        if progress.is_complete():
+            first_completions.setdefault(req.card_id, index)
+    completed = [
+        (batch.reviews[index], progresses[index])
+        for index in first_completions.values()
+    ]
+    queued = set(first_completions.values())
+
+    # Durably queue every completed card for Mochi in one transaction
+    pending = await asyncio.to_thread(
+        outbox.enqueue_many,
+        [
+            (req.card_id, progress.get_aggregate_result(), _utc(req.reviewed_at))
+            for req, progress in completed
+        ],
+    )
+    if pending:
+        worker.notify()
+    for review in pending:
+        mochi.due_index.record_review(
+            review.card_id, review.remembered, review.reviewed_at
+        )
+
+    await asyncio.to_thread(
+        history.record_many,
+        [
+            ReviewLogEntry(
+                card_id=req.card_id,
+                remembered=req.remembered,
+                section_index=req.section_index,
+                deck_id=deck_ids[req.card_id],
+                reviewed_at=_utc(req.reviewed_at),
+                latency_ms=req.latency_ms,
+            )
+            for req in batch.reviews
+        ]
+        + [
+            ReviewLogEntry(
+                card_id=review.card_id,
+                remembered=review.remembered,
+                deck_id=deck_ids[review.card_id],
+                reviewed_at=review.reviewed_at,
+            )
+            for review in pending
+        ],
+    )
+
+    # Completed cards are no longer due; keep the rest of the cache warm
+    if completed:
+        await asyncio.to_thread(
+            cache.remove_cached_cards, [req.card_id for req, _ in completed]
+        )
+
+    return BatchReviewResponse(
+        success=True,
+        results=[
+            ReviewResponse(
+                success=True,
+                card_complete=progress.is_complete(),
+                synced_to_mochi=False,
+                queued_for_sync=index in queued,
+                sections_reviewed=progress.sections_reviewed(),
+                total_sections=req.total_sections,
+                aggregate_remembered=(
+                    progress.get_aggregate_result() if progress.is_complete() else None
+                ),
+            )
+            for index, (req, progress) in enumerate(zip(batch.reviews, progresses))
+        ],
+        cards_completed=len(completed),
+    )
+
+
+def _review_stats(history: ReviewHistory) -> StatsResponse:
+    month_ago = datetime.now(timezone.utc) - timedelta(days=30)
+    current_streak, longest_streak = history.streaks()
+    return StatsResponse(
+        total_reviews=history.count(),
+        retention=history.retention(),
+        retention_30d=history.retention(since=month_ago),
+        current_streak_days=current_streak,
+        longest_streak_days=longest_streak,
+        decks=[
+            DeckStats(
+                deck_id=deck.deck_id, reviews=deck.reviews, accuracy=deck.accuracy
+            )
+            for deck in history.deck_accuracy()
+        ],
+    )
+
+
+@router.get("/stats", response_model=StatsResponse)
+async def get_stats(history: ReviewHistory = Depends(get_review_history)):
+    """Review statistics, computed from the local review history."""
+    # The history queries are blocking SQLite reads
+    return await asyncio.to_thread(_review_stats, history)
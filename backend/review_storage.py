@@ -5,19 +5,49 @@ Stores:
 - Cached due cards from Mochi (for faster initial loads)
 - In-progress section reviews for the current card
 - Last sync timestamp for periodic sync
+
+Everything lives on disk in cache_dir so that several uvicorn workers can
+share one cache: files are replaced atomically, and in-progress reviews are
+updated under an inter-process lock.
 """
 
+import gzip
+import hashlib
 import json
 import logging
-from dataclasses import dataclass
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
+from file_lock import FileLock
+from metrics import REVIEW_CACHE_LOOKUPS
+
 logger = logging.getLogger(__name__)
 
 SYNC_INTERVAL_MINUTES = 30
 
+# /api/due serves cached cards younger than this without contacting Mochi;
+# older caches are still served, but trigger a background refresh.
+DUE_CACHE_FRESH_MINUTES = 5
+
+# In-progress reviews of cards not touched for this long are abandoned
+SESSION_TTL_HOURS = 24
+
+# At most this many in-progress card reviews are kept
+SESSION_MAX_CARDS = 1000
+
+# Sections are tracked as bits of an int, so cap how many a card may have
+MAX_CARD_SECTIONS = 256
+
+# gzip level for the due cards cache when compression is enabled
+CACHE_COMPRESS_LEVEL = 6
+
 
 @dataclass
 class SectionReview:
@@ -29,43 +59,146 @@ class SectionReview:
 
 @dataclass
 class CardReviewProgress:
-    """Tracks in-progress review for a card with multiple sections."""
+    """Tracks in-progress review for a card with multiple sections.
+
+    Section results are bitsets: bit i of `reviewed_mask` is set once section
+    i has been reviewed, and the same bit of `forgot_mask` if it was forgot.
+    """
 
     card_id: str
     total_sections: int
-    section_reviews: list[SectionReview]
+    reviewed_mask: int = 0
+    forgot_mask: int = 0
+    updated_at: float = field(default_factory=time.time)
+
+    @property
+    def section_reviews(self) -> list[SectionReview]:
+        """Reviewed sections in index order."""
+        return [
+            SectionReview(
+                section_index=index, remembered=not self.forgot_mask >> index & 1
+            )
+            for index in range(self.reviewed_mask.bit_length())
+            if self.reviewed_mask >> index & 1
+        ]
+
+    def sections_reviewed(self) -> int:
+        """Number of distinct sections reviewed."""
+        return self.reviewed_mask.bit_count()
 
     def is_complete(self) -> bool:
         """Check if all sections have been reviewed."""
-        return len(self.section_reviews) >= self.total_sections
+        return self.sections_reviewed() >= self.total_sections
 
     def add_section_review(self, section_index: int, remembered: bool) -> None:
         """Record a section review result."""
+        if not 0 <= section_index < self.total_sections:
+            raise ValueError(
+                f"Section {section_index} out of range "
+                f"for a card with {self.total_sections} sections"
+            )
+        bit = 1 << section_index
         # Don't add duplicate reviews for same section
-        if any(r.section_index == section_index for r in self.section_reviews):
+        if self.reviewed_mask & bit:
             return
-        self.section_reviews.append(
-            SectionReview(section_index=section_index, remembered=remembered)
-        )
+        self.reviewed_mask |= bit
+        if not remembered:
+            self.forgot_mask |= bit
+        self.updated_at = time.time()
 
     def get_aggregate_result(self) -> bool:
         """Get final result: False if ANY section was forgot, else True."""
-        if not self.section_reviews:
-            return True
-        return all(r.remembered for r in self.section_reviews)
+        return not self.forgot_mask
+
+
+def _write_atomic(path: Path, payload: bytes) -> None:
+    """Write bytes to a temp file and rename it over `path`.
+
+    Readers in other processes see either the old or the new file, never a
+    partially written one, and the data is on disk before the rename.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _write_json_atomic(path: Path, data: dict, **dump_kwargs) -> None:
+    """Write JSON atomically (see _write_atomic)."""
+    _write_atomic(path, json.dumps(data, **dump_kwargs).encode())
+
+
+def _encode_cache(data: dict, compress: bool) -> bytes:
+    """Compact JSON encoding of the due cards cache, gzipped if `compress`."""
+    payload = json.dumps(data, separators=(",", ":"), default=str).encode()
+    if compress:
+        # mtime=0 keeps the output stable for identical data
+        payload = gzip.compress(payload, compresslevel=CACHE_COMPRESS_LEVEL, mtime=0)
+    return payload
+
+
+def cards_version(cards: list[dict]) -> str:
+    """Content hash of a due card list, used as its version token / ETag."""
+    encoded = json.dumps(cards, separators=(",", ":"), sort_keys=True, default=str)
+    return hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
+
+
+def _decode_cache(payload: bytes, compressed: bool) -> dict:
+    if compressed:
+        payload = gzip.decompress(payload)
+    return json.loads(payload)
+
+
+def _file_signature(path: Path) -> Optional[tuple[int, int, int]]:
+    """(mtime_ns, size, inode) of `path`, or None if it does not exist.
+
+    An atomic replace changes the inode even when mtime and size match.
+    """
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _card_positions(data: dict) -> list[int]:
+    """Sync positions of the cards in a cache file, in order."""
+    cards = data.get("cards") or []
+    positions = data.get("positions")
+    if positions is None or len(positions) != len(cards):
+        # Written before positions were stored
+        return list(range(len(cards)))
+    return positions
 
 
 class ReviewCache:
     """Simple cache for Mochi review data."""
 
-    def __init__(self, cache_dir: str = "review_cache"):
+    def __init__(self, cache_dir: str = "review_cache", compress: bool = False):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
-        self._in_progress: dict[str, CardReviewProgress] = {}
+        self.compress = compress
+        self._sessions = ReviewSessionStore(self.cache_dir)
         self._last_sync: Optional[datetime] = None
+        # Parsed due cards cache file, valid while the file signature matches.
+        # Writes may run in a worker thread, so the memo is guarded.
+        self._cache_data: Optional[dict] = None
+        self._cache_signature: Optional[tuple[int, int, int]] = None
+        self._cache_lock = threading.Lock()
+        # Serializes every change to the cache file, across threads and
+        # workers, so a read-modify-write never overwrites a newer sync
+        self._write_lock = FileLock(self.cache_dir / "due_cards.lock")
 
     def _get_cache_file(self) -> Path:
         """Get the cache file path."""
+        if self.compress:
+            return self.cache_dir / "due_cards_cache.json.gz"
         return self.cache_dir / "due_cards_cache.json"
 
     def _deduplicate_cards(self, cards: list[dict]) -> list[dict]:
@@ -87,50 +220,151 @@ class ReviewCache:
 
         return unique_cards
 
+    def _read_cache_file(self) -> Optional[dict]:
+        """Parsed due cards cache file, re-read only if it changed on disk.
+
+        Another worker may have rewritten the file; a stat() per call is
+        enough to notice, so unchanged reads skip the JSON parse entirely.
+        """
+        cache_file = self._get_cache_file()
+        with self._cache_lock:
+            signature = _file_signature(cache_file)
+            if signature == self._cache_signature:
+                return self._cache_data
+
+            data = None
+            if signature is not None:
+                try:
+                    data = _decode_cache(cache_file.read_bytes(), self.compress)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Ignoring unreadable due cards cache: {e}")
+            self._remember_cache_file(data, signature)
+            return data
+
+    def _remember_cache_file(
+        self, data: Optional[dict], signature: Optional[tuple[int, int, int]]
+    ) -> None:
+        self._cache_data = data
+        self._cache_signature = signature
+        last_sync_str = data.get("last_sync") if data else None
+        self._last_sync = (
+            datetime.fromisoformat(last_sync_str) if last_sync_str else None
+        )
+
+    def _write_cache_file(self, data: dict) -> None:
+        cache_file = self._get_cache_file()
+        # Version and encode outside the lock so concurrent readers keep the
+        # old memo
+        data = {**data, "version": cards_version(data.get("cards") or [])}
+        payload = _encode_cache(data, self.compress)
+        with self._cache_lock:
+            _write_atomic(cache_file, payload)
+            self._remember_cache_file(data, _file_signature(cache_file))
+
     def cache_due_cards(self, cards: list[dict]) -> None:
         """Cache due cards from Mochi with deduplication."""
         # Deduplicate cards before caching
         unique_cards = self._deduplicate_cards(cards)
 
-        cache_file = self._get_cache_file()
-        with open(cache_file, "w") as f:
-            json.dump(
+        with self._write_lock:
+            self._write_cache_file(
                 {
                     "cards": unique_cards,
+                    "positions": list(range(len(unique_cards))),
                     "last_sync": datetime.now(timezone.utc).isoformat(),
-                },
-                f,
-                indent=2,
-                default=str,
+                }
             )
-        self._last_sync = datetime.now(timezone.utc)
         logger.info(f"Cached {len(unique_cards)} due cards")
 
     def get_cached_due_cards(self) -> Optional[list[dict]]:
         """Get cached due cards, if available."""
-        cache_file = self._get_cache_file()
-        if cache_file.exists():
-            with open(cache_file, "r") as f:
-                data = json.load(f)
-                return data.get("cards")
+        data = self._read_cache_file()
+        cards = data.get("cards") if data else None
+        REVIEW_CACHE_LOOKUPS.inc(
+            lookup="due_cards", result="miss" if cards is None else "hit"
+        )
+        # Callers get their own list; the card dicts are shared with the cache
+        return list(cards) if cards is not None else None
+
+    def get_cached_due_positions(self) -> Optional[list[tuple[int, dict]]]:
+        """Cached due cards with their sync positions, in order, if available.
+
+        A card's position is its index in the sync that cached it. Removing
+        other cards does not change it, so it is a stable key to page on.
+        """
+        data = self._read_cache_file()
+        cards = data.get("cards") if data else None
+        REVIEW_CACHE_LOOKUPS.inc(
+            lookup="due_cards", result="miss" if cards is None else "hit"
+        )
+        if cards is None:
+            return None
+        return list(zip(_card_positions(data), cards))
+
+    def get_cached_card(self, card_id: str) -> Optional[dict]:
+        """Get a single cached due card by ID."""
+        data = self._read_cache_file()
+        for card in (data or {}).get("cards") or []:
+            if card.get("id") == card_id:
+                REVIEW_CACHE_LOOKUPS.inc(lookup="card", result="hit")
+                return card
+        REVIEW_CACHE_LOOKUPS.inc(lookup="card", result="miss")
         return None
 
+    def remove_cached_card(self, card_id: str) -> bool:
+        """Drop one card from the due cards cache, keeping the rest.
+
+        Returns True if the card was cached.
+        """
+        return self.remove_cached_cards([card_id]) > 0
+
+    def remove_cached_cards(self, card_ids: list[str]) -> int:
+        """Drop several cards from the due cards cache with a single rewrite.
+
+        Returns the number of cards removed.
+        """
+        drop = set(card_ids)
+        # Held from read to write, so a sync landing in between is not lost
+        with self._write_lock:
+            data = self._read_cache_file()
+            if data is None:
+                return 0
+
+            cards = data.get("cards") or []
+            kept = [
+                (position, card)
+                for position, card in zip(_card_positions(data), cards)
+                if card.get("id") not in drop
+            ]
+            removed = len(cards) - len(kept)
+            if removed:
+                self._write_cache_file(
+                    {
+                        **data,
+                        "cards": [card for _, card in kept],
+                        "positions": [position for position, _ in kept],
+                    }
+                )
+        return removed
+
+    def get_cache_version(self) -> Optional[str]:
+        """Version token of the cached due cards, computed when they were
+        written; changes whenever the cached cards do."""
+        data = self._read_cache_file()
+        return data.get("version") if data else None
+
     def get_last_sync_time(self) -> Optional[datetime]:
         """Get the last sync timestamp."""
-        # Check in-memory first
-        if self._last_sync:
-            return self._last_sync
+        # In-memory unless another worker has rewritten the file
+        self._read_cache_file()
+        return self._last_sync
 
-        # Try to read from cache file
-        cache_file = self._get_cache_file()
-        if cache_file.exists():
-            with open(cache_file, "r") as f:
-                data = json.load(f)
-                last_sync_str = data.get("last_sync")
-                if last_sync_str:
-                    self._last_sync = datetime.fromisoformat(last_sync_str)
-                    return self._last_sync
-        return None
+    def get_cache_age_seconds(self) -> Optional[float]:
+        """Seconds since the last sync, or None if never synced."""
+        last_sync = self.get_last_sync_time()
+        if last_sync is None:
+            return None
+        return (datetime.now(timezone.utc) - last_sync).total_seconds()
 
     def needs_sync(self) -> bool:
         """Check if sync is needed based on time elapsed."""
@@ -145,40 +379,223 @@ class ReviewCache:
     def clear_cache(self) -> None:
         """Clear the due cards cache."""
         cache_file = self._get_cache_file()
-        if cache_file.exists():
-            cache_file.unlink()
-        self._last_sync = None
+        with self._write_lock, self._cache_lock:
+            if cache_file.exists():
+                cache_file.unlink()
+            self._remember_cache_file(None, None)
 
     def start_card_review(
         self, card_id: str, total_sections: int
     ) -> CardReviewProgress:
         """Start tracking a new card review."""
-        progress = CardReviewProgress(
-            card_id=card_id, total_sections=total_sections, section_reviews=[]
-        )
-        self._in_progress[card_id] = progress
-        return progress
+        return self._sessions.start(card_id, total_sections)
 
     def get_card_progress(self, card_id: str) -> Optional[CardReviewProgress]:
         """Get in-progress review for a card."""
-        return self._in_progress.get(card_id)
+        return self._sessions.get(card_id)
 
     def record_section_review(
         self, card_id: str, section_index: int, remembered: bool, total_sections: int
     ) -> CardReviewProgress:
         """Record a section review and return updated progress."""
-        progress = self._in_progress.get(card_id)
+        return self._sessions.record(card_id, section_index, remembered, total_sections)
+
+    def complete_card_review(self, card_id: str) -> Optional[CardReviewProgress]:
+        """Mark card review as complete and return final progress."""
+        return self._sessions.pop(card_id)
+
+    def record_section_reviews(
+        self, reviews: list[tuple[str, int, bool, int]]
+    ) -> list[CardReviewProgress]:
+        """
+        Record several (card_id, section_index, remembered, total_sections)
+        section reviews at once.
+
+        Applied in order and all-or-nothing. Returns each card's progress
+        after each review; cards that become complete are no longer tracked.
+        """
+        return self._sessions.record_many(reviews)
+
+
+class ReviewSessionStore:
+    """
+    Bounded store of in-progress card reviews, shared by all workers.
+
+    Every change is written through to in_progress.json under an
+    inter-process lock; the file is re-read only when another worker has
+    changed it. Sessions untouched for SESSION_TTL_HOURS are dropped, and
+    beyond SESSION_MAX_CARDS the least recently updated are evicted.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        max_sessions: int = SESSION_MAX_CARDS,
+        ttl_seconds: float = SESSION_TTL_HOURS * 3600,
+    ):
+        self.path = Path(cache_dir) / "in_progress.json"
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        # Least recently updated first
+        self._sessions: OrderedDict[str, CardReviewProgress] = OrderedDict()
+        self._signature: Optional[tuple[int, int, int]] = None
+        self._lock = FileLock(Path(cache_dir) / "in_progress.lock")
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, card_id: str) -> Optional[CardReviewProgress]:
+        """In-progress review for a card, if any."""
+        with self._lock:
+            self._reload()
+            return self._sessions.get(card_id)
+
+    def start(self, card_id: str, total_sections: int) -> CardReviewProgress:
+        """Start (or restart) tracking a card review."""
+        with self._lock:
+            self._reload()
+            progress = self._start(card_id, total_sections)
+            self._save()
+        return progress
+
+    def record(
+        self, card_id: str, section_index: int, remembered: bool, total_sections: int
+    ) -> CardReviewProgress:
+        """Record a section review and return updated progress."""
+        with self._lock:
+            self._reload()
+            before = self._snapshot()
+            try:
+                progress = self._record(
+                    card_id, section_index, remembered, total_sections
+                )
+                self._save()
+            except BaseException:
+                self._sessions = before
+                raise
+        return progress
+
+    def record_many(
+        self, reviews: list[tuple[str, int, bool, int]]
+    ) -> list[CardReviewProgress]:
+        """
+        Record (card_id, section_index, remembered, total_sections) reviews
+        in order, with a single write.
+
+        Returns a snapshot of each card's progress after each review. Cards
+        that become complete stop being tracked, as with pop().
+        """
+        results = []
+        with self._lock:
+            self._reload()
+            before = self._snapshot()
+            try:
+                for card_id, section_index, remembered, total_sections in reviews:
+                    progress = self._record(
+                        card_id, section_index, remembered, total_sections
+                    )
+                    if progress.is_complete():
+                        del self._sessions[card_id]
+                    results.append(replace(progress))
+                self._save()
+            except BaseException:
+                self._sessions = before
+                raise
+        return results
+
+    def _snapshot(self) -> OrderedDict[str, CardReviewProgress]:
+        """Copy of the sessions, restored if a change cannot be saved."""
+        return OrderedDict((k, replace(v)) for k, v in self._sessions.items())
+
+    def _record(
+        self, card_id: str, section_index: int, remembered: bool, total_sections: int
+    ) -> CardReviewProgress:
+        progress = self._sessions.get(card_id)
 
         # Reset progress if total_sections changed (e.g., switching to card-level review)
         if progress and progress.total_sections != total_sections:
             progress = None
 
         if not progress:
-            progress = self.start_card_review(card_id, total_sections)
+            progress = self._start(card_id, total_sections)
 
         progress.add_section_review(section_index, remembered)
+        self._sessions.move_to_end(card_id)
         return progress
 
-    def complete_card_review(self, card_id: str) -> Optional[CardReviewProgress]:
-        """Mark card review as complete and return final progress."""
-        return self._in_progress.pop(card_id, None)
+    def pop(self, card_id: str) -> Optional[CardReviewProgress]:
+        """Stop tracking a card review and return its final progress."""
+        with self._lock:
+            self._reload()
+            progress = self._sessions.pop(card_id, None)
+            if progress is not None:
+                self._save()
+        return progress
+
+    def _start(self, card_id: str, total_sections: int) -> CardReviewProgress:
+        progress = CardReviewProgress(card_id=card_id, total_sections=total_sections)
+        self._sessions[card_id] = progress
+        self._sessions.move_to_end(card_id)
+        return progress
+
+    def _evict(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        while self._sessions:
+            card_id, progress = next(iter(self._sessions.items()))
+            if (
+                progress.updated_at >= cutoff
+                and len(self._sessions) <= self.max_sessions
+            ):
+                break
+            del self._sessions[card_id]
+
+    def _reload(self) -> None:
+        """Re-read the file if another worker changed it since we last did."""
+        signature = _file_signature(self.path)
+        if signature == self._signature:
+            return
+
+        sessions = []
+        if signature is not None:
+            try:
+                data = json.loads(self.path.read_bytes())
+                sessions = [
+                    CardReviewProgress(
+                        card_id=card_id,
+                        total_sections=total_sections,
+                        reviewed_mask=reviewed_mask,
+                        forgot_mask=forgot_mask,
+                        updated_at=updated_at,
+                    )
+                    for card_id, (
+                        total_sections,
+                        reviewed_mask,
+                        forgot_mask,
+                        updated_at,
+                    ) in data.items()
+                ]
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable in-progress reviews: {e}")
+                return
+
+        sessions.sort(key=lambda progress: progress.updated_at)
+        self._sessions = OrderedDict((p.card_id, p) for p in sessions)
+        self._signature = signature
+        self._evict()
+
+    def _save(self) -> None:
+        self._evict()
+        _write_json_atomic(
+            self.path,
+            {
+                card_id: [
+                    progress.total_sections,
+                    progress.reviewed_mask,
+                    progress.forgot_mask,
+                    progress.updated_at,
+                ]
+                for card_id, progress in self._sessions.items()
+            },
+            separators=(",", ":"),
+        )
+        self._signature = _file_signature(self.path)
@@ -0,0 +1,238 @@
+"""
+SQLite storage engine for ReviewCache.
+
+Same interface as the JSON-file ReviewCache, backed by a WAL-mode SQLite
+database with indexed tables for due cards, decks and sync state. Single-card
+lookups and updates are index operations instead of a rewrite of the whole
+cache, and readers in other workers are never blocked by a writer.
+
+In-progress reviews are kept by the same bounded ReviewSessionStore as the
+JSON engine, so both drop sessions after SESSION_TTL_HOURS and beyond
+SESSION_MAX_CARDS.
+
+Enable with REVIEW_CACHE_BACKEND=sqlite.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from metrics import REVIEW_CACHE_LOOKUPS
+from review_storage import ReviewCache, cards_version
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    deck_id TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cards_position ON cards (position);
+CREATE INDEX IF NOT EXISTS cards_deck ON cards (deck_id, position);
+
+CREATE TABLE IF NOT EXISTS decks (
+    id TEXT PRIMARY KEY,
+    due_count INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SqliteReviewCache(ReviewCache):
+    """ReviewCache stored in review_cache/review_cache.db."""
+
+    def __init__(self, cache_dir: str = "review_cache"):
+        super().__init__(cache_dir)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.cache_dir / "review_cache.db", check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._migrate_progress()
+
+    def _migrate_progress(self) -> None:
+        """Move in-progress reviews out of the unbounded tables older
+        versions kept them in."""
+        tables = {
+            name
+            for (name,) in self._conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )
+        }
+        if not {"card_progress", "section_progress"} <= tables:
+            return
+        rows = self._conn.execute(
+            "SELECT c.card_id, s.section_index, s.remembered, c.total_sections "
+            "FROM card_progress c JOIN section_progress s USING (card_id) "
+            "WHERE s.section_index < c.total_sections "
+            "ORDER BY s.rowid"
+        ).fetchall()
+        self._sessions.record_many(
+            [
+                (card_id, section_index, bool(remembered), total_sections)
+                for card_id, section_index, remembered, total_sections in rows
+            ]
+        )
+        with self._conn:
+            self._conn.execute("DROP TABLE section_progress")
+            self._conn.execute("DROP TABLE card_progress")
+        logger.info(f"Migrated {len(rows)} in-progress section reviews")
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def cache_due_cards(self, cards: list[dict]) -> None:
+        """Cache due cards from Mochi with deduplication."""
+        unique_cards = self._deduplicate_cards(cards)
+        now = datetime.now(timezone.utc)
+
+        deck_counts: dict[str, int] = {}
+        for card in unique_cards:
+            deck_id = card.get("deck_id")
+            if deck_id:
+                deck_counts[deck_id] = deck_counts.get(deck_id, 0) + 1
+
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cards")
+            self._conn.executemany(
+                "INSERT INTO cards (id, position, deck_id, data) VALUES (?, ?, ?, ?)",
+                [
+                    (card["id"], position, card.get("deck_id"), json.dumps(card))
+                    for position, card in enumerate(unique_cards)
+                ],
+            )
+            self._conn.execute("DELETE FROM decks")
+            self._conn.executemany(
+                "INSERT INTO decks (id, due_count) VALUES (?, ?)", deck_counts.items()
+            )
+            self._set_state("last_sync", now.isoformat())
+            self._set_state("version", cards_version(unique_cards))
+
+        self._last_sync = now
+        logger.info(f"Cached {len(unique_cards)} due cards")
+
+    def get_cached_due_cards(
+        self, deck_id: Optional[str] = None
+    ) -> Optional[list[dict]]:
+        """Get cached due cards (optionally for one deck), if available."""
+        with self._lock:
+            if self._get_state("last_sync") is None:
+                REVIEW_CACHE_LOOKUPS.inc(lookup="due_cards", result="miss")
+                return None
+            if deck_id:
+                rows = self._conn.execute(
+                    "SELECT data FROM cards WHERE deck_id = ? ORDER BY position",
+                    (deck_id,),
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT data FROM cards ORDER BY position"
+                ).fetchall()
+        REVIEW_CACHE_LOOKUPS.inc(lookup="due_cards", result="hit")
+        return [json.loads(data) for (data,) in rows]
+
+    def get_cached_due_positions(self) -> Optional[list[tuple[int, dict]]]:
+        """Cached due cards with their sync positions, in order, if available."""
+        with self._lock:
+            if self._get_state("last_sync") is None:
+                REVIEW_CACHE_LOOKUPS.inc(lookup="due_cards", result="miss")
+                return None
+            rows = self._conn.execute(
+                "SELECT position, data FROM cards ORDER BY position"
+            ).fetchall()
+        REVIEW_CACHE_LOOKUPS.inc(lookup="due_cards", result="hit")
+        return [(position, json.loads(data)) for position, data in rows]
+
+    def get_cached_card(self, card_id: str) -> Optional[dict]:
+        """Get a single cached due card by ID."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM cards WHERE id = ?", (card_id,)
+            ).fetchone()
+        REVIEW_CACHE_LOOKUPS.inc(lookup="card", result="hit" if row else "miss")
+        return json.loads(row[0]) if row else None
+
+    def remove_cached_card(self, card_id: str) -> bool:
+        """Drop one card from the due cards cache, keeping the rest."""
+        return self.remove_cached_cards([card_id]) > 0
+
+    def remove_cached_cards(self, card_ids: list[str]) -> int:
+        """Drop several cards from the due cards cache in one transaction."""
+        removed = 0
+        with self._lock, self._conn:
+            for card_id in card_ids:
+                row = self._conn.execute(
+                    "SELECT deck_id FROM cards WHERE id = ?", (card_id,)
+                ).fetchone()
+                if row is None:
+                    continue
+                self._conn.execute("DELETE FROM cards WHERE id = ?", (card_id,))
+                self._conn.execute(
+                    "UPDATE decks SET due_count = due_count - 1 WHERE id = ?", row
+                )
+                removed += 1
+            if removed:
+                # Derive the new version rather than re-reading every card
+                self._set_state(
+                    "version",
+                    cards_version(
+                        [{"version": self._get_state("version"), "removed": card_ids}]
+                    ),
+                )
+        return removed
+
+    def get_deck_due_counts(self) -> dict[str, int]:
+        """Number of cached due cards per deck."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT id, due_count FROM decks"))
+
+    def get_cache_version(self) -> Optional[str]:
+        """Version token of the cached due cards."""
+        with self._lock:
+            return self._get_state("version")
+
+    def get_last_sync_time(self) -> Optional[datetime]:
+        """Get the last sync timestamp."""
+        with self._lock:
+            last_sync_str = self._get_state("last_sync")
+        self._last_sync = (
+            datetime.fromisoformat(last_sync_str) if last_sync_str else None
+        )
+        return self._last_sync
+
+    def clear_cache(self) -> None:
+        """Clear the due cards cache."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cards")
+            self._conn.execute("DELETE FROM decks")
+            self._conn.execute(
+                "DELETE FROM sync_state WHERE key IN ('last_sync', 'version')"
+            )
+        self._last_sync = None
+
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT value FROM sync_state WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: str) -> None:
+        self._conn.execute(
+            "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, value),
+        )
@@ -0,0 +1,57 @@
+"""
+Single-flight call coalescing.
+
+Concurrent calls with the same key share one in-flight execution: the first
+caller runs the function and everyone who arrives while it is running waits
+for, and receives, the same result (or exception).
+"""
+
+import threading
+from typing import Any, Callable, Hashable, Optional
+
+
+class _Call:
+    """An in-flight call and its eventual outcome."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Thread-safe coalescing of duplicate concurrent calls."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) unless a call for `key` is already running."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Check if a call for `key` is currently running."""
+        with self._lock:
+            return key in self._calls
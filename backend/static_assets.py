@@ -0,0 +1,204 @@
+"""
+In-memory server for the built frontend (frontend/dist).
+
+The build output is indexed once at startup. Files up to
+MAX_MEMORY_FILE_BYTES are held in memory, together with a precompressed
+gzip variant (and the brotli variant, when the build emitted a `.br` file
+next to the original). Each file gets a strong ETag from its content hash,
+and each encoding its own ETag derived from it (`"<hash>-gz"`, `"<hash>-br"`),
+since the encoded bodies are different bytes.
+
+Requests are answered from the index alone, so neither SPA navigation nor
+asset loads touch the filesystem. Only paths in the index can be served,
+which also rules out path traversal. Vite fingerprints everything under
+/assets, so those files are sent as immutable; index.html must be
+revalidated so that new builds are picked up.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse
+
+logger = logging.getLogger(__name__)
+
+# Larger files (e.g. big source maps) are streamed from disk instead
+MAX_MEMORY_FILE_BYTES = 1024 * 1024
+
+# Smaller bodies are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/javascript",
+    "application/json",
+    "application/manifest+json",
+    "application/wasm",
+    "application/xml",
+    "image/svg+xml",
+)
+
+# ETag suffix of each precompressed variant
+ENCODING_ETAG_SUFFIXES = {"gzip": "gz", "br": "br"}
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+@dataclass
+class StaticAsset:
+    """One indexed file of the frontend build."""
+
+    path: Path
+    media_type: str
+    etag: str
+    cache_control: str
+    # None for files too large to keep in memory
+    body: Optional[bytes] = None
+    gzip_body: Optional[bytes] = None
+    brotli_body: Optional[bytes] = None
+
+
+def _media_type(path: Path) -> str:
+    media_type, _ = mimetypes.guess_type(path.name)
+    return media_type or "application/octet-stream"
+
+
+def _accepts(request: Request, encoding: str) -> bool:
+    """Whether the client accepts a content coding (ignoring q=0)."""
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip() == encoding:
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00")
+    return False
+
+
+def _encoding_etag(etag: str, encoding: Optional[str]) -> str:
+    """ETag of one content coding of a file with identity ETag `etag`."""
+    if encoding is None:
+        return etag
+    return f'{etag[:-1]}-{ENCODING_ETAG_SUFFIXES[encoding]}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+class StaticAssets:
+    """Index of a frontend build directory, served from memory."""
+
+    def __init__(self, dist_dir: Path, index_file: str = "index.html"):
+        self.dist_dir = dist_dir
+        self.index_file = index_file
+        self.assets: dict[str, StaticAsset] = {}
+        self._build_index()
+
+    def _build_index(self) -> None:
+        memory_bytes = 0
+        for path in sorted(self.dist_dir.rglob("*")):
+            if not path.is_file() or path.suffix in (".gz", ".br"):
+                continue
+            name = path.relative_to(self.dist_dir).as_posix()
+            asset = self._load(path, name)
+            self.assets[name] = asset
+            memory_bytes += sum(
+                len(body or b"")
+                for body in (asset.body, asset.gzip_body, asset.brotli_body)
+            )
+        logger.info(
+            f"Indexed {len(self.assets)} frontend files "
+            f"({memory_bytes / 1024:.0f} KiB in memory)"
+        )
+
+    def _load(self, path: Path, name: str) -> StaticAsset:
+        media_type = _media_type(path)
+        cache_control = (
+            IMMUTABLE_CACHE_CONTROL
+            if name.startswith("assets/")
+            else REVALIDATE_CACHE_CONTROL
+        )
+        stat = path.stat()
+        if stat.st_size > MAX_MEMORY_FILE_BYTES:
+            return StaticAsset(
+                path=path,
+                media_type=media_type,
+                etag=f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+                cache_control=cache_control,
+            )
+
+        body = path.read_bytes()
+        asset = StaticAsset(
+            path=path,
+            media_type=media_type,
+            etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+            cache_control=cache_control,
+            body=body,
+        )
+        if len(body) >= MIN_COMPRESS_BYTES and media_type.startswith(
+            COMPRESSIBLE_TYPES
+        ):
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body):
+                asset.gzip_body = compressed
+            brotli_path = path.with_name(path.name + ".br")
+            if brotli_path.is_file():
+                asset.brotli_body = brotli_path.read_bytes()
+        return asset
+
+    def get(self, path: str) -> Optional[StaticAsset]:
+        """Indexed file for a request path, or None."""
+        return self.assets.get(path.lstrip("/"))
+
+    def response(self, request: Request, asset: StaticAsset) -> Response:
+        """Response for an indexed file, honouring If-None-Match and
+        Accept-Encoding."""
+        body, encoding = asset.body, None
+        if asset.brotli_body is not None and _accepts(request, "br"):
+            body, encoding = asset.brotli_body, "br"
+        elif asset.gzip_body is not None and _accepts(request, "gzip"):
+            body, encoding = asset.gzip_body, "gzip"
+
+        etag = _encoding_etag(asset.etag, encoding)
+        headers = {
+            "ETag": etag,
+            "Cache-Control": asset.cache_control,
+        }
+        if asset.gzip_body is not None or asset.brotli_body is not None:
+            headers["Vary"] = "Accept-Encoding"
+
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        if body is None:
+            return FileResponse(
+                asset.path, media_type=asset.media_type, headers=headers
+            )
+
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=asset.media_type, headers=headers)
+
+    def has_index(self) -> bool:
+        """Whether the build has the SPA entry point."""
+        return self.index_file in self.assets
+
+    def index_response(self, request: Request) -> Response:
+        """The SPA entry point, for client-side routes; 404 if the build has
+        none."""
+        index = self.assets.get(self.index_file)
+        if index is None:
+            raise HTTPException(status_code=404, detail="Not found")
+        return self.response(request, index)
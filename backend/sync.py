@@ -1,18 +1,85 @@
 """
 Background sync manager for periodic Mochi API synchronization.
 
-Syncs due cards from Mochi every 30 minutes.
+Syncs due cards from Mochi on an adaptive schedule: every few minutes while
+the user is reviewing, every 30 minutes otherwise, backing off further when
+idle or when syncs keep failing. Intervals are jittered, and a sync can be
+requested on demand.
+
+When several uvicorn workers share a cache directory, only the worker holding
+the SyncLeader lock runs background syncs; the others serve the shared cache.
+Every worker polls the shared cache version and publishes changes to its own
+event subscribers. User activity and sync requests are recorded in the cache
+directory, so the leader sees reviews and refresh requests served by any
+worker.
 """
 
 import asyncio
 import logging
+import os
+import random
+import time
+from pathlib import Path
 from typing import Callable, Optional
 
+from file_lock import FileLock
 from mochi_client import MochiClient
+from reference_runs import ReferenceRunner
+from review_outbox import ReviewOutbox
 from review_storage import SYNC_INTERVAL_MINUTES, ReviewCache
+from sync_events import SyncEventBroker
 
 logger = logging.getLogger(__name__)
 
+# Sync interval while the user has reviewed a card recently
+ACTIVE_SYNC_INTERVAL_MINUTES = 5
+ACTIVE_WINDOW_MINUTES = 15
+
+# Upper bound for idle and error backoff
+MAX_SYNC_INTERVAL_MINUTES = 4 * 60
+
+# First retry delay after a failed sync; doubles with each consecutive failure
+ERROR_RETRY_MINUTES = 1
+
+# Intervals are randomized by +/- this fraction
+SYNC_JITTER = 0.1
+
+# How often each worker checks for sync requests and cache changes to publish
+EVENT_POLL_SECONDS = 5
+
+# Touched on user activity; its mtime is shared by all workers
+ACTIVITY_FILE = "last_activity"
+
+# Touched to ask the leader, whichever worker it is, to sync now
+SYNC_REQUEST_FILE = "sync_requested"
+
+
+class SyncLeader:
+    """Leader election between workers via a non-blocking file lock.
+
+    A follower retries on every check, so it takes over if the leader exits.
+    """
+
+    def __init__(self, cache_dir: str | Path):
+        self._lock = FileLock(Path(cache_dir) / "sync_leader.lock")
+
+    def try_acquire(self) -> bool:
+        """Become leader if no other worker is; returns whether we lead."""
+        if self._lock.is_held():
+            return True
+        if self._lock.acquire(blocking=False):
+            logger.info(f"Worker {os.getpid()} is now the sync leader")
+            return True
+        return False
+
+    def is_leader(self) -> bool:
+        """Check if this worker currently holds leadership."""
+        return self._lock.is_held()
+
+    def release(self) -> None:
+        """Give up leadership."""
+        self._lock.release()
+
 
 class SyncManager:
     """Manages background sync with Mochi API."""
@@ -22,46 +89,220 @@ class SyncManager:
         mochi_client: MochiClient,
         review_cache: ReviewCache,
         card_to_dict: Callable,
+        events: Optional[SyncEventBroker] = None,
+        leader: Optional[SyncLeader] = None,
+        reference_runner: Optional[ReferenceRunner] = None,
+        outbox: Optional[ReviewOutbox] = None,
     ):
         self.mochi = mochi_client
         self.cache = review_cache
         self.card_to_dict = card_to_dict
+        self.events = events
+        self.leader = leader
+        self.reference_runner = reference_runner
+        self.outbox = outbox
         self._sync_task: Optional[asyncio.Task] = None
         self._running = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._current_sync: Optional[asyncio.Future] = None
+        self._activity_file = Path(review_cache.cache_dir) / ACTIVITY_FILE
+        self._sync_request_file = Path(review_cache.cache_dir) / SYNC_REQUEST_FILE
+        # mtime of the last sync request this worker has served
+        self._served_request: Optional[float] = None
+        self._published_version: Optional[str] = None
+        self._consecutive_failures = 0
+        self._idle_syncs = 0
 
     async def sync_due_cards(self) -> int:
         """
         Sync due cards from Mochi API.
 
+        Calls made while a sync is already running share its result.
+
         Returns the number of cards synced.
         """
+        if self._current_sync is None or self._current_sync.done():
+            self._current_sync = asyncio.ensure_future(self._sync())
+        return await asyncio.shield(self._current_sync)
+
+    async def _sync(self) -> int:
         logger.info("Starting sync with Mochi API")
         try:
-            cards = self.mochi.get_due_cards()
+            # The crawl is blocking network I/O; keep it off the event loop
+            cards = await asyncio.to_thread(self.mochi.get_due_cards)
             cards_data = [self.card_to_dict(card) for card in cards]
-            self.cache.cache_due_cards(cards_data)
+            if self.outbox:
+                # Mochi still reports cards whose review is waiting in the
+                # outbox as due; keep them out until the upload lands
+                pending = await asyncio.to_thread(self.outbox.pending_reviews)
+                queued = {review.card_id for review in pending}
+                cards_data = [card for card in cards_data if card["id"] not in queued]
+                # The crawl rebuilt the due index from Mochi's due dates;
+                # reschedule the queued reviews in it again
+                for review in pending:
+                    self.mochi.due_index.record_review(
+                        review.card_id, review.remembered, review.reviewed_at
+                    )
+            # Serializing and fsyncing the cache is blocking too
+            await asyncio.to_thread(self.cache.cache_due_cards, cards_data)
             logger.info(f"Synced {len(cards_data)} due cards from Mochi")
+
+            # Push the card-level diff to connected clients
+            await self.publish_cache_changes()
+
+            # Pre-run new reference solutions in the background
+            if self.reference_runner:
+                try:
+                    await self.reference_runner.schedule(cards_data)
+                except Exception as e:
+                    logger.warning(f"Failed to queue reference solutions: {e}")
+
+            self._consecutive_failures = 0
             return len(cards_data)
         except Exception as e:
+            self._consecutive_failures += 1
             logger.error(f"Failed to sync with Mochi: {e}")
             raise
 
+    async def publish_cache_changes(self) -> None:
+        """Publish the cached due cards to subscribers if their version changed.
+
+        Whichever worker wrote the cache, this worker's subscribers get the diff.
+        """
+        if not self.events:
+            return
+        version = await asyncio.to_thread(self.cache.get_cache_version)
+        if version is None or version == self._published_version:
+            return
+        cards = await asyncio.to_thread(self.cache.get_cached_due_cards)
+        self.events.publish_snapshot(cards or [])
+        self._published_version = version
+
+    def note_activity(self) -> None:
+        """Record user activity (e.g. a review) to sync more often."""
+        self._idle_syncs = 0
+        try:
+            self._activity_file.touch()
+        except OSError as e:
+            logger.warning(f"Failed to record activity: {e}")
+
+    def is_active(self) -> bool:
+        """Check if the user has been active within ACTIVE_WINDOW_MINUTES,
+        as seen by any worker."""
+        try:
+            last_activity = self._activity_file.stat().st_mtime
+        except OSError:
+            return False
+        return time.time() - last_activity < ACTIVE_WINDOW_MINUTES * 60
+
+    def trigger(self) -> None:
+        """Wake the background loop to sync now, coalesced with a pending run."""
+        if self._wakeup:
+            self._wakeup.set()
+
+    def _sync_request_mtime(self) -> Optional[float]:
+        try:
+            return self._sync_request_file.stat().st_mtime
+        except OSError:
+            return None
+
+    def _take_sync_request(self) -> bool:
+        """Whether any worker requested a sync since this one last served one."""
+        requested_at = self._sync_request_mtime()
+        if requested_at is None or requested_at == self._served_request:
+            return False
+        self._served_request = requested_at
+        return True
+
+    async def request_sync(self) -> None:
+        """
+        Sync soon: wake the background loop, or sync inline if it is stopped.
+
+        The request is also recorded in the cache directory, so the leader
+        serves it when this worker is a follower.
+        """
+        if self._running:
+            try:
+                self._sync_request_file.touch()
+            except OSError as e:
+                logger.warning(f"Failed to record sync request: {e}")
+            self.trigger()
+            return
+        try:
+            await self.sync_due_cards()
+        except Exception as e:
+            logger.warning(f"Requested sync failed: {e}")
+
+    def next_interval_seconds(self) -> float:
+        """Seconds until the next scheduled sync, including jitter."""
+        if self._consecutive_failures:
+            minutes = ERROR_RETRY_MINUTES * 2 ** (self._consecutive_failures - 1)
+        elif self.is_active():
+            minutes = ACTIVE_SYNC_INTERVAL_MINUTES
+        else:
+            minutes = SYNC_INTERVAL_MINUTES * 2**self._idle_syncs
+        minutes = min(minutes, MAX_SYNC_INTERVAL_MINUTES)
+
+        return minutes * 60 * random.uniform(1 - SYNC_JITTER, 1 + SYNC_JITTER)
+
+    async def _wait_for_sync(self, wakeup: asyncio.Event, interval: float) -> bool:
+        """
+        Wait out the sync interval, or until a sync is triggered.
+
+        Every EVENT_POLL_SECONDS, check for sync requests from other workers
+        and publish cache changes. Returns whether the wait was cut short by
+        a trigger or a request.
+        """
+        deadline = time.monotonic() + interval
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(
+                    wakeup.wait(), timeout=min(remaining, EVENT_POLL_SECONDS)
+                )
+                # A request recorded along with this trigger is served too
+                self._take_sync_request()
+                return True
+            except asyncio.TimeoutError:
+                pass
+            if self._take_sync_request():
+                return True
+            try:
+                await self.publish_cache_changes()
+            except Exception as e:
+                logger.warning(f"Failed to publish cache changes: {e}")
+
     async def _background_sync_loop(self) -> None:
-        """Background loop that syncs every SYNC_INTERVAL_MINUTES."""
+        """Background loop that syncs on an adaptive schedule."""
         logger.info(
-            f"Background sync started (interval: {SYNC_INTERVAL_MINUTES} minutes)"
+            f"Background sync started (base interval: {SYNC_INTERVAL_MINUTES} minutes)"
         )
+        self._wakeup = wakeup = asyncio.Event()
         while self._running:
             try:
-                # Wait for the sync interval
-                await asyncio.sleep(SYNC_INTERVAL_MINUTES * 60)
+                interval = self.next_interval_seconds()
+                logger.debug(f"Next background sync in {interval / 60:.1f} minutes")
+
+                # Wait for the sync interval, or an on-demand trigger
+                triggered = await self._wait_for_sync(wakeup, interval)
 
                 if not self._running:
                     break
 
-                # Check if sync is actually needed (might have been triggered manually)
-                if self.cache.needs_sync():
+                # Followers only read the cache the leader keeps fresh
+                if self.leader and not self.leader.try_acquire():
+                    logger.debug("Another worker is sync leader, skipping sync")
+                    continue
+
+                # Skip if something else synced recently (e.g. /api/due refresh)
+                cache_age = self.cache.get_cache_age_seconds()
+                if triggered or cache_age is None or cache_age >= interval:
+                    idle = not self.is_active()
                     await self.sync_due_cards()
+                    # Activity may have been noted by another worker
+                    self._idle_syncs = self._idle_syncs + 1 if idle else 0
                 else:
                     logger.debug("Sync not needed, skipping background sync")
 
@@ -71,6 +312,9 @@ class SyncManager:
             except Exception as e:
                 logger.error(f"Error in background sync: {e}")
                 # Continue running even if one sync fails
+            finally:
+                # Triggers that arrived during the sync were served by it
+                wakeup.clear()
 
         logger.info("Background sync stopped")
 
@@ -81,6 +325,8 @@ class SyncManager:
             return
 
         self._running = True
+        # Requests from before this worker started were served by someone else
+        self._served_request = self._sync_request_mtime()
         self._sync_task = asyncio.create_task(self._background_sync_loop())
         logger.info("Sync manager started")
 
@@ -97,6 +343,9 @@ class SyncManager:
             except asyncio.CancelledError:
                 pass
             self._sync_task = None
+        self._wakeup = None
+        if self.leader:
+            self.leader.release()
         logger.info("Sync manager stopped")
 
     def is_running(self) -> bool:
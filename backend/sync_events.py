@@ -0,0 +1,117 @@
+"""
+Server-push of sync results to connected clients.
+
+SyncEventBroker keeps the last synced due-card snapshot. Each time a sync
+changes it, the broker bumps a version number and publishes a card-level diff
+to every subscriber. The diff is streamed to browsers as Server-Sent Events
+by GET /api/events.
+"""
+
+import asyncio
+import json
+import logging
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Events buffered per subscriber before a slow client is disconnected
+SUBSCRIBER_QUEUE_SIZE = 16
+
+# Comment line sent on idle streams so proxies keep the connection open
+KEEPALIVE_SECONDS = 15
+
+
+@dataclass
+class SyncEvent:
+    """Card-level diff between two due-card snapshots."""
+
+    version: int
+    synced_at: str
+    added: list[dict] = field(default_factory=list)
+    updated: list[dict] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    total_due: int = 0
+
+    def to_sse(self) -> str:
+        """Encode as a Server-Sent Events message."""
+        return f"id: {self.version}\nevent: sync\ndata: {json.dumps(asdict(self))}\n\n"
+
+
+class SyncEventBroker:
+    """Fan-out of sync diffs to subscribed clients."""
+
+    def __init__(self):
+        self._version = 0
+        self._snapshot: Optional[dict[str, dict]] = None
+        self._subscribers: set[asyncio.Queue] = set()
+
+    @property
+    def version(self) -> int:
+        """Version of the latest published snapshot."""
+        return self._version
+
+    def subscriber_count(self) -> int:
+        """Number of connected subscribers."""
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a subscriber; events are delivered to the returned queue.
+
+        A None item means the subscriber fell behind and was dropped.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        """Remove a subscriber."""
+        self._subscribers.discard(queue)
+
+    def publish_snapshot(self, cards: list[dict]) -> Optional[SyncEvent]:
+        """
+        Diff a freshly synced card list against the previous one and publish.
+
+        Returns the published event, or None if nothing changed.
+        """
+        snapshot = {card["id"]: card for card in cards if card.get("id")}
+        previous = self._snapshot or {}
+
+        added = [card for card_id, card in snapshot.items() if card_id not in previous]
+        updated = [
+            card
+            for card_id, card in snapshot.items()
+            if card_id in previous and previous[card_id] != card
+        ]
+        removed = [card_id for card_id in previous if card_id not in snapshot]
+
+        first_snapshot = self._snapshot is None
+        self._snapshot = snapshot
+        if not (added or updated or removed or first_snapshot):
+            return None
+
+        self._version += 1
+        event = SyncEvent(
+            version=self._version,
+            synced_at=datetime.now(timezone.utc).isoformat(),
+            added=added,
+            updated=updated,
+            removed=removed,
+            total_due=len(snapshot),
+        )
+
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                logger.warning("Dropping slow sync event subscriber")
+                self._subscribers.discard(queue)
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+        logger.info(
+            f"Published sync v{event.version}: +{len(added)} ~{len(updated)} "
+            f"-{len(removed)} to {len(self._subscribers)} subscribers"
+        )
+        return event
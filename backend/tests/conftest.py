@@ -6,8 +6,10 @@ import pytest
 
 
 @pytest.fixture(scope="session", autouse=True)
-def set_test_environment():
+def set_test_environment(tmp_path_factory):
     """Set up environment variables for testing."""
     # Set a dummy MOCHI_API_KEY for tests
     os.environ["MOCHI_API_KEY"] = "test_api_key_for_testing"
+    # Keep databases the app singletons create out of the source tree
+    os.environ["REVIEW_CACHE_DIR"] = str(tmp_path_factory.mktemp("review_cache"))
     yield
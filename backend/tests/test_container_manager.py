@@ -1,8 +1,11 @@
 import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
 
 import pytest
 
-from container_manager import ContainerManager
+import container_manager
+from container_manager import TIMEOUT_EXIT_CODE, ContainerManager
 
 
 @pytest.fixture
@@ -120,6 +123,14 @@ class TestExecuteCode:
         assert len(result.stdout) <= 10240 + 100
         assert "[Output truncated at 10KB limit]" in result.stdout
 
+    def test_timeout_kills_long_run(self, manager):
+        code = "import time\nprint('started', flush=True)\ntime.sleep(60)"
+        result = manager.execute_code("python", code, timeout=1)
+
+        assert result.exit_code == TIMEOUT_EXIT_CODE
+        assert result.execution_time_ms < 30000
+        assert "[Execution timed out after 1s]" in result.stdout
+
 
 class TestCleanupContainer:
     def test_cleanup_existing_container(self, manager):
@@ -166,3 +177,52 @@ class TestGetUptime:
 
         assert uptime2 > uptime1
         assert uptime2 - uptime1 >= 0.1
+
+
+class TestConcurrentAccess:
+    @pytest.fixture
+    def fake_manager(self, monkeypatch):
+        client = MagicMock()
+        client.created = []
+
+        def create(**kwargs):
+            container = MagicMock(status="running")
+            container.reload.side_effect = lambda: time.sleep(0.01)
+            client.created.append(container)
+            return container
+
+        client.containers.create.side_effect = create
+        monkeypatch.setattr(container_manager.docker, "from_env", lambda: client)
+        return ContainerManager()
+
+    def test_dead_container_recreated_once(self, fake_manager):
+        dead = MagicMock(status="exited")
+        dead.reload.side_effect = lambda: time.sleep(0.01)
+        fake_manager.containers["python"] = dead
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            containers = list(
+                pool.map(lambda _: fake_manager.get_container("python"), range(8))
+            )
+
+        created = fake_manager.client.created
+        assert len(created) == 1
+        assert all(container is created[0] for container in containers)
+        dead.remove.assert_called_once()
+
+    def test_concurrent_cleanup_and_lookup(self, fake_manager):
+        fake_manager.create_container("python")
+
+        def churn(i):
+            if i % 2:
+                fake_manager.cleanup_container("python")
+            else:
+                fake_manager.get_container("python")
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(churn, range(32)))
+
+        # Every container created was either cleaned up or is the live one
+        created = fake_manager.client.created
+        live = [c for c in created if not c.remove.called]
+        assert live == list(fake_manager.containers.values())
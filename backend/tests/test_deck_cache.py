@@ -0,0 +1,99 @@
+"""Tests for deck metadata caching."""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from deck_cache import DeckCache
+from mochi_client import MochiClient
+
+DECKS = [{"id": "deck1"}, {"id": "deck2", "archived?": True}]
+
+
+def deck_response(status_code=200, etag=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = {"ETag": etag} if etag else {}
+    response.json.return_value = {"docs": DECKS}
+    return response
+
+
+@pytest.fixture
+def deck_cache(tmp_path):
+    return DeckCache(cache_dir=tmp_path)
+
+
+@pytest.fixture
+def client(deck_cache):
+    return MochiClient(api_key="test", deck_cache=deck_cache)
+
+
+class TestDeckCache:
+    def test_empty_cache_is_not_fresh(self, deck_cache):
+        assert deck_cache.get_decks() is None
+        assert deck_cache.is_fresh() is False
+
+    def test_store_makes_cache_fresh(self, deck_cache):
+        deck_cache.store(DECKS, etag='"v1"')
+
+        assert deck_cache.get_decks() == DECKS
+        assert deck_cache.is_fresh() is True
+
+    def test_cache_expires_after_ttl(self, deck_cache):
+        deck_cache.store(DECKS)
+        deck_cache._fetched_at = datetime.now(timezone.utc) - timedelta(
+            minutes=deck_cache.ttl_minutes + 1
+        )
+
+        assert deck_cache.is_fresh() is False
+
+    def test_persisted_across_instances(self, deck_cache, tmp_path):
+        deck_cache.store(DECKS, etag='"v1"')
+
+        reloaded = DeckCache(cache_dir=tmp_path)
+
+        assert reloaded.get_decks() == DECKS
+        assert reloaded.etag == '"v1"'
+        assert reloaded.is_fresh() is True
+
+    def test_invalidate(self, deck_cache, tmp_path):
+        deck_cache.store(DECKS)
+        deck_cache.invalidate()
+
+        assert deck_cache.get_decks() is None
+        assert DeckCache(cache_dir=tmp_path).get_decks() is None
+
+
+class TestMochiClientGetDecks:
+    @patch("mochi_client.requests.request")
+    def test_fresh_cache_skips_crawl(self, mock_get, client):
+        mock_get.return_value = deck_response()
+
+        client.get_decks()
+        client.get_decks()
+
+        assert mock_get.call_count == 1
+
+    @patch("mochi_client.requests.request")
+    def test_stale_cache_revalidates_with_etag(self, mock_get, client, deck_cache):
+        deck_cache.store(DECKS, etag='"v1"')
+        deck_cache._fetched_at = None
+        mock_get.return_value = deck_response(status_code=304)
+
+        decks = client.get_decks()
+
+        assert decks == DECKS
+        assert mock_get.call_args.kwargs["headers"]["If-None-Match"] == '"v1"'
+        assert deck_cache.is_fresh() is True
+
+    @patch("mochi_client.requests.request")
+    def test_invalidate_forces_refetch(self, mock_get, client):
+        mock_get.return_value = deck_response(etag='"v2"')
+
+        client.get_decks()
+        client.invalidate_deck_cache()
+        client.get_decks()
+
+        assert mock_get.call_count == 2
+        assert "If-None-Match" not in mock_get.call_args.kwargs["headers"]
@@ -0,0 +1,124 @@
+"""Tests for the local due-date index."""
+
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+
+from deck_cache import DeckCache
+from due_index import NEW_CARD_DUE_KEY, DueIndex, due_key
+from mochi_client import MochiClient
+
+
+def make_card(card_id, due=None, deck_id="deck1", **extra):
+    data = {"id": card_id, "deck-id": deck_id, "content": f"Q {card_id}"}
+    if due:
+        data["reviews"] = [{"due": {"date": f"{due}T10:00:00.000Z"}}]
+    data.update(extra)
+    return data
+
+
+MOCK_DECKS = [
+    {"id": "deck1"},
+    {"id": "deck2"},
+    {"id": "archived_deck", "archived?": True},
+]
+
+MOCK_CARDS = [
+    make_card("overdue", due="2024-01-01"),
+    make_card("today", due="2024-01-10"),
+    make_card("tomorrow", due="2024-01-11"),
+    make_card("next_week", due="2024-01-17", deck_id="deck2"),
+    make_card("new", **{"new?": True}),
+    make_card("unscheduled"),
+    make_card("archived_card", due="2024-01-01", **{"archived?": True}),
+    make_card("in_archived_deck", due="2024-01-01", deck_id="archived_deck"),
+]
+
+
+@pytest.fixture
+def index():
+    idx = DueIndex()
+    idx.rebuild(MOCK_CARDS, {"deck1", "deck2"})
+    return idx
+
+
+def ids(cards):
+    return [c["id"] for c in cards]
+
+
+class TestDueKey:
+    def test_uses_last_review_due_date(self):
+        assert due_key(make_card("c", due="2024-03-05")) == "2024-03-05"
+
+    def test_new_card_is_always_due(self):
+        assert due_key(make_card("c", **{"new?": True})) == NEW_CARD_DUE_KEY
+
+    def test_card_without_reviews_is_not_due(self):
+        assert due_key(make_card("c")) is None
+
+
+class TestDueIndex:
+    def test_excludes_archived_and_unschedulable_cards(self, index):
+        assert len(index) == 5
+
+    def test_query_returns_cards_due_by_date(self, index):
+        assert ids(index.query("2024-01-10")) == ["new", "overdue", "today"]
+
+    def test_query_lookahead(self, index):
+        assert ids(index.query("2024-01-31")) == [
+            "new",
+            "overdue",
+            "today",
+            "tomorrow",
+            "next_week",
+        ]
+
+    def test_query_by_deck(self, index):
+        assert ids(index.query("2024-01-31", deck_id="deck2")) == ["next_week"]
+        assert index.query("2024-01-31", deck_id="archived_deck") == []
+
+    def test_remove_drops_card(self, index):
+        index.remove("today")
+
+        assert ids(index.query("2024-01-10")) == ["new", "overdue"]
+
+    def test_upsert_repositions_card(self, index):
+        index.upsert(make_card("overdue", due="2024-01-20"))
+
+        assert ids(index.query("2024-01-10")) == ["new", "today"]
+        assert "overdue" in ids(index.query("2024-01-20"))
+
+
+class TestMochiClientDueCards:
+    @pytest.fixture
+    def client(self, tmp_path):
+        client = MochiClient(api_key="test", deck_cache=DeckCache(cache_dir=tmp_path))
+        with (
+            patch.object(client, "_get_all_decks", return_value=(MOCK_DECKS, None)),
+            patch.object(client, "_get_all_cards", return_value=MOCK_CARDS),
+        ):
+            yield client
+
+    def test_get_due_cards_filters_by_date(self, client):
+        cards = client.get_due_cards(date=datetime(2024, 1, 10, tzinfo=timezone.utc))
+
+        assert [c.id for c in cards] == ["new", "overdue", "today"]
+
+    def test_get_due_cards_lookahead_and_deck(self, client):
+        cards = client.get_due_cards(
+            deck_id="deck2",
+            date=datetime(2024, 1, 10, tzinfo=timezone.utc),
+            lookahead_days=7,
+        )
+
+        assert [c.id for c in cards] == ["next_week"]
+
+    def test_query_due_cards_does_not_crawl(self, client):
+        client.refresh_due_index()
+        client._get_all_cards.reset_mock()
+
+        cards = client.query_due_cards(date=datetime(2024, 1, 11, tzinfo=timezone.utc))
+
+        assert len(cards) == 4
+        client._get_all_cards.assert_not_called()
@@ -0,0 +1,128 @@
+"""Tests for priority scheduling of code executions."""
+
+import asyncio
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from execution_scheduler import BATCH, INTERACTIVE, ExecutionScheduler
+
+
+class BlockingManager:
+    """Container manager whose executions wait until released."""
+
+    def __init__(self):
+        self.started: list[str] = []
+        self.release = threading.Event()
+
+    def execute_code(self, language: str, code: str, timeout=None):
+        self.started.append(code)
+        self.release.wait(timeout=5)
+        return code
+
+
+async def wait_for(condition, timeout: float = 2.0) -> None:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def manager():
+    return BlockingManager()
+
+
+class TestExecutionScheduler:
+    @pytest.mark.asyncio
+    async def test_runs_execution_off_the_loop(self):
+        manager = MagicMock()
+        manager.execute_code.return_value = "result"
+        scheduler = ExecutionScheduler(manager)
+
+        assert await scheduler.run("python", "print(1)") == "result"
+
+        manager.execute_code.assert_called_once_with("python", "print(1)", timeout=None)
+        summary = scheduler.summary()[INTERACTIVE]
+        assert summary["completed"] == 1
+        assert summary["run_p50_ms"] is not None
+
+    @pytest.mark.asyncio
+    async def test_only_batch_runs_have_a_timeout(self):
+        manager = MagicMock()
+        scheduler = ExecutionScheduler(manager, batch_timeout=7)
+
+        await scheduler.run("python", "a", priority=INTERACTIVE)
+        await scheduler.run("python", "b", priority=BATCH)
+
+        assert manager.execute_code.call_args_list == [
+            (("python", "a"), {"timeout": None}),
+            (("python", "b"), {"timeout": 7}),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_batch_limited_to_its_slots(self, manager):
+        scheduler = ExecutionScheduler(manager, slots=3, batch_slots=1)
+
+        batch = [
+            asyncio.create_task(scheduler.run("python", f"b{i}", priority=BATCH))
+            for i in range(3)
+        ]
+        await wait_for(lambda: manager.started == ["b0"])
+        # Reserved slots are still free for interactive work
+        interactive = asyncio.create_task(scheduler.run("python", "i0"))
+        await wait_for(lambda: "i0" in manager.started)
+
+        assert scheduler.stats[BATCH].running == 1
+        assert scheduler.stats[BATCH].waiting == 2
+
+        manager.release.set()
+        await asyncio.gather(*batch, interactive)
+        assert scheduler.summary()[BATCH]["completed"] == 3
+
+    @pytest.mark.asyncio
+    async def test_interactive_runs_before_waiting_batch(self, manager):
+        scheduler = ExecutionScheduler(manager, slots=1, batch_slots=1)
+
+        first = asyncio.create_task(scheduler.run("python", "i0"))
+        await wait_for(lambda: manager.started == ["i0"])
+        batch = asyncio.create_task(scheduler.run("python", "b0", priority=BATCH))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(scheduler.run("python", "i1"))
+        await asyncio.sleep(0)
+
+        manager.release.set()
+        await asyncio.gather(first, batch, second)
+
+        assert manager.started == ["i0", "i1", "b0"]
+
+    @pytest.mark.asyncio
+    async def test_failed_execution_frees_its_slot(self):
+        manager = MagicMock()
+        manager.execute_code.side_effect = [RuntimeError("docker"), "ok"]
+        scheduler = ExecutionScheduler(manager, slots=1)
+
+        with pytest.raises(RuntimeError):
+            await scheduler.run("python", "print(1)")
+
+        assert await scheduler.run("python", "print(1)") == "ok"
+        assert scheduler.summary()[INTERACTIVE]["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self, manager):
+        scheduler = ExecutionScheduler(manager, slots=1)
+
+        running = asyncio.create_task(scheduler.run("python", "i0"))
+        await wait_for(lambda: manager.started == ["i0"])
+        waiting = asyncio.create_task(scheduler.run("python", "i1"))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+
+        assert scheduler.stats[INTERACTIVE].waiting == 0
+        manager.release.set()
+        await running
+        assert await scheduler.run("python", "i2") == "i2"
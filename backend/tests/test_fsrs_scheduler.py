@@ -0,0 +1,117 @@
+"""Tests for local FSRS scheduling."""
+
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fsrs import Rating
+
+from due_index import DueIndex
+from fsrs_scheduler import FSRSScheduler, review_history
+
+START = datetime(2024, 1, 1, 9, tzinfo=timezone.utc)
+
+
+def review(days, remembered=True):
+    reviewed_at = START + timedelta(days=days)
+    return {
+        "date": {"date": reviewed_at.isoformat().replace("+00:00", "Z")},
+        "remembered?": remembered,
+    }
+
+
+@pytest.fixture
+def scheduler():
+    return FSRSScheduler()
+
+
+class TestReviewHistory:
+    def test_parses_mochi_reviews_in_order(self):
+        history = review_history([review(3, remembered=False), review(0)])
+
+        assert history == [
+            (START, Rating.Good),
+            (START + timedelta(days=3), Rating.Again),
+        ]
+
+    def test_skips_reviews_without_date(self):
+        assert review_history([{"due": {"date": "2024-01-01"}}]) == []
+
+
+class TestFSRSScheduler:
+    def test_never_reviewed_card_has_no_due_date(self, scheduler):
+        assert scheduler.next_due([]) is None
+        assert scheduler.memory_state(None) is None
+
+    def test_intervals_grow_while_remembered(self, scheduler):
+        first = scheduler.next_due([review(0)])
+        second = scheduler.next_due([review(0), review(3)])
+
+        assert first > START
+        assert second - (START + timedelta(days=3)) > first - START
+
+    def test_forgetting_shortens_interval(self, scheduler):
+        history = [review(0), review(3)]
+
+        remembered = scheduler.next_due([*history, review(10)])
+        forgot = scheduler.next_due([*history, review(10, remembered=False)])
+
+        assert forgot < remembered
+
+    def test_retrievability_decays(self, scheduler):
+        history = [review(0), review(3)]
+
+        soon = scheduler.retrievability(history, START + timedelta(days=4))
+        later = scheduler.retrievability(history, START + timedelta(days=60))
+
+        assert 0 < later < soon <= 1
+
+    def test_batch_matches_single_card_path(self, scheduler):
+        rng = random.Random(7)
+        histories = []
+        for _ in range(200):
+            days, reviews = 0.0, []
+            for _ in range(rng.randint(0, 12)):
+                days += rng.choice([0.1, 0.9, 1, 2, 5, 20, 60])
+                reviews.append(review(days, remembered=rng.random() < 0.8))
+            histories.append(reviews)
+
+        assert scheduler.next_due_batch(histories) == [
+            scheduler.next_due(reviews) for reviews in histories
+        ]
+
+
+class TestLocalRescheduling:
+    def card(self, card_id, reviews):
+        return {"id": card_id, "deck-id": "deck1", "reviews": reviews}
+
+    def test_index_uses_local_due_dates(self, scheduler):
+        index = DueIndex(scheduler=scheduler)
+        reviews = [review(0), review(3)]
+        index.rebuild([self.card("card1", reviews)], {"deck1"})
+
+        local_due = scheduler.next_due(reviews).strftime("%Y-%m-%d")
+        assert index.query(local_due) != []
+        day_before = scheduler.next_due(reviews) - timedelta(days=1)
+        assert index.query(day_before.strftime("%Y-%m-%d")) == []
+
+    def test_review_reschedules_card_locally(self, scheduler):
+        index = DueIndex(scheduler=scheduler)
+        index.rebuild([self.card("card1", [review(0)])], {"deck1"})
+        reviewed_at = START + timedelta(days=2)
+
+        index.record_review("card1", remembered=True, reviewed_at=reviewed_at)
+
+        assert len(index) == 1
+        assert index.query(reviewed_at.strftime("%Y-%m-%d")) == []
+        assert index.query("2099-01-01")[0]["reviews"][-1]["remembered?"] is True
+
+    def test_review_without_scheduler_drops_card(self):
+        index = DueIndex()
+        mochi_review = {**review(0), "due": {"date": "2024-01-02T09:00:00.000Z"}}
+        index.rebuild([self.card("card1", [mochi_review])], {"deck1"})
+        assert len(index) == 1
+
+        index.record_review("card1", remembered=True, reviewed_at=START)
+
+        assert len(index) == 0
@@ -1,7 +1,9 @@
 import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.testclient import TestClient
 
-from main import app
+from main import APIGZipMiddleware, app
 
 
 @pytest.fixture
@@ -41,6 +43,33 @@ class TestHealth:
         assert data["status"] == "ok"
 
 
+class TestCompression:
+    @pytest.fixture
+    def gzip_client(self):
+        test_app = FastAPI()
+        test_app.add_middleware(APIGZipMiddleware, minimum_size=1024)
+
+        @test_app.get("/{full_path:path}")
+        async def serve(full_path: str):
+            return PlainTextResponse("x" * 4096, headers={"ETag": '"abc"'})
+
+        return TestClient(test_app)
+
+    def test_api_responses_compressed(self, gzip_client):
+        response = gzip_client.get("/api/due", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["Content-Encoding"] == "gzip"
+
+    @pytest.mark.parametrize("path", ["/", "/favicon.ico", "/assets/big.js"])
+    def test_frontend_files_left_to_static_assets(self, gzip_client, path):
+        response = gzip_client.get(path, headers={"Accept-Encoding": "gzip"})
+
+        # Otherwise the gzip body would go out under the identity ETag
+        assert "Content-Encoding" not in response.headers
+        assert response.headers["ETag"] == '"abc"'
+        assert response.text == "x" * 4096
+
+
 class TestPathTraversalProtection:
     """Test that path traversal attacks are prevented in SPA file serving."""
 
@@ -0,0 +1,92 @@
+"""Tests for the Prometheus-style metrics registry and /metrics endpoint."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from metrics import (
+    HTTP_REQUEST_SECONDS,
+    REVIEW_CACHE_LOOKUPS,
+    Counter,
+    Gauge,
+    Histogram,
+    render_metrics,
+)
+from review_storage import ReviewCache
+
+
+@pytest.fixture
+def registry():
+    return []
+
+
+class TestMetrics:
+    def test_counter_and_gauge_render(self, registry):
+        counter = Counter("test_total", "A counter.", ("kind",), registry=registry)
+        gauge = Gauge("test_in_flight", "A gauge.", registry=registry)
+        counter.inc(kind="a")
+        counter.inc(2, kind='quo"te')
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+
+        text = render_metrics(registry)
+
+        assert "# TYPE test_total counter" in text
+        assert 'test_total{kind="a"} 1' in text
+        assert 'test_total{kind="quo\\"te"} 2' in text
+        assert "test_in_flight 1" in text
+
+    def test_histogram_buckets_are_cumulative(self, registry):
+        histogram = Histogram(
+            "test_seconds", "A histogram.", buckets=(0.1, 1.0), registry=registry
+        )
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+
+        lines = render_metrics(registry).splitlines()
+
+        assert 'test_seconds_bucket{le="0.1"} 2' in lines
+        assert 'test_seconds_bucket{le="1"} 3' in lines
+        assert 'test_seconds_bucket{le="+Inf"} 4' in lines
+        assert "test_seconds_sum 3.65" in lines
+        assert "test_seconds_count 4" in lines
+
+    def test_histogram_times_blocks(self, registry):
+        histogram = Histogram("test_seconds", "A histogram.", registry=registry)
+
+        with histogram.time():
+            pass
+
+        assert histogram.count() == 1
+
+    def test_review_cache_lookups_counted(self, tmp_path):
+        cache = ReviewCache(cache_dir=tmp_path)
+        hits = REVIEW_CACHE_LOOKUPS.value(lookup="card", result="hit")
+        misses = REVIEW_CACHE_LOOKUPS.value(lookup="card", result="miss")
+
+        cache.cache_due_cards([{"id": "card1"}])
+        cache.get_cached_card("card1")
+        cache.get_cached_card("card2")
+
+        assert REVIEW_CACHE_LOOKUPS.value(lookup="card", result="hit") == hits + 1
+        assert REVIEW_CACHE_LOOKUPS.value(lookup="card", result="miss") == misses + 1
+
+
+class TestMetricsEndpoint:
+    def test_exposes_request_metrics_by_route(self):
+        from main import app
+
+        client = TestClient(app)
+        before = HTTP_REQUEST_SECONDS.count(method="GET", route="/metrics", status=200)
+
+        client.get("/metrics")
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE cachehit_execution_phase_seconds histogram" in response.text
+        assert "cachehit_http_requests_in_flight 1" in response.text
+        assert (
+            HTTP_REQUEST_SECONDS.count(method="GET", route="/metrics", status=200)
+            == before + 2
+        )
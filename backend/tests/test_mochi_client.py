@@ -0,0 +1,42 @@
+"""Tests for Mochi card parsing."""
+
+from mochi_client import Card, Section, _parse_sections_cached
+
+
+class TestCardSections:
+    def test_sections_parsed_from_content(self):
+        card = Card.from_api_response(
+            {"id": "c1", "deck-id": "d1", "content": "Q1\n---\nA1\n---\nQ2\n---\nA2"}
+        )
+
+        assert list(card.sections) == [
+            Section(question="Q1", answer="A1"),
+            Section(question="Q2", answer="A2"),
+        ]
+
+    def test_sections_not_parsed_until_accessed(self):
+        card = Card.from_api_response({"id": "c1", "content": "Q\n---\nA"})
+
+        assert card._sections is None
+        assert len(card.sections) == 1
+
+    def test_identical_content_shares_parsed_sections(self):
+        _parse_sections_cached.cache_clear()
+        data = {"id": "c1", "content": "Shared Q\n---\nShared A"}
+
+        first = Card.from_api_response(data)
+        second = Card.from_api_response(dict(data, id="c2"))
+
+        assert first.sections is second.sections
+        assert _parse_sections_cached.cache_info().misses == 1
+
+    def test_explicit_sections_are_kept(self):
+        sections = [Section(question="Q", answer="A")]
+        card = Card(id="c1", content="ignored", deck_id="d1", sections=sections)
+
+        assert card.sections is sections
+
+    def test_card_uses_slots(self):
+        card = Card(id="c1", content="", deck_id="d1")
+
+        assert not hasattr(card, "__dict__")
@@ -0,0 +1,126 @@
+"""Tests for the Mochi API rate limiter."""
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from deck_cache import DeckCache
+from mochi_client import MochiClient
+from rate_limiter import Priority, RateLimiter, parse_retry_after
+
+
+def make_response(status_code=200, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.json.return_value = {"ok": True}
+    return response
+
+
+class TestParseRetryAfter:
+    def test_seconds(self):
+        assert parse_retry_after("3") == 3.0
+
+    def test_http_date_in_past(self):
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+    def test_missing_or_invalid(self):
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+
+
+class TestRateLimiter:
+    def test_burst_then_rate_limited(self):
+        limiter = RateLimiter(rate=20, burst=2, max_concurrency=4)
+
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.acquire()
+            limiter.release()
+        elapsed = time.monotonic() - start
+
+        # Third request waits for a token at 20/s
+        assert elapsed >= 0.04
+
+    def test_throttle_halves_concurrency_and_blocks(self):
+        limiter = RateLimiter(rate=1000, burst=10, max_concurrency=4)
+
+        limiter.acquire()
+        limiter.release(throttled=True, retry_after=0.1)
+
+        assert limiter.concurrency_limit == 2
+        start = time.monotonic()
+        limiter.acquire(Priority.INTERACTIVE)
+        assert time.monotonic() - start >= 0.09
+        limiter.release()
+
+    def test_success_recovers_concurrency(self):
+        limiter = RateLimiter(rate=1000, burst=100, max_concurrency=4)
+        limiter.acquire()
+        limiter.release(throttled=True)
+
+        for _ in range(10):
+            limiter.acquire()
+            limiter.release()
+
+        assert limiter.concurrency_limit == 4
+
+    def test_slot_reserved_for_interactive(self):
+        limiter = RateLimiter(rate=1000, burst=100, max_concurrency=2)
+        limiter.acquire(Priority.BACKGROUND)
+
+        background_acquired = threading.Event()
+
+        def background():
+            limiter.acquire(Priority.BACKGROUND)
+            background_acquired.set()
+            limiter.release()
+
+        thread = threading.Thread(target=background)
+        thread.start()
+
+        # Interactive gets the reserved slot while background is held back
+        limiter.acquire(Priority.INTERACTIVE)
+        assert not background_acquired.wait(timeout=0.05)
+
+        limiter.release()
+        limiter.release()
+        assert background_acquired.wait(timeout=1)
+        thread.join()
+
+
+class TestMochiClientThrottling:
+    @pytest.fixture
+    def client(self, tmp_path):
+        return MochiClient(
+            api_key="test",
+            deck_cache=DeckCache(cache_dir=tmp_path),
+            rate_limiter=RateLimiter(rate=1000, burst=100),
+        )
+
+    @patch("mochi_client.requests.request")
+    def test_retries_after_429(self, mock_request, client):
+        mock_request.side_effect = [
+            make_response(429, {"Retry-After": "0"}),
+            make_response(200),
+        ]
+
+        result = client.update_card_review("card1", remembered=True)
+
+        assert result == {"ok": True}
+        assert mock_request.call_count == 2
+
+    @patch("mochi_client.requests.request")
+    def test_gives_up_after_max_retries(self, mock_request, client):
+        mock_request.return_value = make_response(429, {"Retry-After": "0"})
+        mock_request.return_value.raise_for_status.side_effect = Exception("429")
+
+        with (
+            patch("mochi_client.MAX_THROTTLE_RETRIES", 2),
+            pytest.raises(Exception, match="429"),
+        ):
+            client.get_card("card1")
+
+        assert mock_request.call_count == 3
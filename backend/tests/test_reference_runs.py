@@ -0,0 +1,167 @@
+"""Tests for pre-running reference solutions from card answers."""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import HTTPException
+
+from container_manager import TIMEOUT_EXIT_CODE, ExecuteResponse
+from execution_scheduler import ExecutionScheduler
+from reference_runs import (
+    CodeBlock,
+    ReferenceOutputStore,
+    ReferenceRunner,
+    card_reference_blocks,
+    extract_code_blocks,
+)
+
+ANSWER = """Use a comprehension:
+
+```python
+print([x * 2 for x in range(3)])
+```
+
+Or in Ruby:
+
+```rb
+puts [0, 2, 4].inspect
+```
+"""
+
+
+def execute_result(stdout: str, exit_code: int = 0) -> ExecuteResponse:
+    return ExecuteResponse(
+        stdout=stdout,
+        stderr="",
+        exit_code=exit_code,
+        execution_time_ms=1.0,
+        container_id="abc",
+        language="python",
+        image_name="python:3.11-slim",
+        memory_used_mb=1.0,
+        cpu_percent=0.0,
+        file_path="/tmp/exec.py",
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ReferenceOutputStore(cache_dir=tmp_path)
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def manager():
+    manager = MagicMock()
+    manager.execute_code.side_effect = lambda language, code, timeout: execute_result(
+        f"{language} output\n"
+    )
+    return manager
+
+
+@pytest.fixture
+def runner(manager, store):
+    return ReferenceRunner(ExecutionScheduler(manager), store)
+
+
+def card(card_id: str, *answers: str) -> dict:
+    return {
+        "id": card_id,
+        "sections": [{"question": "Q", "answer": answer} for answer in answers],
+    }
+
+
+class TestExtraction:
+    def test_extracts_tagged_blocks_with_aliases(self):
+        blocks = extract_code_blocks(ANSWER)
+
+        assert [block.language for block in blocks] == ["python", "ruby"]
+        assert blocks[0].code == "print([x * 2 for x in range(3)])\n"
+
+    def test_skips_untagged_and_unsupported_blocks(self):
+        answer = "```\nprint(1)\n```\n```javascript\nconsole.log(1)\n```"
+
+        assert extract_code_blocks(answer) == []
+
+    def test_first_runnable_block_per_section(self):
+        blocks = card_reference_blocks(card("card1", "No code", ANSWER))
+
+        assert list(blocks) == [1]
+        assert blocks[1].language == "python"
+
+    def test_key_depends_on_language_and_code(self):
+        block = CodeBlock(language="python", code="print(1)\n")
+
+        assert block.key == CodeBlock(language="python", code="print(1)\n").key
+        assert block.key != CodeBlock(language="ruby", code="print(1)\n").key
+        assert block.key != CodeBlock(language="python", code="print(2)\n").key
+
+
+class TestReferenceOutputStore:
+    def test_stores_outputs_by_block(self, store, tmp_path):
+        block = CodeBlock(language="python", code="print(1)\n")
+        assert store.get(block) is None
+
+        store.put(block, "1\n", 0)
+
+        other = ReferenceOutputStore(cache_dir=tmp_path)
+        output = other.get(block)
+        other.close()
+        assert (output.stdout, output.exit_code) == ("1\n", 0)
+
+
+class TestReferenceRunner:
+    @pytest.mark.asyncio
+    async def test_runs_each_distinct_block_once(self, runner, manager, store):
+        cards = [card("card1", ANSWER), card("card2", ANSWER, "```py\nprint(2)\n```")]
+
+        assert await runner.schedule(cards) == 2
+        assert await runner.run_pending() == 2
+
+        assert manager.execute_code.call_count == 2
+        block = card_reference_blocks(cards[0])[0]
+        assert store.get(block).stdout == "python output\n"
+
+        # Already stored, so a later sync queues nothing
+        assert await runner.schedule(cards) == 0
+
+    @pytest.mark.asyncio
+    async def test_timed_out_run_is_stored(self, runner, manager, store):
+        manager.execute_code.side_effect = None
+        manager.execute_code.return_value = execute_result(
+            "\n[Execution timed out after 10s]", exit_code=TIMEOUT_EXIT_CODE
+        )
+        cards = [card("card1", ANSWER)]
+
+        await runner.schedule(cards)
+
+        assert await runner.run_pending() == 1
+        block = card_reference_blocks(cards[0])[0]
+        assert store.get(block).exit_code == TIMEOUT_EXIT_CODE
+        assert await runner.schedule(cards) == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_run_is_dropped(self, runner, manager, store):
+        manager.execute_code.side_effect = HTTPException(status_code=500)
+
+        await runner.schedule([card("card1", ANSWER)])
+
+        assert await runner.run_pending() == 0
+        assert runner.pending() == 0
+        assert await runner.schedule([card("card1", ANSWER)]) == 1
+
+    @pytest.mark.asyncio
+    async def test_background_task_runs_scheduled_blocks(self, runner, store):
+        runner.start()
+        await asyncio.sleep(0)
+
+        await runner.schedule([card("card1", ANSWER)])
+        for _ in range(100):
+            if store.get(card_reference_blocks(card("card1", ANSWER))[0]):
+                break
+            await asyncio.sleep(0.01)
+
+        await runner.stop()
+        assert store.get(card_reference_blocks(card("card1", ANSWER))[0]) is not None
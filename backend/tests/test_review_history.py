@@ -0,0 +1,97 @@
+"""Tests for the local review history log."""
+
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+
+from review_history import ReviewHistory
+
+DAY = datetime(2024, 3, 10, 12, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = ReviewHistory(cache_dir=tmp_path)
+    yield history
+    history.close()
+
+
+def on_day(offset):
+    return DAY + timedelta(days=offset)
+
+
+class TestRetention:
+    def test_no_reviews(self, history):
+        assert history.count() == 0
+        assert history.retention() is None
+
+    def test_counts_completed_cards_only(self, history):
+        history.record("card1", False, section_index=0, reviewed_at=on_day(0))
+        history.record("card1", True, reviewed_at=on_day(0))
+        history.record("card2", False, reviewed_at=on_day(0))
+
+        assert history.count() == 2
+        assert history.retention() == 0.5
+
+    def test_since_window(self, history):
+        history.record("card1", False, reviewed_at=on_day(-40))
+        history.record("card1", True, reviewed_at=on_day(0))
+
+        assert history.retention(since=on_day(-30)) == 1.0
+
+    def test_log_persists(self, history, tmp_path):
+        history.record("card1", True, reviewed_at=on_day(0))
+
+        reopened = ReviewHistory(cache_dir=tmp_path)
+        assert reopened.count() == 1
+        reopened.close()
+
+
+class TestDeckAccuracy:
+    def test_section_accuracy_per_deck(self, history):
+        for remembered in [True, True, False]:
+            history.record("card1", remembered, section_index=0, deck_id="deck1")
+        history.record("card2", False, section_index=0, deck_id="deck2")
+        history.record("card1", True, deck_id="deck1")
+
+        decks = history.deck_accuracy()
+
+        assert [(d.deck_id, d.reviews, d.remembered) for d in decks] == [
+            ("deck1", 3, 2),
+            ("deck2", 1, 0),
+        ]
+        assert decks[0].accuracy == pytest.approx(2 / 3)
+
+
+class TestStreaks:
+    def test_current_streak_counts_consecutive_days(self, history):
+        for offset in [-5, -2, -1, 0, 0]:
+            history.record("card1", True, reviewed_at=on_day(offset))
+
+        assert history.current_streak(today=DAY.date()) == 3
+        assert history.longest_streak() == 3
+
+    def test_streak_survives_until_day_is_over(self, history):
+        history.record("card1", True, reviewed_at=on_day(-1))
+
+        assert history.current_streak(today=DAY.date()) == 1
+        assert history.current_streak(today=date(2024, 3, 12)) == 0
+
+    def test_longest_streak_in_the_past(self, history):
+        for offset in [-10, -9, -8, -7, -1]:
+            history.record("card1", True, reviewed_at=on_day(offset))
+
+        assert history.longest_streak() == 4
+        assert history.current_streak(today=DAY.date()) == 1
+
+    def test_streaks_read_review_days_once(self, history):
+        for offset in [-10, -9, -8, -7, -1, 0]:
+            history.record("card1", True, reviewed_at=on_day(offset))
+
+        with patch.object(
+            history, "review_days", wraps=history.review_days
+        ) as review_days:
+            assert history.streaks(today=DAY.date()) == (2, 4)
+
+        review_days.assert_called_once()
@@ -0,0 +1,177 @@
+"""Tests for the durable review outbox."""
+
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+
+from review_outbox import OutboxWorker, ReviewOutbox
+
+REVIEWED_AT = datetime(2024, 1, 10, 12, 0, tzinfo=timezone.utc)
+
+
+def http_error(status_code: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.HTTPError(f"{status_code} Client Error", response=response)
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    outbox = ReviewOutbox(cache_dir=tmp_path)
+    yield outbox
+    outbox.close()
+
+
+@pytest.fixture
+def mock_mochi_client():
+    mock = MagicMock()
+    mock.update_card_review.return_value = {"success": True}
+    return mock
+
+
+class TestReviewOutbox:
+    def test_enqueue_is_idempotent(self, outbox):
+        outbox.enqueue("card1", remembered=True, reviewed_at=REVIEWED_AT)
+        outbox.enqueue("card1", remembered=True, reviewed_at=REVIEWED_AT)
+
+        assert outbox.pending_count() == 1
+
+    def test_reviews_survive_reopen(self, outbox, tmp_path):
+        outbox.enqueue("card1", remembered=False, reviewed_at=REVIEWED_AT)
+        outbox.close()
+
+        reopened = ReviewOutbox(cache_dir=tmp_path)
+        [review] = reopened.get_batch()
+        reopened.close()
+
+        assert review.card_id == "card1"
+        assert review.remembered is False
+        assert review.reviewed_at == REVIEWED_AT
+
+    def test_failed_review_backs_off(self, outbox):
+        review = outbox.enqueue("card1", remembered=True)
+
+        outbox.mark_failed(review.review_id, "boom")
+
+        assert outbox.get_batch() == []
+        assert outbox.pending_count() == 1
+
+    def test_claimed_reviews_not_handed_out_twice(self, outbox, tmp_path):
+        outbox.enqueue("card1", remembered=True)
+        other_worker = ReviewOutbox(cache_dir=tmp_path)
+
+        claimed = outbox.get_batch()
+        assert len(claimed) == 1
+        assert other_worker.get_batch() == []
+        other_worker.close()
+
+    def test_mark_sent_removes_review(self, outbox):
+        review = outbox.enqueue("card1", remembered=True)
+
+        outbox.mark_sent(review.review_id)
+
+        assert outbox.pending_count() == 0
+
+    def test_pending_reviews(self, outbox):
+        outbox.enqueue("card1", remembered=False, reviewed_at=REVIEWED_AT)
+        sent = outbox.enqueue("card2", remembered=True)
+        outbox.mark_sent(sent.review_id)
+
+        [pending] = outbox.pending_reviews()
+        assert pending.card_id == "card1"
+        assert pending.remembered is False
+        assert pending.reviewed_at == REVIEWED_AT
+        # Listing does not claim; the worker still gets the review
+        assert [r.card_id for r in outbox.get_batch()] == ["card1"]
+
+    def test_mark_dead_moves_review_out_of_queue(self, outbox):
+        review = outbox.enqueue("card1", remembered=True)
+
+        outbox.mark_dead(review.review_id, "404 Not Found")
+
+        assert outbox.pending_count() == 0
+        assert outbox.pending_reviews() == []
+        assert outbox.dead_letter_count() == 1
+
+
+class TestOutboxWorker:
+    @pytest.mark.asyncio
+    async def test_flush_uploads_with_original_review_time(
+        self, outbox, mock_mochi_client
+    ):
+        outbox.enqueue("card1", remembered=True, reviewed_at=REVIEWED_AT)
+        outbox.enqueue("card2", remembered=False)
+        worker = OutboxWorker(mock_mochi_client, outbox)
+
+        sent = await worker.flush()
+
+        assert sent == 2
+        assert outbox.pending_count() == 0
+        mock_mochi_client.update_card_review.assert_any_call(
+            "card1", remembered=True, reviewed_at=REVIEWED_AT
+        )
+
+    @pytest.mark.asyncio
+    async def test_flush_keeps_failed_reviews(self, outbox, mock_mochi_client):
+        mock_mochi_client.update_card_review.side_effect = Exception("Mochi down")
+        outbox.enqueue("card1", remembered=True)
+        worker = OutboxWorker(mock_mochi_client, outbox)
+
+        sent = await worker.flush()
+
+        assert sent == 0
+        assert outbox.pending_count() == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("status_code", [400, 404])
+    async def test_flush_dead_letters_rejected_reviews(
+        self, outbox, mock_mochi_client, status_code
+    ):
+        mock_mochi_client.update_card_review.side_effect = [
+            http_error(status_code),
+            {"success": True},
+        ]
+        outbox.enqueue("card1", remembered=True, reviewed_at=REVIEWED_AT)
+        outbox.enqueue("card2", remembered=True)
+        worker = OutboxWorker(mock_mochi_client, outbox)
+
+        sent = await worker.flush()
+
+        assert sent == 1
+        assert outbox.pending_count() == 0
+        assert outbox.dead_letter_count() == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("status_code", [429, 500])
+    async def test_flush_retries_transient_http_errors(
+        self, outbox, mock_mochi_client, status_code
+    ):
+        mock_mochi_client.update_card_review.side_effect = http_error(status_code)
+        outbox.enqueue("card1", remembered=True)
+        worker = OutboxWorker(mock_mochi_client, outbox)
+
+        await worker.flush()
+
+        assert outbox.pending_count() == 1
+        assert outbox.dead_letter_count() == 0
+
+    @pytest.mark.asyncio
+    async def test_worker_uploads_on_notify(self, outbox, mock_mochi_client):
+        worker = OutboxWorker(mock_mochi_client, outbox)
+        worker.start()
+        try:
+            await asyncio.sleep(0.05)
+            outbox.enqueue("card1", remembered=True)
+            worker.notify()
+            for _ in range(50):
+                if outbox.pending_count() == 0:
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            await worker.stop()
+
+        assert outbox.pending_count() == 0
+        assert worker.is_running() is False
@@ -1,14 +1,28 @@
 """Tests for the Mochi-integrated review router."""
 
-from pathlib import Path
+from datetime import datetime, timedelta, timezone
 from unittest.mock import MagicMock
 
 import pytest
 from fastapi.testclient import TestClient
 
 from mochi_client import Card, Section
-from review_router import get_mochi_client, get_review_cache
-from review_storage import ReviewCache
+from reference_runs import ReferenceOutputStore, card_reference_blocks
+from review_history import ReviewHistory
+from review_outbox import OutboxWorker, ReviewOutbox
+from review_router import (
+    _encode_cursor,
+    card_to_dict,
+    get_mochi_client,
+    get_outbox_worker,
+    get_reference_store,
+    get_review_cache,
+    get_review_history,
+    get_review_outbox,
+    get_sync_manager,
+)
+from review_storage import DUE_CACHE_FRESH_MINUTES, ReviewCache
+from sync import SyncManager
 
 # Mock cards for testing
 MOCK_CARDS = [
@@ -42,20 +56,50 @@ def mock_mochi_client():
 
 
 @pytest.fixture
-def mock_review_cache():
+def mock_review_cache(tmp_path):
     """Create a fresh ReviewCache for each test."""
-    cache = ReviewCache(cache_dir="test_review_cache")
-    yield cache
-    # Cleanup
-    cache_dir = Path("test_review_cache")
-    if cache_dir.exists():
-        for file in cache_dir.glob("*"):
-            file.unlink()
-        cache_dir.rmdir()
+    return ReviewCache(cache_dir=tmp_path / "review_cache")
 
 
 @pytest.fixture
-def client(mock_mochi_client, mock_review_cache):
+def review_outbox(tmp_path):
+    """Create a fresh ReviewOutbox for each test."""
+    outbox = ReviewOutbox(cache_dir=tmp_path)
+    yield outbox
+    outbox.close()
+
+
+@pytest.fixture
+def review_history(tmp_path):
+    """Create a fresh ReviewHistory for each test."""
+    history = ReviewHistory(cache_dir=tmp_path)
+    yield history
+    history.close()
+
+
+@pytest.fixture
+def reference_store(tmp_path):
+    """Create a fresh ReferenceOutputStore for each test."""
+    store = ReferenceOutputStore(cache_dir=tmp_path)
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def outbox_worker(mock_mochi_client, review_outbox):
+    """Outbox worker uploading to the mock MochiClient."""
+    return OutboxWorker(mock_mochi_client, review_outbox)
+
+
+@pytest.fixture
+def client(
+    mock_mochi_client,
+    mock_review_cache,
+    review_outbox,
+    outbox_worker,
+    review_history,
+    reference_store,
+):
     """Create a test client with mocked dependencies."""
     # Import app here to avoid loading before mocks are set up
     from main import app
@@ -63,6 +107,13 @@ def client(mock_mochi_client, mock_review_cache):
     # Override dependencies
     app.dependency_overrides[get_mochi_client] = lambda: mock_mochi_client
     app.dependency_overrides[get_review_cache] = lambda: mock_review_cache
+    app.dependency_overrides[get_review_outbox] = lambda: review_outbox
+    app.dependency_overrides[get_outbox_worker] = lambda: outbox_worker
+    app.dependency_overrides[get_review_history] = lambda: review_history
+    app.dependency_overrides[get_reference_store] = lambda: reference_store
+    app.dependency_overrides[get_sync_manager] = lambda: SyncManager(
+        mock_mochi_client, mock_review_cache, card_to_dict, outbox=review_outbox
+    )
 
     with TestClient(app, raise_server_exceptions=False) as test_client:
         yield test_client
@@ -81,6 +132,7 @@ class TestGetDueCards:
         assert "total_due" in data
         assert len(data["cards"]) == 2
         assert data["total_due"] == 2
+        assert data["sync_status"] == "live"
         mock_mochi_client.get_due_cards.assert_called_once()
 
     def test_get_due_cards_includes_sections(self, client):
@@ -112,9 +164,255 @@ class TestGetDueCards:
         assert len(data["cards"]) == 1
         assert data["cards"][0]["id"] == "cached_card"
 
+    def test_get_due_cards_mochi_error_without_cache_returns_503(
+        self, client, mock_mochi_client
+    ):
+        mock_mochi_client.get_due_cards.side_effect = Exception("Mochi unavailable")
+
+        response = client.get("/api/due")
+
+        assert response.status_code == 503
+
+    def test_fresh_cache_served_without_mochi(
+        self, client, mock_mochi_client, mock_review_cache
+    ):
+        mock_review_cache.cache_due_cards([{"id": "cached_card"}])
+
+        response = client.get("/api/due")
+
+        data = response.json()
+        assert data["sync_status"] == "fresh"
+        assert data["cache_age_seconds"] < 60
+        mock_mochi_client.get_due_cards.assert_not_called()
+
+    def test_stale_cache_served_and_refreshed_in_background(
+        self, client, mock_mochi_client, mock_review_cache
+    ):
+        mock_review_cache.cache_due_cards([{"id": "cached_card"}])
+        mock_review_cache._last_sync = datetime.now(timezone.utc) - timedelta(
+            minutes=DUE_CACHE_FRESH_MINUTES + 1
+        )
+
+        response = client.get("/api/due")
+
+        data = response.json()
+        assert data["sync_status"] == "refreshing"
+        assert [c["id"] for c in data["cards"]] == ["cached_card"]
+
+        # The background refresh replaced the cache with Mochi's cards
+        mock_mochi_client.get_due_cards.assert_called_once()
+        cached_ids = [c["id"] for c in mock_review_cache.get_cached_due_cards()]
+        assert cached_ids == ["card1", "card2"]
+
+
+class TestDuePagination:
+    @pytest.fixture(autouse=True)
+    def cached_cards(self, mock_review_cache):
+        mock_review_cache.cache_due_cards(
+            [
+                {
+                    "id": f"card{i}",
+                    "deck_id": "deck1" if i % 2 else "deck2",
+                    "name": f"Card {i}",
+                    "content": "Q\n---\nA",
+                    "sections": [{"question": "Q", "answer": "A"}],
+                    "total_sections": 1,
+                }
+                for i in range(5)
+            ]
+        )
+
+    def test_pages_through_all_cards(self, client):
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            data = client.get("/api/due", params=params).json()
+            assert data["total_due"] == 5
+            assert len(data["cards"]) <= 2
+            seen += [c["id"] for c in data["cards"]]
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+
+        assert seen == [f"card{i}" for i in range(5)]
+
+    def test_no_limit_returns_everything(self, client):
+        data = client.get("/api/due").json()
+
+        assert len(data["cards"]) == 5
+        assert data["next_cursor"] is None
+
+    def test_cursor_survives_reviewed_card(self, client, mock_review_cache):
+        first = client.get("/api/due", params={"limit": 2}).json()
+        # The last card of the page is reviewed before the next page loads
+        mock_review_cache.remove_cached_card("card1")
+
+        second = client.get(
+            "/api/due", params={"limit": 2, "cursor": first["next_cursor"]}
+        ).json()
+
+        assert [c["id"] for c in second["cards"]] == ["card2", "card3"]
+
+    def test_cursor_survives_reviewed_page(self, client, mock_review_cache):
+        mock_review_cache.cache_due_cards(
+            [{"id": f"c{i}", "name": f"Card {i}"} for i in range(60)]
+        )
+        params = {"limit": 20, "fields": "summary"}
+        first = client.get("/api/due", params=params).json()
+        # The whole page is reviewed before the next one loads
+        for card in first["cards"]:
+            mock_review_cache.remove_cached_card(card["id"])
+
+        second = client.get(
+            "/api/due", params={**params, "cursor": first["next_cursor"]}
+        ).json()
+
+        assert [c["id"] for c in second["cards"]] == [f"c{i}" for i in range(20, 40)]
+
+    def test_cursor_past_the_end_is_empty_page(self, client):
+        response = client.get("/api/due", params={"cursor": _encode_cursor(10_000)})
+
+        assert response.status_code == 200
+        assert response.json()["cards"] == []
+        assert response.json()["next_cursor"] is None
+
+    def test_deck_filter(self, client):
+        data = client.get("/api/due", params={"deck_id": "deck1"}).json()
+
+        assert [c["id"] for c in data["cards"]] == ["card1", "card3"]
+        assert data["total_due"] == 2
+
+    def test_summary_projection(self, client):
+        data = client.get("/api/due", params={"fields": "summary"}).json()
+
+        assert data["cards"][0] == {
+            "id": "card0",
+            "deck_id": "deck2",
+            "name": "Card 0",
+            "total_sections": 1,
+        }
+
+    def test_invalid_cursor(self, client):
+        response = client.get("/api/due", params={"cursor": "not-a-cursor"})
+
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize(
+        "cursor",
+        [
+            "NQ==",  # base64 of the JSON number 5
+            "e30",  # base64 of {}
+            "eyJhZnRlciI6ICJ4In0",  # base64 of {"after": "x"}
+            _encode_cursor(-1),
+        ],
+    )
+    def test_malformed_or_out_of_range_cursor(self, client, cursor):
+        response = client.get("/api/due", params={"cursor": cursor})
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid cursor"
+
+    def test_unchanged_cards_not_modified(self, client):
+        first = client.get("/api/due")
+        etag = first.headers["ETag"]
+        assert first.json()["version"] in etag
+
+        again = client.get("/api/due", headers={"If-None-Match": etag})
+
+        assert again.status_code == 304
+        assert again.content == b""
+        assert again.headers["ETag"] == etag
+
+    def test_etag_changes_with_cards(self, client, mock_review_cache):
+        etag = client.get("/api/due").headers["ETag"]
+        mock_review_cache.remove_cached_card("card1")
+
+        response = client.get("/api/due", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert len(response.json()["cards"]) == 4
+
+    def test_etag_depends_on_query(self, client):
+        etag = client.get("/api/due").headers["ETag"]
+
+        response = client.get(
+            "/api/due", params={"fields": "summary"}, headers={"If-None-Match": etag}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+    def test_large_payload_gzipped(self, client, mock_review_cache):
+        mock_review_cache.cache_due_cards(
+            [{"id": f"card{i}", "content": "Q\n---\nA" * 10} for i in range(50)]
+        )
+
+        response = client.get("/api/due", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert len(response.json()["cards"]) == 50
+
+    def test_small_payload_not_compressed(self, client):
+        response = client.get(
+            "/api/due",
+            params={"limit": 1, "fields": "summary"},
+            headers={"Accept-Encoding": "gzip"},
+        )
+
+        assert "Content-Encoding" not in response.headers
+        assert response.headers["ETag"]
+
+    def test_card_fetched_on_demand(self, client, mock_mochi_client):
+        data = client.get("/api/cards/card3").json()
+
+        assert data["sections"] == [{"question": "Q", "answer": "A"}]
+        mock_mochi_client.get_card.assert_not_called()
+
+    def test_uncached_card_fetched_from_mochi(self, client, mock_mochi_client):
+        mock_mochi_client.get_card.return_value = MOCK_CARDS[1]
+
+        data = client.get("/api/cards/card_elsewhere").json()
+
+        assert data["id"] == "card2"
+        assert data["total_sections"] == 2
+
+
+class TestDueCount:
+    def test_counted_from_index_without_crawl(self, client, mock_mochi_client):
+        mock_mochi_client.due_index.is_built.return_value = True
+        mock_mochi_client.query_due_cards.return_value = MOCK_CARDS
+
+        response = client.get("/api/due/count?deck_id=deck1&lookahead_days=7")
+
+        assert response.status_code == 200
+        assert response.json() == {"due": 2, "lookahead_days": 7}
+        mock_mochi_client.query_due_cards.assert_called_once_with(
+            "deck1", lookahead_days=7
+        )
+        mock_mochi_client.refresh_due_index.assert_not_called()
+        mock_mochi_client.get_due_cards.assert_not_called()
+
+    def test_unbuilt_index_crawled_first(self, client, mock_mochi_client):
+        mock_mochi_client.due_index.is_built.return_value = False
+        mock_mochi_client.query_due_cards.return_value = []
+
+        response = client.get("/api/due/count")
+
+        assert response.json() == {"due": 0, "lookahead_days": 0}
+        mock_mochi_client.refresh_due_index.assert_called_once()
+
+    def test_crawl_failure_returns_503(self, client, mock_mochi_client):
+        mock_mochi_client.due_index.is_built.return_value = False
+        mock_mochi_client.refresh_due_index.side_effect = Exception("down")
+
+        assert client.get("/api/due/count").status_code == 503
+
 
 class TestSubmitReview:
-    def test_submit_single_section_review(self, client, mock_mochi_client):
+    def test_submit_single_section_review(
+        self, client, mock_mochi_client, review_outbox
+    ):
         response = client.post(
             "/api/review",
             json={
@@ -129,13 +427,23 @@ class TestSubmitReview:
         data = response.json()
         assert data["success"] is True
         assert data["card_complete"] is True
-        assert data["synced_to_mochi"] is True
+        assert data["synced_to_mochi"] is False
+        assert data["queued_for_sync"] is True
         assert data["aggregate_remembered"] is True
-        mock_mochi_client.update_card_review.assert_called_once_with(
-            "card1", remembered=True
+
+        # Acknowledged without waiting on Mochi
+        mock_mochi_client.update_card_review.assert_not_called()
+        [queued] = review_outbox.get_batch()
+        assert queued.card_id == "card1"
+        assert queued.remembered is True
+        # Rescheduled locally without waiting for the upload
+        mock_mochi_client.due_index.record_review.assert_called_once_with(
+            "card1", True, queued.reviewed_at
         )
 
-    def test_submit_multi_section_first_section(self, client, mock_mochi_client):
+    def test_submit_multi_section_first_section(
+        self, client, mock_mochi_client, review_outbox
+    ):
         response = client.post(
             "/api/review",
             json={
@@ -151,10 +459,11 @@ class TestSubmitReview:
         assert data["success"] is True
         assert data["card_complete"] is False
         assert data["synced_to_mochi"] is False
+        assert data["queued_for_sync"] is False
         assert data["sections_reviewed"] == 1
-        mock_mochi_client.update_card_review.assert_not_called()
+        assert review_outbox.pending_count() == 0
 
-    def test_submit_multi_section_completes_card(self, client, mock_mochi_client):
+    def test_submit_multi_section_completes_card(self, client, review_outbox):
         # First section
         client.post(
             "/api/review",
@@ -180,13 +489,13 @@ class TestSubmitReview:
         assert response.status_code == 200
         data = response.json()
         assert data["card_complete"] is True
-        assert data["synced_to_mochi"] is True
+        assert data["queued_for_sync"] is True
         assert data["aggregate_remembered"] is True
-        mock_mochi_client.update_card_review.assert_called_once_with(
-            "card2", remembered=True
-        )
+        [queued] = review_outbox.get_batch()
+        assert queued.card_id == "card2"
+        assert queued.remembered is True
 
-    def test_aggregate_forgot_if_any_forgot(self, client, mock_mochi_client):
+    def test_aggregate_forgot_if_any_forgot(self, client, review_outbox):
         # First section - remembered
         client.post(
             "/api/review",
@@ -212,11 +521,12 @@ class TestSubmitReview:
         assert response.status_code == 200
         data = response.json()
         assert data["aggregate_remembered"] is False
-        mock_mochi_client.update_card_review.assert_called_once_with(
-            "card2", remembered=False
-        )
+        [queued] = review_outbox.get_batch()
+        assert queued.remembered is False
 
-    def test_mochi_sync_error_returns_503(self, client, mock_mochi_client):
+    def test_mochi_down_does_not_fail_review(
+        self, client, mock_mochi_client, review_outbox
+    ):
         mock_mochi_client.update_card_review.side_effect = Exception("Mochi error")
 
         response = client.post(
@@ -229,8 +539,219 @@ class TestSubmitReview:
             },
         )
 
-        assert response.status_code == 503
-        assert "sync" in response.json()["detail"].lower()
+        assert response.status_code == 200
+        assert response.json()["queued_for_sync"] is True
+        assert review_outbox.pending_count() == 1
+
+    def test_completed_card_dropped_from_cache_only(
+        self, client, mock_mochi_client, mock_review_cache
+    ):
+        mock_review_cache.cache_due_cards([{"id": "card1"}, {"id": "card2"}])
+        last_sync = mock_review_cache.get_last_sync_time()
+
+        client.post(
+            "/api/review",
+            json={
+                "card_id": "card1",
+                "section_index": 0,
+                "remembered": True,
+                "total_sections": 1,
+            },
+        )
+
+        cached_ids = [c["id"] for c in mock_review_cache.get_cached_due_cards()]
+        assert cached_ids == ["card2"]
+        assert mock_review_cache.get_last_sync_time() == last_sync
+
+        # The next /api/due is served from the warm cache, without a re-crawl
+        response = client.get("/api/due")
+        assert [c["id"] for c in response.json()["cards"]] == ["card2"]
+        mock_mochi_client.get_due_cards.assert_not_called()
+
+    def test_reviews_appended_to_history(
+        self, client, mock_review_cache, review_history
+    ):
+        mock_review_cache.cache_due_cards([{"id": "card2", "deck_id": "deck1"}])
+        for section_index, remembered in [(0, True), (1, False)]:
+            client.post(
+                "/api/review",
+                json={
+                    "card_id": "card2",
+                    "section_index": section_index,
+                    "remembered": remembered,
+                    "total_sections": 2,
+                    "latency_ms": 1500,
+                },
+            )
+
+        assert review_history.count() == 1
+        assert review_history.retention() == 0.0
+        [deck] = review_history.deck_accuracy()
+        assert (deck.deck_id, deck.reviews, deck.accuracy) == ("deck1", 2, 0.5)
+
+        stats = client.get("/api/stats").json()
+        assert stats["total_reviews"] == 1
+        assert stats["current_streak_days"] == 1
+        assert stats["decks"] == [{"deck_id": "deck1", "reviews": 2, "accuracy": 0.5}]
+
+    @pytest.mark.parametrize(
+        "section_index, total_sections", [(2, 2), (20000, 2), (0, 20000), (0, 0)]
+    )
+    def test_out_of_range_section_rejected(
+        self, client, mock_review_cache, section_index, total_sections
+    ):
+        response = client.post(
+            "/api/review",
+            json={
+                "card_id": "card1",
+                "section_index": section_index,
+                "remembered": True,
+                "total_sections": total_sections,
+            },
+        )
+
+        assert response.status_code == 422
+        assert mock_review_cache.get_card_progress("card1") is None
+
+
+class TestSubmitReviewBatch:
+    def test_batch_across_cards(
+        self,
+        client,
+        mock_mochi_client,
+        mock_review_cache,
+        review_outbox,
+        review_history,
+    ):
+        mock_review_cache.cache_due_cards(
+            [{"id": "card1"}, {"id": "card2"}, {"id": "card3"}]
+        )
+
+        response = client.post(
+            "/api/review/batch",
+            json={
+                "reviews": [
+                    {
+                        "card_id": "card2",
+                        "section_index": 0,
+                        "remembered": True,
+                        "total_sections": 2,
+                    },
+                    {
+                        "card_id": "card1",
+                        "section_index": 0,
+                        "remembered": False,
+                        "total_sections": 1,
+                    },
+                    {
+                        "card_id": "card2",
+                        "section_index": 1,
+                        "remembered": True,
+                        "total_sections": 2,
+                    },
+                    {
+                        "card_id": "card3",
+                        "section_index": 0,
+                        "remembered": True,
+                        "total_sections": 2,
+                    },
+                ]
+            },
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["cards_completed"] == 2
+        assert [r["card_complete"] for r in data["results"]] == [
+            False,
+            True,
+            True,
+            False,
+        ]
+        assert data["results"][1]["aggregate_remembered"] is False
+        assert data["results"][2]["sections_reviewed"] == 2
+
+        queued = {r.card_id: r.remembered for r in review_outbox.get_batch()}
+        assert queued == {"card1": False, "card2": True}
+        assert review_history.count() == 2
+        rescheduled = {
+            c.args[0]: c.args[1]
+            for c in mock_mochi_client.due_index.record_review.call_args_list
+        }
+        assert rescheduled == queued
+
+        # Only the completed cards leave the cache; card3 stays in progress
+        cached_ids = [c["id"] for c in mock_review_cache.get_cached_due_cards()]
+        assert cached_ids == ["card3"]
+        assert mock_review_cache.get_card_progress("card3").sections_reviewed() == 1
+
+    def test_card_completed_twice_is_counted_once(
+        self, client, mock_review_cache, review_outbox, review_history
+    ):
+        mock_review_cache.cache_due_cards([{"id": "card1"}])
+        review = {
+            "card_id": "card1",
+            "section_index": 0,
+            "remembered": True,
+            "total_sections": 1,
+        }
+
+        response = client.post("/api/review/batch", json={"reviews": [review] * 2})
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["cards_completed"] == 1
+        assert [r["queued_for_sync"] for r in data["results"]] == [True, False]
+        assert [r.card_id for r in review_outbox.get_batch()] == ["card1"]
+        assert review_history.count() == 1
+
+    def test_offline_reviews_keep_their_time(self, client, review_outbox):
+        client.post(
+            "/api/review/batch",
+            json={
+                "reviews": [
+                    {
+                        "card_id": "card1",
+                        "section_index": 0,
+                        "remembered": True,
+                        "total_sections": 1,
+                        "reviewed_at": "2024-05-01T08:30:00",
+                    }
+                ]
+            },
+        )
+
+        [queued] = review_outbox.get_batch()
+        assert queued.reviewed_at == datetime(2024, 5, 1, 8, 30, tzinfo=timezone.utc)
+
+    def test_invalid_batch_applies_nothing(self, client, mock_review_cache):
+        response = client.post(
+            "/api/review/batch",
+            json={
+                "reviews": [
+                    {
+                        "card_id": "card1",
+                        "section_index": 0,
+                        "remembered": True,
+                        "total_sections": 2,
+                    },
+                    {
+                        "card_id": "card1",
+                        "section_index": -1,
+                        "remembered": True,
+                        "total_sections": 2,
+                    },
+                ]
+            },
+        )
+
+        assert response.status_code == 422
+        assert mock_review_cache.get_card_progress("card1") is None
+
+    def test_empty_batch_rejected(self, client):
+        response = client.post("/api/review/batch", json={"reviews": []})
+
+        assert response.status_code == 422
 
 
 class TestReviewCache:
@@ -270,3 +791,45 @@ class TestReviewCache:
         )
 
         assert progress.get_aggregate_result() is False
+
+
+class TestReferenceOutputs:
+    CARD = {
+        "id": "card1",
+        "deck_id": "deck1",
+        "sections": [
+            {"question": "Q1", "answer": "```python\nprint(1)\n```"},
+            {"question": "Q2", "answer": "No code here"},
+            {"question": "Q3", "answer": "```ruby\nputs 3\n```"},
+        ],
+    }
+
+    def test_lists_ready_and_pending_references(
+        self, client, mock_review_cache, reference_store
+    ):
+        mock_review_cache.cache_due_cards([self.CARD])
+        reference_store.put(card_reference_blocks(self.CARD)[0], "1\n", 0)
+
+        data = client.get("/api/cards/card1/reference").json()
+
+        assert data["sections"] == [
+            {
+                "section_index": 0,
+                "language": "python",
+                "status": "ready",
+                "stdout": "1\n",
+                "exit_code": 0,
+            },
+            {
+                "section_index": 2,
+                "language": "ruby",
+                "status": "pending",
+                "stdout": None,
+                "exit_code": None,
+            },
+        ]
+
+    def test_unknown_card(self, client):
+        response = client.get("/api/cards/missing/reference")
+
+        assert response.status_code == 404
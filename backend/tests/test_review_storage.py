@@ -0,0 +1,179 @@
+"""Tests for in-progress review tracking in review_storage."""
+
+import time
+from unittest.mock import patch
+
+import pytest
+
+import review_storage
+from review_storage import (
+    CardReviewProgress,
+    ReviewCache,
+    ReviewSessionStore,
+    cards_version,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ReviewSessionStore(tmp_path, max_sessions=3, ttl_seconds=3600)
+
+
+class TestCardReviewProgress:
+    def test_sections_tracked_as_bits(self):
+        progress = CardReviewProgress(card_id="card1", total_sections=3)
+        progress.add_section_review(2, remembered=False)
+        progress.add_section_review(0, remembered=True)
+
+        assert progress.reviewed_mask == 0b101
+        assert progress.forgot_mask == 0b100
+        assert progress.sections_reviewed() == 2
+        assert [(r.section_index, r.remembered) for r in progress.section_reviews] == [
+            (0, True),
+            (2, False),
+        ]
+
+    def test_duplicate_section_keeps_first_result(self):
+        progress = CardReviewProgress(card_id="card1", total_sections=2)
+        progress.add_section_review(0, remembered=True)
+        progress.add_section_review(0, remembered=False)
+
+        assert progress.sections_reviewed() == 1
+        assert progress.get_aggregate_result() is True
+
+    def test_complete_when_all_sections_reviewed(self):
+        progress = CardReviewProgress(card_id="card1", total_sections=2)
+        progress.add_section_review(1, remembered=True)
+        assert progress.is_complete() is False
+
+        progress.add_section_review(0, remembered=False)
+        assert progress.is_complete() is True
+        assert progress.get_aggregate_result() is False
+
+
+class TestReviewSessionStore:
+    def test_progress_survives_restart(self, store, tmp_path):
+        store.record("card1", 0, True, total_sections=2)
+
+        restarted = ReviewSessionStore(tmp_path)
+        progress = restarted.get("card1")
+
+        assert progress.total_sections == 2
+        assert progress.reviewed_mask == 0b1
+
+    def test_evicts_least_recently_updated(self, store):
+        for card_id in ["card1", "card2", "card3"]:
+            store.record(card_id, 0, True, total_sections=2)
+        # Touching card1 makes card2 the oldest
+        store.record("card1", 1, True, total_sections=2)
+
+        store.record("card4", 0, True, total_sections=2)
+
+        assert len(store) == 3
+        assert store.get("card2") is None
+        assert store.get("card1") is not None
+
+    def test_abandoned_sessions_expire(self, store, tmp_path):
+        store.record("card1", 0, True, total_sections=2)
+        store.get("card1").updated_at = time.time() - 7200
+        store.record("card2", 0, True, total_sections=2)
+
+        assert store.get("card1") is None
+        assert ReviewSessionStore(tmp_path).get("card1") is None
+
+    def test_changes_from_other_worker_are_seen(self, store, tmp_path):
+        other_worker = ReviewSessionStore(tmp_path)
+        assert store.get("card1") is None
+
+        other_worker.record("card1", 0, False, total_sections=2)
+
+        assert store.get("card1").forgot_mask == 0b1
+
+    def test_pop_removes_session(self, store, tmp_path):
+        store.record("card1", 0, True, total_sections=1)
+
+        assert store.pop("card1").is_complete() is True
+        assert store.pop("card1") is None
+        assert ReviewSessionStore(tmp_path).get("card1") is None
+
+    def test_failed_save_leaves_sessions_unchanged(self, store, tmp_path):
+        store.record("card1", 0, True, total_sections=2)
+
+        with patch.object(
+            review_storage, "_write_json_atomic", side_effect=OSError("disk full")
+        ):
+            with pytest.raises(OSError):
+                store.record("card1", 1, False, total_sections=2)
+            with pytest.raises(OSError):
+                store.record("card2", 0, True, total_sections=1)
+
+        assert store.get("card1").reviewed_mask == 0b1
+        assert store.get("card2") is None
+        # The store keeps working once saving does
+        assert store.record("card1", 1, False, total_sections=2).is_complete()
+
+    def test_out_of_range_section_rejected(self, store):
+        with pytest.raises(ValueError):
+            store.record("card1", 2, True, total_sections=2)
+
+        assert store.get("card1") is None
+
+    def test_record_many_applies_in_order(self, store, tmp_path):
+        results = store.record_many(
+            [
+                ("card1", 0, True, 2),
+                ("card2", 0, True, 1),
+                ("card1", 1, False, 2),
+                ("card3", 0, True, 2),
+            ]
+        )
+
+        assert [p.is_complete() for p in results] == [False, True, True, False]
+        assert results[0].sections_reviewed() == 1
+        assert results[2].get_aggregate_result() is False
+        # Completed cards stop being tracked
+        restarted = ReviewSessionStore(tmp_path)
+        assert restarted.get("card1") is None
+        assert restarted.get("card3") is not None
+
+    def test_record_many_is_all_or_nothing(self, store):
+        with pytest.raises(ValueError):
+            store.record_many([("card1", 0, True, 2), ("card1", -1, True, 2)])
+
+        assert store.get("card1") is None
+
+
+class TestReviewCacheSessions:
+    def test_review_cache_uses_session_store(self, tmp_path):
+        cache = ReviewCache(cache_dir=tmp_path)
+        cache.record_section_review("card1", 0, True, total_sections=2)
+
+        assert ReviewCache(cache_dir=tmp_path).get_card_progress("card1") is not None
+        assert cache.complete_card_review("card1") is not None
+        assert cache.get_card_progress("card1") is None
+
+
+class TestCacheVersion:
+    CARDS = [{"id": "card1", "deck_id": "deck1"}, {"id": "card2", "deck_id": "deck1"}]
+
+    def test_version_follows_cached_cards(self, tmp_path):
+        cache = ReviewCache(cache_dir=tmp_path)
+        assert cache.get_cache_version() is None
+
+        cache.cache_due_cards(self.CARDS)
+        version = cache.get_cache_version()
+
+        assert version == cards_version(self.CARDS)
+        assert ReviewCache(cache_dir=tmp_path).get_cache_version() == version
+
+        cache.remove_cached_card("card1")
+        assert cache.get_cache_version() not in (None, version)
+
+    def test_same_cards_same_version(self, tmp_path):
+        first = ReviewCache(cache_dir=tmp_path / "a")
+        second = ReviewCache(cache_dir=tmp_path / "b", compress=True)
+
+        first.cache_due_cards(self.CARDS)
+        second.cache_due_cards([dict(card) for card in self.CARDS])
+
+        assert first.get_cache_version() == second.get_cache_version()
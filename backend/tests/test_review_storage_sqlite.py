@@ -0,0 +1,174 @@
+"""Tests for the SQLite ReviewCache storage engine."""
+
+import sqlite3
+
+import pytest
+
+from review_storage_sqlite import SqliteReviewCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SqliteReviewCache(cache_dir=str(tmp_path))
+    yield cache
+    cache.close()
+
+
+CARDS = [
+    {"id": "card1", "deck_id": "deck1", "name": "Card 1"},
+    {"id": "card2", "deck_id": "deck2", "name": "Card 2"},
+    {"id": "card1", "deck_id": "deck1", "name": "Duplicate"},
+    {"id": "card3", "deck_id": "deck1", "name": "Card 3"},
+]
+
+
+class TestDueCards:
+    def test_nothing_cached_initially(self, cache):
+        assert cache.get_cached_due_cards() is None
+        assert cache.needs_sync() is True
+
+    def test_caches_deduplicated_cards_in_order(self, cache):
+        cache.cache_due_cards(CARDS)
+
+        cached = cache.get_cached_due_cards()
+        assert [c["id"] for c in cached] == ["card1", "card2", "card3"]
+        assert cached[0]["name"] == "Card 1"
+        assert cache.needs_sync() is False
+
+    def test_filter_by_deck(self, cache):
+        cache.cache_due_cards(CARDS)
+
+        cached = cache.get_cached_due_cards(deck_id="deck1")
+
+        assert [c["id"] for c in cached] == ["card1", "card3"]
+        assert cache.get_deck_due_counts() == {"deck1": 2, "deck2": 1}
+
+    def test_single_card_lookup_and_removal(self, cache):
+        cache.cache_due_cards(CARDS)
+
+        assert cache.get_cached_card("card2")["name"] == "Card 2"
+        assert cache.remove_cached_card("card2") is True
+        assert cache.remove_cached_card("card2") is False
+        assert cache.get_cached_card("card2") is None
+        assert cache.get_deck_due_counts()["deck2"] == 0
+
+    def test_positions_survive_removal(self, cache):
+        cache.cache_due_cards(CARDS)
+
+        cache.remove_cached_cards(["card1"])
+
+        positions = cache.get_cached_due_positions()
+        assert [(p, c["id"]) for p, c in positions] == [(1, "card2"), (2, "card3")]
+
+    def test_persisted_across_instances(self, cache, tmp_path):
+        cache.cache_due_cards(CARDS)
+
+        other = SqliteReviewCache(cache_dir=str(tmp_path))
+
+        assert len(other.get_cached_due_cards()) == 3
+        assert other.get_last_sync_time() == cache.get_last_sync_time()
+        other.close()
+
+    def test_version_changes_with_cards(self, cache):
+        assert cache.get_cache_version() is None
+        cache.cache_due_cards(CARDS)
+        version = cache.get_cache_version()
+        assert version is not None
+
+        cache.remove_cached_card("missing")
+        assert cache.get_cache_version() == version
+        cache.remove_cached_card("card2")
+        assert cache.get_cache_version() not in (None, version)
+
+        cache.clear_cache()
+        assert cache.get_cache_version() is None
+
+    def test_clear_cache(self, cache):
+        cache.cache_due_cards(CARDS)
+
+        cache.clear_cache()
+
+        assert cache.get_cached_due_cards() is None
+        assert cache.get_last_sync_time() is None
+
+
+class TestSectionProgress:
+    def test_records_sections_until_complete(self, cache):
+        progress = cache.record_section_review("card1", 0, True, total_sections=2)
+        assert progress.is_complete() is False
+
+        progress = cache.record_section_review("card1", 1, False, total_sections=2)
+        assert progress.is_complete() is True
+        assert progress.get_aggregate_result() is False
+
+    def test_duplicate_section_ignored(self, cache):
+        cache.record_section_review("card1", 0, True, total_sections=2)
+        progress = cache.record_section_review("card1", 0, False, total_sections=2)
+
+        assert len(progress.section_reviews) == 1
+        assert progress.section_reviews[0].remembered is True
+
+    def test_total_sections_change_resets_progress(self, cache):
+        cache.record_section_review("card1", 0, True, total_sections=2)
+        progress = cache.record_section_review("card1", 0, False, total_sections=1)
+
+        assert progress.total_sections == 1
+        assert progress.get_aggregate_result() is False
+
+    def test_complete_removes_progress(self, cache, tmp_path):
+        cache.record_section_review("card1", 0, True, total_sections=1)
+
+        other = SqliteReviewCache(cache_dir=str(tmp_path))
+        assert other.get_card_progress("card1") is not None
+        progress = other.complete_card_review("card1")
+        other.close()
+
+        assert progress.card_id == "card1"
+        assert cache.get_card_progress("card1") is None
+
+    def test_batch_records_in_one_transaction(self, cache):
+        results = cache.record_section_reviews(
+            [("card1", 0, True, 2), ("card2", 0, False, 1), ("card1", 1, True, 2)]
+        )
+
+        assert [p.is_complete() for p in results] == [False, True, True]
+        assert cache.get_card_progress("card1") is None
+        assert cache.get_card_progress("card2") is None
+
+    def test_sessions_are_bounded(self, cache):
+        cache._sessions.max_sessions = 2
+        for card_id in ("card1", "card2", "card3"):
+            cache.record_section_review(card_id, 0, True, total_sections=2)
+
+        assert cache.get_card_progress("card1") is None
+        assert cache.get_card_progress("card3") is not None
+
+    def test_migrates_progress_tables(self, tmp_path):
+        conn = sqlite3.connect(tmp_path / "review_cache.db")
+        conn.executescript(
+            """
+            CREATE TABLE card_progress (card_id TEXT PRIMARY KEY,
+                                        total_sections INTEGER NOT NULL);
+            CREATE TABLE section_progress (card_id TEXT NOT NULL,
+                                           section_index INTEGER NOT NULL,
+                                           remembered INTEGER NOT NULL,
+                                           PRIMARY KEY (card_id, section_index));
+            INSERT INTO card_progress VALUES ('card1', 3);
+            INSERT INTO section_progress VALUES ('card1', 0, 1), ('card1', 2, 0);
+            """
+        )
+        conn.close()
+
+        cache = SqliteReviewCache(cache_dir=str(tmp_path))
+        progress = cache.get_card_progress("card1")
+        tables = {
+            name
+            for (name,) in cache._conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )
+        }
+        cache.close()
+
+        assert progress.sections_reviewed() == 2
+        assert progress.get_aggregate_result() is False
+        assert "section_progress" not in tables
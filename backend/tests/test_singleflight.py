@@ -0,0 +1,85 @@
+"""Tests for single-flight call coalescing."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from deck_cache import DeckCache
+from mochi_client import MochiClient
+from singleflight import SingleFlight
+
+
+def run_concurrently(fn, count=5):
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        futures = [pool.submit(fn) for _ in range(count)]
+        return [f.result() for f in futures]
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def slow():
+            calls.append(1)
+            release.wait(timeout=1)
+            return "result"
+
+        def call():
+            return flight.do("key", slow)
+
+        timer = threading.Timer(0.1, release.set)
+        timer.start()
+        results = run_concurrently(call)
+
+        assert results == ["result"] * 5
+        assert len(calls) == 1
+
+    def test_error_is_shared_and_key_released(self):
+        flight = SingleFlight()
+
+        def fail():
+            time.sleep(0.05)
+            raise ValueError("boom")
+
+        errors = []
+
+        def call():
+            try:
+                flight.do("key", fail)
+            except ValueError as e:
+                errors.append(e)
+
+        run_concurrently(call, count=3)
+
+        assert len(errors) == 3
+        assert flight.in_flight("key") is False
+        assert flight.do("key", lambda: "again") == "again"
+
+    def test_different_keys_run_independently(self):
+        flight = SingleFlight()
+
+        assert flight.do("a", lambda: 1) == 1
+        assert flight.do("b", lambda: 2) == 2
+
+
+class TestMochiClientCoalescing:
+    def test_concurrent_due_fetches_share_one_crawl(self, tmp_path):
+        client = MochiClient(api_key="test", deck_cache=DeckCache(cache_dir=tmp_path))
+
+        def slow_crawl():
+            time.sleep(0.1)
+            return [{"id": "c1", "deck-id": "deck1", "new?": True}]
+
+        with (
+            patch.object(
+                client, "_get_all_decks", return_value=([{"id": "deck1"}], None)
+            ),
+            patch.object(client, "_get_all_cards", side_effect=slow_crawl) as crawl,
+        ):
+            results = run_concurrently(client.get_due_cards)
+
+        assert crawl.call_count == 1
+        assert all([c.id for c in cards] == ["c1"] for cards in results)
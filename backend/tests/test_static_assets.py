@@ -0,0 +1,162 @@
+"""Tests for the in-memory frontend asset server."""
+
+import gzip
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+import static_assets
+from static_assets import IMMUTABLE_CACHE_CONTROL, StaticAssets
+
+SCRIPT = b"console.log('cachehit');\n" * 200
+
+
+@pytest.fixture
+def dist(tmp_path):
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "index.html").write_bytes(b"<html>app</html>")
+    (tmp_path / "assets" / "index-abc123.js").write_bytes(SCRIPT)
+    (tmp_path / "assets" / "index-abc123.js.br").write_bytes(b"brotli bytes")
+    (tmp_path / "assets" / "index-abc123.js.map").write_bytes(b"{}" * 1024)
+    return tmp_path
+
+
+@pytest.fixture
+def assets(dist):
+    return StaticAssets(dist)
+
+
+@pytest.fixture
+def client(assets):
+    app = FastAPI()
+
+    @app.get("/{full_path:path}")
+    async def serve(full_path: str, request: Request):
+        asset = assets.get(full_path)
+        if asset is None:
+            return assets.index_response(request)
+        return assets.response(request, asset)
+
+    return TestClient(app)
+
+
+class TestStaticAssets:
+    def test_indexes_files_but_not_compressed_siblings(self, assets):
+        assert sorted(assets.assets) == [
+            "assets/index-abc123.js",
+            "assets/index-abc123.js.map",
+            "index.html",
+        ]
+
+    def test_hashed_assets_are_immutable(self, client):
+        response = client.get(
+            "/assets/index-abc123.js", headers={"Accept-Encoding": "identity"}
+        )
+
+        assert response.content == SCRIPT
+        assert response.headers["Cache-Control"] == IMMUTABLE_CACHE_CONTROL
+        assert response.headers["Content-Type"].startswith("text/javascript")
+
+    def test_index_is_revalidated(self, client):
+        response = client.get("/")
+
+        assert response.content == b"<html>app</html>"
+        assert response.headers["Cache-Control"] == "no-cache"
+
+    def test_serves_precompressed_variants(self, client):
+        br = client.get(
+            "/assets/index-abc123.js", headers={"Accept-Encoding": "gzip, br"}
+        )
+        assert br.headers["Content-Encoding"] == "br"
+        assert br.headers["Vary"] == "Accept-Encoding"
+
+        gz = client.get("/assets/index-abc123.js", headers={"Accept-Encoding": "gzip"})
+        assert gz.headers["Content-Encoding"] == "gzip"
+        assert gz.content == SCRIPT
+
+        rejected = client.get(
+            "/assets/index-abc123.js", headers={"Accept-Encoding": "gzip;q=0"}
+        )
+        assert "Content-Encoding" not in rejected.headers
+
+    def test_each_encoding_has_its_own_etag(self, client):
+        etags = {
+            encoding: client.get(
+                "/assets/index-abc123.js", headers={"Accept-Encoding": encoding}
+            ).headers["ETag"]
+            for encoding in ("identity", "gzip", "br")
+        }
+
+        assert etags["gzip"] == etags["identity"][:-1] + '-gz"'
+        assert etags["br"] == etags["identity"][:-1] + '-br"'
+
+        # A cached gzip body is not revalidated for a client wanting identity
+        response = client.get(
+            "/assets/index-abc123.js",
+            headers={"Accept-Encoding": "identity", "If-None-Match": etags["gzip"]},
+        )
+        assert response.status_code == 200
+        assert response.content == SCRIPT
+
+    def test_gzip_variant_precomputed(self, assets):
+        asset = assets.get("assets/index-abc123.js")
+
+        assert gzip.decompress(asset.gzip_body) == SCRIPT
+
+    def test_matching_etag_not_modified(self, client):
+        etag = client.get("/assets/index-abc123.js").headers["ETag"]
+
+        response = client.get(
+            "/assets/index-abc123.js", headers={"If-None-Match": etag}
+        )
+
+        assert response.status_code == 304
+        assert response.content == b""
+
+    def test_spa_routes_fall_back_to_index(self, client):
+        response = client.get("/decks/123")
+
+        assert response.content == b"<html>app</html>"
+
+    def test_missing_index_is_not_found(self, dist):
+        (dist / "index.html").unlink()
+        assets = StaticAssets(dist)
+        app = FastAPI()
+
+        @app.get("/{full_path:path}")
+        async def serve(request: Request):
+            return assets.index_response(request)
+
+        response = TestClient(app).get("/decks/123")
+
+        assert assets.has_index() is False
+        assert response.status_code == 404
+
+    def test_path_traversal_serves_index(self, client, dist):
+        (dist.parent / "secret.txt").write_text("secret")
+
+        response = client.get("/..%2Fsecret.txt")
+
+        assert b"secret" not in response.content
+
+    def test_requests_do_not_touch_filesystem(self, client):
+        with (
+            patch("pathlib.Path.read_bytes") as read_bytes,
+            patch("pathlib.Path.stat") as stat,
+        ):
+            client.get("/assets/index-abc123.js")
+            client.get("/decks/123")
+
+        read_bytes.assert_not_called()
+        stat.assert_not_called()
+
+    def test_large_files_stay_on_disk(self, dist):
+        with patch.object(static_assets, "MAX_MEMORY_FILE_BYTES", 1024):
+            assets = StaticAssets(dist)
+
+        source_map = assets.get("assets/index-abc123.js.map")
+        assert source_map.body is None
+        assert assets.get("assets/index-abc123.js").body is None
+        assert assets.get("index.html").body is not None
@@ -1,15 +1,28 @@
 """Tests for sync functionality and deduplication."""
 
 import asyncio
+import gzip
+import json
+import threading
+import time
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
 from mochi_client import Card, Section
+from review_outbox import ReviewOutbox
 from review_storage import SYNC_INTERVAL_MINUTES, ReviewCache
-from sync import SyncManager
+from sync import (
+    ACTIVE_SYNC_INTERVAL_MINUTES,
+    ERROR_RETRY_MINUTES,
+    MAX_SYNC_INTERVAL_MINUTES,
+    SYNC_JITTER,
+    SyncLeader,
+    SyncManager,
+)
+from sync_events import SyncEventBroker
 
 
 @pytest.fixture
@@ -159,6 +172,111 @@ class TestSyncTiming:
         assert review_cache.needs_sync() is True
 
 
+class TestInMemoryCache:
+    def test_repeated_reads_do_not_reparse(self, review_cache, monkeypatch):
+        review_cache.cache_due_cards([{"id": "card1"}, {"id": "card2"}])
+
+        load = MagicMock(side_effect=AssertionError("cache file re-parsed"))
+        monkeypatch.setattr("review_storage.json.loads", load)
+
+        for _ in range(3):
+            assert len(review_cache.get_cached_due_cards()) == 2
+            assert review_cache.get_cached_card("card2") == {"id": "card2"}
+            assert review_cache.needs_sync() is False
+
+    def test_rewrite_by_other_worker_is_reloaded(self, review_cache):
+        review_cache.cache_due_cards([{"id": "card1"}])
+        assert len(review_cache.get_cached_due_cards()) == 1
+
+        other_worker = ReviewCache(cache_dir="test_sync_cache")
+        other_worker.cache_due_cards([{"id": "card1"}, {"id": "card2"}])
+
+        assert len(review_cache.get_cached_due_cards()) == 2
+
+    def test_deleted_file_is_noticed(self, review_cache):
+        review_cache.cache_due_cards([{"id": "card1"}])
+        review_cache._get_cache_file().unlink()
+
+        assert review_cache.get_cached_due_cards() is None
+        assert review_cache.get_last_sync_time() is None
+
+    def test_returned_list_does_not_alias_cache(self, review_cache):
+        review_cache.cache_due_cards([{"id": "card1"}])
+
+        review_cache.get_cached_due_cards().clear()
+
+        assert len(review_cache.get_cached_due_cards()) == 1
+
+
+class TestCachePersistence:
+    def test_cache_file_is_compact(self, review_cache):
+        review_cache.cache_due_cards([{"id": "card1", "name": "Card 1"}])
+
+        raw = review_cache._get_cache_file().read_text()
+
+        assert "\n" not in raw
+        assert '"id":"card1"' in raw
+
+    def test_positions_survive_removal(self, review_cache):
+        review_cache.cache_due_cards([{"id": f"card{i}"} for i in range(4)])
+
+        review_cache.remove_cached_cards(["card0", "card2"])
+
+        positions = review_cache.get_cached_due_positions()
+        assert [(p, c["id"]) for p, c in positions] == [(1, "card1"), (3, "card3")]
+
+    def test_sync_during_removal_is_not_lost(self, review_cache, monkeypatch):
+        review_cache.cache_due_cards([{"id": "old1"}, {"id": "old2"}])
+        other_worker = ReviewCache(cache_dir="test_sync_cache")
+        read_done = threading.Event()
+        read_cache_file = review_cache._read_cache_file
+
+        def slow_read():
+            data = read_cache_file()
+            read_done.set()
+            time.sleep(0.1)
+            return data
+
+        monkeypatch.setattr(review_cache, "_read_cache_file", slow_read)
+        remover = threading.Thread(
+            target=review_cache.remove_cached_cards, args=(["old1"],)
+        )
+        remover.start()
+        assert read_done.wait(timeout=2)
+        other_worker.cache_due_cards([{"id": f"new{i}"} for i in range(3)])
+        remover.join()
+
+        cached = other_worker.get_cached_due_cards()
+        assert [c["id"] for c in cached] == ["new0", "new1", "new2"]
+
+    def test_compressed_cache_round_trips(self, tmp_path):
+        cache = ReviewCache(cache_dir=tmp_path, compress=True)
+        cards = [{"id": f"card{i}", "content": "Q\n---\nA" * 20} for i in range(50)]
+        cache.cache_due_cards(cards)
+
+        cache_file = cache._get_cache_file()
+        assert cache_file.name.endswith(".gz")
+        assert gzip.decompress(cache_file.read_bytes())
+        assert cache_file.stat().st_size < len(json.dumps(cards))
+
+        other_worker = ReviewCache(cache_dir=tmp_path, compress=True)
+        assert other_worker.get_cached_due_cards() == cards
+
+    def test_failed_write_keeps_previous_cache(self, review_cache, monkeypatch):
+        review_cache.cache_due_cards([{"id": "card1"}])
+
+        monkeypatch.setattr(
+            "review_storage.os.replace", MagicMock(side_effect=OSError("disk full"))
+        )
+        with pytest.raises(OSError):
+            review_cache.cache_due_cards([{"id": "card2"}])
+        monkeypatch.undo()
+
+        other_worker = ReviewCache(cache_dir="test_sync_cache")
+        assert other_worker.get_cached_due_cards() == [{"id": "card1"}]
+        assert [p.name for p in Path("test_sync_cache").glob(".*")] == []
+
+
 class TestSyncManager:
     @pytest.mark.asyncio
     async def test_sync_manager_starts_and_stops(
@@ -192,6 +310,57 @@ class TestSyncManager:
         assert len(cached) == 1
         assert cached[0]["id"] == "card1"
 
+    @pytest.mark.asyncio
+    async def test_sync_skips_cards_with_queued_reviews(
+        self, mock_mochi_client, review_cache, card_to_dict, tmp_path
+    ):
+        outbox = ReviewOutbox(cache_dir=tmp_path)
+        outbox.enqueue("card1", remembered=True)
+        manager = SyncManager(
+            mock_mochi_client, review_cache, card_to_dict, outbox=outbox
+        )
+
+        # Mochi has not seen the queued review, so it still reports card1 due
+        count = await manager.sync_due_cards()
+        outbox.close()
+
+        assert count == 0
+        assert review_cache.get_cached_due_cards() == []
+
+    @pytest.mark.asyncio
+    async def test_sync_reschedules_queued_reviews_in_due_index(
+        self, mock_mochi_client, review_cache, card_to_dict, tmp_path
+    ):
+        outbox = ReviewOutbox(cache_dir=tmp_path)
+        queued = outbox.enqueue("card1", remembered=False)
+        manager = SyncManager(
+            mock_mochi_client, review_cache, card_to_dict, outbox=outbox
+        )
+
+        # The crawl rebuilt the index from Mochi's dates, which predate the review
+        await manager.sync_due_cards()
+        outbox.close()
+
+        mock_mochi_client.due_index.record_review.assert_called_once_with(
+            "card1", False, queued.reviewed_at
+        )
+
+    @pytest.mark.asyncio
+    async def test_sync_queues_reference_solutions(
+        self, mock_mochi_client, review_cache, card_to_dict
+    ):
+        runner = MagicMock()
+        runner.schedule = AsyncMock(side_effect=RuntimeError("store unavailable"))
+        manager = SyncManager(
+            mock_mochi_client, review_cache, card_to_dict, reference_runner=runner
+        )
+
+        # A failure to queue reference runs does not fail the sync
+        assert await manager.sync_due_cards() == 1
+
+        (cards,) = runner.schedule.call_args.args
+        assert [c["id"] for c in cards] == ["card1"]
+
     @pytest.mark.asyncio
     async def test_sync_due_cards_handles_error(
         self, mock_mochi_client, review_cache, card_to_dict
@@ -215,6 +384,231 @@ class TestSyncManager:
         await manager.stop()
 
 
+class TestAdaptiveScheduling:
+    def minutes(self, manager):
+        return manager.next_interval_seconds() / 60
+
+    def test_idle_interval_is_base_interval(
+        self, mock_mochi_client, review_cache, card_to_dict
+    ):
+        manager = SyncManager(mock_mochi_client, review_cache, card_to_dict)
+
+        minutes = self.minutes(manager)
+
+        assert SYNC_INTERVAL_MINUTES * (1 - SYNC_JITTER) <= minutes
+        assert minutes <= SYNC_INTERVAL_MINUTES * (1 + SYNC_JITTER)
+
+    def test_active_user_syncs_more_often(
+        self, mock_mochi_client, review_cache, card_to_dict
+    ):
+        manager = SyncManager(mock_mochi_client, review_cache, card_to_dict)
+        manager.note_activity()
+
+        assert self.minutes(manager) <= ACTIVE_SYNC_INTERVAL_MINUTES * (1 + SYNC_JITTER)
+
+    def test_backs_off_when_idle(self, mock_mochi_client, review_cache, card_to_dict):
+        manager = SyncManager(mock_mochi_client, review_cache, card_to_dict)
+        manager._idle_syncs = 10
+
+        assert self.minutes(manager) <= MAX_SYNC_INTERVAL_MINUTES * (1 + SYNC_JITTER)
+        assert self.minutes(manager) > SYNC_INTERVAL_MINUTES * 2
+
+    @pytest.mark.asyncio
+    async def test_backs_off_after_repeated_errors(
+        self, mock_mochi_client, review_cache, card_to_dict
+    ):
+        mock_mochi_client.get_due_cards.side_effect = Exception("API Error")
+        manager = SyncManager(mock_mochi_client, review_cache, card_to_dict)
+
+        for _ in range(3):
+            with pytest.raises(Exception):
+                await manager.sync_due_cards()
+
+        assert self.minutes(manager) >= ERROR_RETRY_MINUTES * 4 * (1 - SYNC_JITTER)
+
+    @pytest.mark.asyncio
+    async def test_trigger_wakes_background_loop(
+        self, mock_mochi_client, review_cache, card_to_dict
+    ):
+        manager = SyncManager(mock_mochi_client, review_cache, card_to_dict)
+        manager.start()
+        await asyncio.sleep(0.05)
+
+        # Several triggers before the loop wakes coalesce into one sync
+        manager.trigger()
+        manager.trigger()
+        for _ in range(50):
+            if mock_mochi_client.get_due_cards.called:
+                break
+            await asyncio.sleep(0.02)
+        await asyncio.sleep(0.05)
+        await manager.stop()
+
+        mock_mochi_client.get_due_cards.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_syncs_share_one_run(
+        self, mock_mochi_client, review_cache, card_to_dict
+    ):
+        manager = SyncManager(mock_mochi_client, review_cache, card_to_dict)
+
+        results = await asyncio.gather(
+            manager.sync_due_cards(), manager.sync_due_cards()
+        )
+
+        assert results == [1, 1]
+        mock_mochi_client.get_due_cards.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_request_sync_runs_inline_when_stopped(
+        self, mock_mochi_client, review_cache, card_to_dict
+    ):
+        manager = SyncManager(mock_mochi_client, review_cache, card_to_dict)
+
+        await manager.request_sync()
+
+        assert review_cache.get_cached_due_cards()[0]["id"] == "card1"
+
+
+class TestMultiWorker:
+    def test_only_one_leader(self, tmp_path):
+        leader = SyncLeader(tmp_path)
+        follower = SyncLeader(tmp_path)
+
+        assert leader.try_acquire() is True
+        assert follower.try_acquire() is False
+
+        leader.release()
+        assert follower.try_acquire() is True
+        follower.release()
+
+    @pytest.mark.asyncio
+    async def test_follower_does_not_sync(
+        self, mock_mochi_client, review_cache, card_to_dict, tmp_path
+    ):
+        leader = SyncLeader(tmp_path)
+        leader.try_acquire()
+        manager = SyncManager(
+            mock_mochi_client,
+            review_cache,
+            card_to_dict,
+            leader=SyncLeader(tmp_path),
+        )
+        manager.start()
+        await asyncio.sleep(0.05)
+
+        manager.trigger()
+        await asyncio.sleep(0.1)
+        await manager.stop()
+        leader.release()
+
+        mock_mochi_client.get_due_cards.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_follower_publishes_leader_sync(
+        self, mock_mochi_client, card_to_dict, tmp_path, monkeypatch
+    ):
+        monkeypatch.setattr("sync.EVENT_POLL_SECONDS", 0.02)
+        leader_lock = SyncLeader(tmp_path)
+        leader_lock.try_acquire()
+        leader = SyncManager(
+            mock_mochi_client,
+            ReviewCache(cache_dir=tmp_path),
+            card_to_dict,
+            events=SyncEventBroker(),
+            leader=leader_lock,
+        )
+        follower_events = SyncEventBroker()
+        follower = SyncManager(
+            MagicMock(),
+            ReviewCache(cache_dir=tmp_path),
+            card_to_dict,
+            events=follower_events,
+            leader=SyncLeader(tmp_path),
+        )
+        queue = follower_events.subscribe()
+        follower.start()
+
+        await leader.sync_due_cards()
+        event = await asyncio.wait_for(queue.get(), timeout=2)
+        await follower.stop()
+        leader_lock.release()
+
+        assert [card["id"] for card in event.added] == ["card1"]
+
+    @pytest.mark.asyncio
+    async def test_follower_sync_request_reaches_leader(
+        self, mock_mochi_client, card_to_dict, tmp_path, monkeypatch
+    ):
+        monkeypatch.setattr("sync.EVENT_POLL_SECONDS", 0.02)
+        leader_lock = SyncLeader(tmp_path)
+        leader_lock.try_acquire()
+        leader = SyncManager(
+            mock_mochi_client,
+            ReviewCache(cache_dir=tmp_path),
+            card_to_dict,
+            leader=leader_lock,
+        )
+        follower_mochi = MagicMock()
+        follower = SyncManager(
+            follower_mochi,
+            ReviewCache(cache_dir=tmp_path),
+            card_to_dict,
+            leader=SyncLeader(tmp_path),
+        )
+        leader.start()
+        follower.start()
+
+        # e.g. a stale /api/due served by the follower
+        await follower.request_sync()
+        for _ in range(100):
+            if mock_mochi_client.get_due_cards.called:
+                break
+            await asyncio.sleep(0.02)
+        await follower.stop()
+        await leader.stop()
+
+        mock_mochi_client.get_due_cards.assert_called_once()
+        follower_mochi.get_due_cards.assert_not_called()
+
+    def test_activity_is_shared_between_workers(
+        self, mock_mochi_client, card_to_dict, tmp_path
+    ):
+        leader = SyncManager(
+            mock_mochi_client, ReviewCache(cache_dir=tmp_path), card_to_dict
+        )
+        follower = SyncManager(
+            MagicMock(), ReviewCache(cache_dir=tmp_path), card_to_dict
+        )
+        assert leader.is_active() is False
+
+        follower.note_activity()
+
+        assert leader.is_active() is True
+
+    def test_last_sync_from_other_worker_is_visible(self, review_cache):
+        other_worker = ReviewCache(cache_dir="test_sync_cache")
+        assert review_cache.get_last_sync_time() is None
+
+        other_worker.cache_due_cards([{"id": "card1"}])
+
+        assert review_cache.get_last_sync_time() is not None
+        assert review_cache.needs_sync() is False
+
+    def test_in_progress_reviews_shared_between_workers(self, review_cache):
+        other_worker = ReviewCache(cache_dir="test_sync_cache")
+
+        review_cache.record_section_review(
+            card_id="card1", section_index=0, remembered=True, total_sections=2
+        )
+        progress = other_worker.record_section_review(
+            card_id="card1", section_index=1, remembered=False, total_sections=2
+        )
+
+        assert progress.is_complete() is True
+        assert progress.get_aggregate_result() is False
+
+
 class TestSyncInterval:
     def test_sync_interval_is_30_minutes(self):
         assert SYNC_INTERVAL_MINUTES == 30
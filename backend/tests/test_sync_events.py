@@ -0,0 +1,108 @@
+"""Tests for pushing sync results to connected clients."""
+
+import json
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from review_router import card_to_dict, stream_sync_events
+from review_storage import ReviewCache
+from sync import SyncManager
+from sync_events import SUBSCRIBER_QUEUE_SIZE, SyncEventBroker
+
+
+@pytest.fixture
+def broker():
+    return SyncEventBroker()
+
+
+@pytest.fixture
+def review_cache():
+    cache = ReviewCache(cache_dir="test_sync_events_cache")
+    yield cache
+    cache_dir = Path("test_sync_events_cache")
+    if cache_dir.exists():
+        for file in cache_dir.glob("*"):
+            file.unlink()
+        cache_dir.rmdir()
+
+
+class TestSyncEventBroker:
+    def test_first_snapshot_adds_all_cards(self, broker):
+        event = broker.publish_snapshot([{"id": "card1"}, {"id": "card2"}])
+
+        assert event.version == 1
+        assert [c["id"] for c in event.added] == ["card1", "card2"]
+        assert event.total_due == 2
+
+    def test_diff_against_previous_snapshot(self, broker):
+        broker.publish_snapshot([{"id": "card1", "name": "A"}, {"id": "card2"}])
+
+        event = broker.publish_snapshot([{"id": "card1", "name": "B"}, {"id": "card3"}])
+
+        assert event.version == 2
+        assert [c["id"] for c in event.added] == ["card3"]
+        assert event.updated == [{"id": "card1", "name": "B"}]
+        assert event.removed == ["card2"]
+
+    def test_unchanged_snapshot_not_published(self, broker):
+        broker.publish_snapshot([{"id": "card1"}])
+
+        assert broker.publish_snapshot([{"id": "card1"}]) is None
+        assert broker.version == 1
+
+    @pytest.mark.asyncio
+    async def test_subscribers_receive_events(self, broker):
+        queue = broker.subscribe()
+
+        broker.publish_snapshot([{"id": "card1"}])
+
+        event = queue.get_nowait()
+        assert event.version == 1
+
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_is_dropped(self, broker):
+        queue = broker.subscribe()
+
+        for i in range(SUBSCRIBER_QUEUE_SIZE + 1):
+            broker.publish_snapshot([{"id": f"card{i}"}])
+
+        assert broker.subscriber_count() == 0
+        items = [queue.get_nowait() for _ in range(queue.qsize())]
+        assert items[-1] is None
+
+
+class TestSyncPublishesEvents:
+    @pytest.mark.asyncio
+    async def test_sync_publishes_diff(self, broker, review_cache):
+        mochi = MagicMock()
+        mochi.get_due_cards.return_value = []
+        manager = SyncManager(mochi, review_cache, card_to_dict, events=broker)
+        queue = broker.subscribe()
+
+        await manager.sync_due_cards()
+
+        assert queue.get_nowait().version == 1
+
+
+class TestEventStream:
+    @pytest.mark.asyncio
+    async def test_stream_sends_hello_then_sync_events(self, broker):
+        request = MagicMock()
+        request.is_disconnected = AsyncMock(return_value=False)
+
+        response = await stream_sync_events(request, events=broker)
+        body = response.body_iterator
+
+        hello = await body.__anext__()
+        assert hello.startswith("event: hello")
+
+        broker.publish_snapshot([{"id": "card1"}])
+        message = await body.__anext__()
+        await body.aclose()
+
+        assert message.startswith("id: 1\nevent: sync\n")
+        data = json.loads(message.split("data: ", 1)[1])
+        assert data["added"] == [{"id": "card1"}]
+        assert broker.subscriber_count() == 0